@@ -0,0 +1,303 @@
+"""
+Local stand-ins for every upstream the website talks to, for benchmarking.
+
+    python -m bench.fakes --latency lambda=0.08,api=0.03
+
+Each fake sleeps for its configured latency before answering, so a run
+measures the website's own overhead plus realistic upstream waits without
+touching AWS, the SourceBox API, the LLM demo API, OpenAI or Gmail.
+"""
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+import socketserver
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Seconds each upstream waits before answering; ``openai_token`` is the gap between streamed tokens
+DEFAULT_LATENCY = {
+    'lambda': 0.08,
+    'api': 0.03,
+    'llm': 0.4,
+    'openai': 0.3,
+    'openai_token': 0.01,
+    'smtp': 0.05
+}
+
+DEFAULT_PORTS = {
+    'lambda': 18701,
+    'api': 18702,
+    'llm': 18703,
+    'openai': 18704,
+    'smtp': 18705
+}
+
+TOKEN_PREFIX = 'bench-'
+COMPLETION_TOKENS = ['Sure', ',', ' here', ' is', ' a', ' short', ' answer', ' from', ' the', ' bench', '.']
+
+
+def parse_latency(spec):
+    """Parse ``name=seconds,...`` on top of DEFAULT_LATENCY."""
+    latency = dict(DEFAULT_LATENCY)
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, _, value = item.partition('=')
+        if name not in latency:
+            raise ValueError(f"Unknown upstream {name!r}; expected one of {', '.join(latency)}")
+        latency[name] = float(value)
+    return latency
+
+
+def user_id_for(token):
+    """Bench tokens are ``bench-<n>``; user n owns them, so caches see many users."""
+    suffix = token[len(TOKEN_PREFIX):] if token and token.startswith(TOKEN_PREFIX) else ''
+    return int(suffix) if suffix.isdigit() else None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _json(self, data, status=200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _bearer_token(self):
+        header = self.headers.get('Authorization', '')
+        return header[len('Bearer '):] if header.startswith('Bearer ') else None
+
+
+class LambdaHandler(_Handler):
+    """The auth Lambda behind botocore's Invoke API (AWS_ENDPOINT_URL_LAMBDA)."""
+
+    def do_POST(self):
+        payload = json.loads(self._body() or b'{}')
+        time.sleep(self.latency)
+        if not re.match(r'^/2015-03-31/functions/[^/]+/invocations$', self.path):
+            return self._json({'message': 'Unknown operation'}, status=404)
+
+        action = payload.get('action')
+        if action == 'GET_USER':
+            valid = user_id_for(payload.get('token')) is not None
+            return self._json({'statusCode': 200 if valid else 401, 'body': json.dumps({'valid': valid})})
+        if action == 'LOGIN_USER':
+            username = (payload.get('data') or {}).get('username') or ''
+            user_id = re.sub(r'\D', '', username) or '1'
+            return self._json({'statusCode': 200, 'body': json.dumps({'token': f"{TOKEN_PREFIX}{user_id}"})})
+        if action == 'REGISTER_USER':
+            return self._json({'statusCode': 201, 'body': json.dumps({'message': 'created'})})
+        return self._json({'statusCode': 400, 'body': json.dumps({'message': f'Unknown action {action}'})})
+
+
+class ApiHandler(_Handler):
+    """The SourceBox API at API_URL."""
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        path = self.path.split('?', 1)[0]
+        user_id = user_id_for(self._bearer_token())
+
+        if path == '/user/id':
+            if user_id is None:
+                return self._json({'error': 'Unauthorized'}, status=401)
+            return self._json({'user_id': user_id})
+        match = re.match(r'^/user/(\d+)/premium/status$', path)
+        if match:
+            return self._json({'premium_status': int(match.group(1)) % 4 == 0})
+        if path == '/user/token_usage':
+            return self._json({'total_tokens': (user_id or 0) * 1000})
+        match = re.match(r'^/users/(\d+)$', path)
+        if match:
+            uid = int(match.group(1))
+            return self._json({'id': uid, 'email': f"user{uid}@bench.local", 'username': f"user{uid}"})
+        if path == '/platform_updates/list':
+            since = re.search(r'[?&]since=(\d+)', self.path)
+            return self._json([
+                {'id': i, 'title': f"Update {i}", 'content': "Bench platform update.", 'date': '2024-01-01'}
+                for i in range(int(since.group(1)) + 1 if since else 1, 21)
+            ])
+        return self._json({'error': 'Not found'}, status=404)
+
+    def do_POST(self):
+        body = self._body()
+        time.sleep(self.latency)
+        self._json({'ok': True, 'received': len(body)})
+
+
+class LlmHandler(_Handler):
+    """The Heroku LLM demo API at LLM_API_URL."""
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if self.path.startswith('/landing-transcript-example'):
+            return self._json({'transcript': "Welcome to SourceBox. " * 40})
+        return self._json({'error': 'Not found'}, status=404)
+
+    def do_POST(self):
+        payload = json.loads(self._body() or b'{}')
+        time.sleep(self.latency)
+        if not self.path.startswith('/landing-'):
+            return self._json({'error': 'Not found'}, status=404)
+        return self._json({'response': f"Bench answer to: {payload.get('prompt', '')}"})
+
+
+class OpenAIHandler(_Handler):
+    """Chat completions at OPENAI_BASE_URL, streaming and not."""
+    token_latency = 0
+
+    def do_POST(self):
+        request = json.loads(self._body() or b'{}')
+        time.sleep(self.latency)
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            return self._json({'error': {'message': 'Not found'}}, status=404)
+
+        base = {'id': 'chatcmpl-bench', 'created': int(time.time()), 'model': request.get('model', 'bench')}
+        usage = {'prompt_tokens': 12, 'completion_tokens': len(COMPLETION_TOKENS),
+                 'total_tokens': 12 + len(COMPLETION_TOKENS)}
+        if not request.get('stream'):
+            message = {'role': 'assistant', 'content': ''.join(COMPLETION_TOKENS)}
+            return self._json(dict(base, object='chat.completion', usage=usage,
+                                   choices=[{'index': 0, 'message': message, 'finish_reason': 'stop'}]))
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for token in COMPLETION_TOKENS:
+            self._chunk(dict(base, object='chat.completion.chunk',
+                             choices=[{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]))
+            time.sleep(self.token_latency)
+        if (request.get('stream_options') or {}).get('include_usage'):
+            self._chunk(dict(base, object='chat.completion.chunk', choices=[], usage=usage))
+        self._write_chunk(b'data: [DONE]\n\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _chunk(self, data):
+        self._write_chunk(f"data: {json.dumps(data)}\n\n".encode('utf-8'))
+
+    def _write_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, AUTH, MAIL, RCPT, DATA, NOOP, QUIT."""
+    latency = 0
+    delivered = 0
+
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        self._reply('220 bench ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self._reply('250-bench')
+                self._reply('250 AUTH PLAIN LOGIN')
+            elif command.startswith('AUTH'):
+                self._reply('235 Authentication successful')
+            elif command == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                time.sleep(self.latency)
+                SmtpHandler.delivered += 1
+                self._reply('250 Queued')
+            elif command == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('250 OK')
+
+
+class _ThreadingSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def _handler(base, **attributes):
+    return type(base.__name__, (base,), attributes)
+
+
+def start(latency=None, ports=None, host='127.0.0.1'):
+    """Start every fake on a daemon thread. Returns {name: base URL or (host, port)}."""
+    latency = latency or dict(DEFAULT_LATENCY)
+    ports = dict(DEFAULT_PORTS, **(ports or {}))
+    ThreadingHTTPServer.daemon_threads = True
+
+    servers = {
+        'lambda': ThreadingHTTPServer((host, ports['lambda']), _handler(LambdaHandler, latency=latency['lambda'])),
+        'api': ThreadingHTTPServer((host, ports['api']), _handler(ApiHandler, latency=latency['api'])),
+        'llm': ThreadingHTTPServer((host, ports['llm']), _handler(LlmHandler, latency=latency['llm'])),
+        'openai': ThreadingHTTPServer((host, ports['openai']), _handler(
+            OpenAIHandler, latency=latency['openai'], token_latency=latency['openai_token'])),
+        'smtp': _ThreadingSMTPServer((host, ports['smtp']), _handler(SmtpHandler, latency=latency['smtp']))
+    }
+    for name, server in servers.items():
+        threading.Thread(target=server.serve_forever, name=f"fake-{name}", daemon=True).start()
+
+    return {
+        'lambda': f"http://{host}:{ports['lambda']}",
+        'api': f"http://{host}:{ports['api']}",
+        'llm': f"http://{host}:{ports['llm']}",
+        'openai': f"http://{host}:{ports['openai']}/v1",
+        'smtp': (host, ports['smtp'])
+    }
+
+
+def app_environment(endpoints):
+    """Environment variables that point the website at the fakes."""
+    smtp_host, smtp_port = endpoints['smtp']
+    return {
+        'AWS_ACCESS_KEY_ID': 'bench',
+        'AWS_SECRET_ACCESS_KEY': 'bench',
+        'AWS_REGION': 'us-east-1',
+        'AWS_ENDPOINT_URL_LAMBDA': endpoints['lambda'],
+        'API_URL': endpoints['api'],
+        'ADMIN_TOKEN': 'bench-admin',
+        'LLM_API_URL': endpoints['llm'],
+        'OPENAI_API_KEY': 'bench',
+        'OPENAI_BASE_URL': endpoints['openai'],
+        'SMTP_HOST': smtp_host,
+        'SMTP_PORT': str(smtp_port),
+        'SMTP_STARTTLS': '0',
+        'GMAIL_USERNAME': 'support@bench.local',
+        'GOOGLE_PASSWORD': 'bench',
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SECRET_KEY': 'bench'
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run local fakes of the website's upstreams.")
+    parser.add_argument('--latency', default='', help="per-upstream seconds, e.g. lambda=0.08,llm=0.5")
+    args = parser.parse_args(argv)
+
+    endpoints = start(parse_latency(args.latency))
+    for name, value in app_environment(endpoints).items():
+        print(f"export {name}={value}")
+    sys.stdout.flush()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
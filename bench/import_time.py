@@ -0,0 +1,136 @@
+"""
+Check how long ``import app`` takes, i.e. the cost of every worker boot.
+
+    python -m bench.import_time                      # report, enforce the budget
+    python -m bench.import_time --save bench/import_baseline.json
+    python -m bench.import_time --compare bench/import_baseline.json
+
+Each sample runs ``python -X importtime -c "import app"`` in a fresh
+process and the median is reported. The check fails if the median exceeds
+the budget, regresses past the baseline by more than the tolerance, or if
+any module that is meant to be imported lazily shows up at boot.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', '1500'))
+DEFAULT_TOLERANCE = 20
+
+# Only needed on specific code paths; each is imported on first use
+DEFERRED_MODULES = ('boto3', 'botocore', 'openai', 'markdown', 'smtplib', 'email.mime', 'PIL')
+
+# Enough configuration for app.py to import without a .env
+BOOT_ENVIRONMENT = {
+    'AWS_ACCESS_KEY_ID': 'import-check',
+    'AWS_SECRET_ACCESS_KEY': 'import-check',
+    'AWS_REGION': 'us-east-1',
+    'SECRET_KEY': 'import-check',
+    'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
+}
+
+
+def parse_importtime(output):
+    """Return [(module, self_us, cumulative_us, depth)] from ``-X importtime`` stderr."""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def sample(target='app'):
+    env = dict(BOOT_ENVIRONMENT, **os.environ)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {target}"],
+                            cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def measure(samples=5, target='app', top=15):
+    runs = [sample(target) for _ in range(samples)]
+    totals = [sum(cumulative for _, _, cumulative, depth in run if depth == 0) / 1000 for run in runs]
+    median_run = runs[totals.index(statistics.median_low(totals))]
+
+    heaviest = sorted(((name, cumulative / 1000) for name, _, cumulative, depth in median_run if depth <= 2),
+                      key=lambda item: item[1], reverse=True)[:top]
+    names = {name for name, _, _, _ in median_run}
+    eager = sorted({deferred for deferred in DEFERRED_MODULES for name in names
+                    if name == deferred or name.startswith(deferred + '.')})
+    return {
+        'target': target,
+        'median_ms': round(statistics.median(totals), 1),
+        'min_ms': round(min(totals), 1),
+        'samples': samples,
+        'modules': len(names),
+        'heaviest': [[name, round(ms, 1)] for name, ms in heaviest],
+        'eager_deferred': eager
+    }
+
+
+def problems(result, budget_ms, baseline=None, tolerance=DEFAULT_TOLERANCE):
+    found = []
+    if result['median_ms'] > budget_ms:
+        found.append(f"import {result['target']} took {result['median_ms']}ms (budget {budget_ms:.0f}ms)")
+    if baseline:
+        limit = baseline['median_ms'] * (1 + tolerance / 100)
+        if result['median_ms'] > limit:
+            found.append(f"import {result['target']} took {result['median_ms']}ms, "
+                         f"baseline {baseline['median_ms']}ms (+{tolerance:.0f}% allowed)")
+    if result['eager_deferred']:
+        found.append("imported at boot but meant to be lazy: " + ', '.join(result['eager_deferred']))
+    return found
+
+
+def format_report(result, baseline=None):
+    lines = [f"import {result['target']}: median {result['median_ms']}ms, min {result['min_ms']}ms "
+             f"over {result['samples']} runs, {result['modules']} modules"]
+    if baseline:
+        change = (result['median_ms'] - baseline['median_ms']) / baseline['median_ms'] * 100
+        lines.append(f"baseline: {baseline['median_ms']}ms ({change:+.0f}%)")
+    lines.append("heaviest (cumulative ms):")
+    lines.extend(f"  {ms:>8.1f}  {name}" for name, ms in result['heaviest'])
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure and budget the app's import time.")
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--target', default='app')
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed regression over the baseline, in percent")
+    parser.add_argument('--save', help="write the result as a baseline JSON file")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    args = parser.parse_args(argv)
+
+    result = measure(args.samples, args.target)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print(format_report(result, baseline))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    found = problems(result, args.budget_ms, baseline, args.tolerance)
+    if found:
+        print("Import budget exceeded:\n  " + '\n  '.join(found), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,372 @@
+"""
+Load-test the website under gunicorn against local fakes of every upstream.
+
+    python -m bench.run --mix mixed --concurrency 16 --duration 30 --save bench/baseline.json
+    python -m bench.run --mix mixed --concurrency 16 --duration 30 --compare bench/baseline.json
+
+The app is started exactly as the Procfile does (``gunicorn app:app``,
+picking up any gunicorn.conf.py), with every upstream pointed at
+``bench.fakes``. A pool of closed-loop clients then replays a weighted
+traffic mix and the run reports p50/p95/p99 latency and throughput per route.
+
+bench/baseline.json is the committed reference run, made with the first
+command above and the default fake latencies; its ``meta`` records the
+commit and the machine it ran on. Numbers only compare fairly on similar
+hardware, so re-save it when the reference machine changes.
+"""
+import os
+import sys
+import json
+import platform
+import math
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import requests
+from bench.fakes import DEFAULT_LATENCY, parse_latency
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OK = (200, 304)
+REDIRECT = (302,)
+
+# name -> [(weight, route, method, path, request kwargs, accepted statuses)]
+MIXES = {
+    'anonymous': [
+        (40, 'landing', 'GET', '/', {}, OK),
+        (15, 'documentation', 'GET', '/documentation', {}, OK),
+        (10, 'learn_more', 'GET', '/learn_more', {}, OK),
+        (10, 'platform_support', 'GET', '/platform_support', {}, OK),
+        (10, 'search', 'GET', '/search?query=deepquery', {}, OK),
+        (10, 'search_suggestions', 'GET', '/search.json?q=doc', {}, OK),
+        (5, 'updates', 'GET', '/updates', {}, OK)
+    ],
+    'signed_in': [
+        (30, 'dashboard', 'GET', '/dashboard', {}, OK),
+        (20, 'content', 'GET', '/content', {}, OK),
+        (15, 'premium_info', 'GET', '/premium_info', {}, OK + REDIRECT),  # premium users are redirected
+        (15, 'updates', 'GET', '/updates', {}, OK),
+        (10, 'user_settings', 'GET', '/user_settings', {}, OK),
+        (10, 'landing', 'GET', '/', {}, OK)
+    ],
+    'demo': [
+        (30, 'rag_api', 'POST', '/rag-api', {'json': {'prompt': 'What is SourceBox?'}}, OK),
+        (15, 'rag_api_sentiment', 'POST', '/rag-api-sentiment', {'json': {'prompt': 'I love it'}}, OK),
+        (10, 'rag_api_webscrape', 'POST', '/rag-api-webscrape', {'json': {'prompt': 'example.com'}}, OK),
+        (10, 'image_generation', 'POST', '/rag-api-image', {'json': {'prompt': 'a red box'}}, OK),
+        (15, 'audio_transcript', 'GET', '/rag-api-transcript', {}, OK),
+        (10, 'chat_assistant', 'POST', '/chat_assistant', {'json': {'message': 'Hello'}}, OK),
+        (10, 'chat_assistant_stream', 'POST', '/chat_assistant', {'json': {'message': 'Hello', 'stream': True}}, OK)
+    ],
+    'support': [
+        (80, 'platform_support', 'GET', '/platform_support', {}, OK),
+        (20, 'send_message', 'POST', '/send_message',
+         {'data': {'name': 'Bench', 'email': 'bench@bench.local', 'message': 'Hello'}}, REDIRECT)
+    ]
+}
+# Production-like blend: mostly anonymous browsing, some signed-in use and demos
+MIXES['mixed'] = (
+    [(weight * 5, *rest) for weight, *rest in MIXES['anonymous']] +
+    [(weight * 3, *rest) for weight, *rest in MIXES['signed_in'] if rest[0] != 'landing'] +
+    [(weight * 1, *rest) for weight, *rest in MIXES['demo']] +
+    [(5, 'send_message', *MIXES['support'][1][2:])]
+)
+SIGNED_IN_MIXES = {'signed_in', 'mixed'}
+
+
+class Client:
+    """
+    A keep-alive HTTP client with a hand-managed session cookie. The app sets
+    ``SESSION_COOKIE_SECURE``, which requests would refuse to send over the
+    bench's plain-HTTP connection.
+    """
+
+    def __init__(self, base_url, address=None):
+        self.base_url = base_url
+        self.http = requests.Session()
+        self.cookie = None
+        if address:
+            # Stands in for Heroku's router, so each client has its own rate-limit buckets
+            self.http.headers['X-Forwarded-For'] = address
+
+    def request(self, method, path, **kwargs):
+        headers = kwargs.pop('headers', {})
+        if self.cookie:
+            headers['Cookie'] = f"session={self.cookie}"
+        response = self.http.request(method, self.base_url + path, headers=headers,
+                                     allow_redirects=False, timeout=120, **kwargs)
+        if 'session' in response.cookies:
+            self.cookie = response.cookies['session']
+        self.http.cookies.clear()
+        return response
+
+    def log_in(self, user_number):
+        response = self.request('POST', '/login', data={'email': f"user{user_number}", 'password': 'bench'})
+        if response.status_code != 302 or not self.cookie:
+            raise RuntimeError(f"Bench login failed with HTTP {response.status_code}")
+        # Consume the "Login successful" flash so later pages aren't rendered with it
+        self.request('GET', '/dashboard').content
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _start_fakes(latency):
+    spec = ','.join(f"{name}={value}" for name, value in latency.items())
+    process = subprocess.Popen([sys.executable, '-m', 'bench.fakes', '--latency', spec],
+                               cwd=ROOT_DIR, stdout=subprocess.PIPE, text=True)
+    environment = {}
+    for line in process.stdout:
+        if not line.startswith('export '):
+            break
+        name, _, value = line[len('export '):].strip().partition('=')
+        environment[name] = value
+        if name == 'SECRET_KEY':
+            break
+    return process, environment
+
+
+def _start_app(environment, port, workers, gunicorn_args, state_dir, rate_limit):
+    env = dict(os.environ, **environment)
+    env.update({
+        'RATE_LIMIT_ENABLED': '1' if rate_limit else '0',
+        'RATE_LIMIT_PATH': os.path.join(state_dir, 'rate-limit.sqlite3'),
+        'TRANSCRIPT_CACHE_PATH': os.path.join(state_dir, 'transcript.cache'),
+        'USER_CACHE_PATH': os.path.join(state_dir, 'user-cache.sqlite3'),
+        'USAGE_LEDGER_PATH': os.path.join(state_dir, 'usage.sqlite3'),
+        'MAIL_SPOOL_DIR': os.path.join(state_dir, 'outbox'),
+        'BOILERPLATE_CACHE_DIR': os.path.join(state_dir, 'boilerplates'),
+        # The repos live on GitHub; don't clone them in the middle of a measurement
+        'BOILERPLATE_PREBUILD': '0',
+        'PYTHONUNBUFFERED': '1'
+    })
+    command = [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f"127.0.0.1:{port}"]
+    if workers:
+        command += ['--workers', str(workers)]
+    command += gunicorn_args
+    log = open(os.path.join(state_dir, 'gunicorn.log'), 'w')
+    return subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _wait_until_ready(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            if requests.get(base_url + '/', timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"App did not come up within {timeout}s")
+
+
+def _client_loop(base_url, mix, signed_in, index, seed, stop_at, record_from, samples):
+    rng = random.Random(seed + index)
+    weights = [entry[0] for entry in mix]
+    client = Client(base_url, address=f"10.0.{index // 250}.{index % 250 + 1}")
+    if signed_in:
+        client.log_in(index + 1)
+
+    while time.monotonic() < stop_at:
+        _, route, method, path, kwargs, accepted = rng.choices(mix, weights)[0]
+        started = time.monotonic()
+        try:
+            response = client.request(method, path, **kwargs)
+            # Read the whole body, including streamed ones, before stopping the clock
+            for _ in response.iter_content(65536):
+                pass
+            ok = response.status_code in accepted
+        except requests.RequestException:
+            ok = False
+        finished = time.monotonic()
+        if started >= record_from:
+            samples.append((route, finished - started, ok))
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank method
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarise(samples, duration):
+    """Per-route (and overall) request count, errors, throughput and latency percentiles in ms."""
+    by_route = {}
+    for route, latency, ok in samples:
+        by_route.setdefault(route, []).append((latency, ok))
+    by_route['ALL'] = [(latency, ok) for _, latency, ok in samples]
+
+    results = {}
+    for route, entries in sorted(by_route.items()):
+        latencies = sorted(latency for latency, _ in entries)
+        results[route] = {
+            'requests': len(entries),
+            'errors': sum(1 for _, ok in entries if not ok),
+            'rps': round(len(entries) / duration, 2),
+            'p50_ms': round(_percentile(latencies, 0.50) * 1000, 1),
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 1),
+            'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1)
+        }
+    return results
+
+
+def run(mix='mixed', concurrency=16, duration=30, warmup=5, latency=None, workers=None,
+        gunicorn_args=(), seed=1, rate_limit=False):
+    latency = latency or dict(DEFAULT_LATENCY)
+    state_dir = tempfile.mkdtemp(prefix='sourcebox-bench-')
+    fakes, environment = _start_fakes(latency)
+    port = _free_port()
+    app = _start_app(environment, port, workers, list(gunicorn_args), state_dir, rate_limit)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_ready(base_url, app)
+        samples = []
+        record_from = time.monotonic() + warmup
+        stop_at = record_from + duration
+        clients = [
+            threading.Thread(target=_client_loop, daemon=True, args=(
+                base_url, MIXES[mix], mix in SIGNED_IN_MIXES, index, seed, stop_at, record_from, samples))
+            for index in range(concurrency)
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+    finally:
+        app.terminate()
+        fakes.terminate()
+        app.wait(timeout=30)
+        fakes.wait(timeout=30)
+
+    return {
+        'meta': {
+            'mix': mix,
+            'concurrency': concurrency,
+            'duration': duration,
+            'workers': workers,
+            'gunicorn_args': list(gunicorn_args),
+            'rate_limit': rate_limit,
+            'latency': latency,
+            'commit': _git_commit(),
+            'machine': _machine(),
+            'gunicorn_log': os.path.join(state_dir, 'gunicorn.log')
+        },
+        'routes': summarise(samples, duration)
+    }
+
+
+def _machine():
+    return {
+        'platform': platform.platform(),
+        'processor': platform.machine(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version()
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (subprocess.SubprocessError, OSError):
+        return None
+
+
+def _delta(new, old):
+    if not old:
+        return ''
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+def format_report(result, baseline=None):
+    meta = result['meta']
+    lines = [
+        f"mix={meta['mix']} concurrency={meta['concurrency']} duration={meta['duration']}s "
+        f"commit={meta['commit']}",
+        f"{'route':<24}{'reqs':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    ]
+    old_routes = (baseline or {}).get('routes', {})
+    for route, stats in result['routes'].items():
+        lines.append(
+            f"{route:<24}{stats['requests']:>8}{stats['errors']:>6}{stats['rps']:>9.1f}"
+            f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+        )
+        old = old_routes.get(route)
+        if old:
+            lines.append(
+                f"{'  vs baseline':<24}{'':>8}{'':>6}{_delta(stats['rps'], old['rps']):>9}"
+                f"{_delta(stats['p50_ms'], old['p50_ms']):>10}{_delta(stats['p95_ms'], old['p95_ms']):>10}"
+                f"{_delta(stats['p99_ms'], old['p99_ms']):>10}"
+            )
+    return '\n'.join(lines)
+
+
+def regressions(result, baseline, threshold):
+    """Routes whose p95 grew, or throughput fell, by more than ``threshold`` percent."""
+    found = []
+    for route, stats in result['routes'].items():
+        old = baseline.get('routes', {}).get(route)
+        if not old:
+            continue
+        if old['p95_ms'] and (stats['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 > threshold:
+            found.append(f"{route}: p95 {old['p95_ms']}ms -> {stats['p95_ms']}ms")
+        if old['rps'] and (old['rps'] - stats['rps']) / old['rps'] * 100 > threshold:
+            found.append(f"{route}: {old['rps']} -> {stats['rps']} req/s")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the website against local upstream fakes.")
+    parser.add_argument('--mix', choices=sorted(MIXES), default='mixed')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30, help="measured seconds")
+    parser.add_argument('--warmup', type=float, default=5, help="unmeasured seconds before recording")
+    parser.add_argument('--latency', default='', help="per-upstream seconds, e.g. lambda=0.08,llm=0.5")
+    parser.add_argument('--workers', type=int, help="gunicorn workers (default: gunicorn's own config)")
+    parser.add_argument('--gunicorn-arg', action='append', default=[], help="extra gunicorn argument")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--rate-limit', action='store_true',
+                        help="keep the per-client rate limits on (off by default so runs measure throughput)")
+    parser.add_argument('--save', help="write the results as a baseline JSON file")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    parser.add_argument('--fail-over', type=float,
+                        help="with --compare, exit 1 if any route regresses by more than this percent")
+    args = parser.parse_args(argv)
+
+    result = run(args.mix, args.concurrency, args.duration, args.warmup, parse_latency(args.latency),
+                 args.workers, args.gunicorn_arg, args.seed, args.rate_limit)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['meta']['mix'] != args.mix:
+            print(f"warning: baseline mix is {baseline['meta']['mix']!r}", file=sys.stderr)
+    print(format_report(result, baseline))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.save}")
+
+    if baseline is not None and args.fail_over is not None:
+        found = regressions(result, baseline, args.fail_over)
+        if found:
+            print("Regressions:\n  " + '\n  '.join(found), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import os
+
+# Nearly every request waits on the auth Lambda, the SourceBox API or OpenAI,
+# so each worker process serves many requests at once on threads. A sync
+# worker would spend its whole dyno share blocked on sockets.
+#
+#   gthread (default)  WEB_CONCURRENCY processes x GUNICORN_THREADS threads
+#   gevent             WEB_CONCURRENCY processes x GUNICORN_WORKER_CONNECTIONS
+#                      greenlets; needs gevent installed
+#   sync               one request per process, as before
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+# Heroku sets WEB_CONCURRENCY from the dyno's memory (2 on a standard-1X)
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+# gunicorn quietly turns a sync worker into gthread when threads > 1
+threads = int(os.getenv('GUNICORN_THREADS', '8' if worker_class == 'gthread' else '1'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '100'))
+
+# Import the app once in the master and fork it, so workers boot fast and
+# share memory. Everything that holds sockets, threads or SQLite handles is
+# created lazily per process. gevent must patch the stdlib before the app is
+# imported, so it is never preloaded.
+preload_app = os.getenv('GUNICORN_PRELOAD', '0' if worker_class == 'gevent' else '1') == '1'
+
+# Heroku's router gives up on a request after 30s, and gives a dyno 30s to stop
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '25'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers now and then so a slow leak can't take a dyno down; the jitter
+# keeps them from all restarting at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+# Heroku's router already logs every request; set to '-' for gunicorn's own access log
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
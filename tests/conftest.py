@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# Enough configuration for the website package to import without a .env, with
+# every shared cache and spool file kept out of the real temp locations
+STATE_DIR = tempfile.mkdtemp(prefix='sourcebox-tests-')
+for name, value in {
+    'AWS_ACCESS_KEY_ID': 'test',
+    'AWS_SECRET_ACCESS_KEY': 'test',
+    'AWS_REGION': 'us-east-1',
+    'SECRET_KEY': 'test',
+    'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+    'RATE_LIMIT_PATH': os.path.join(STATE_DIR, 'rate-limit.sqlite3'),
+    'USER_CACHE_PATH': os.path.join(STATE_DIR, 'user-cache.sqlite3'),
+    'USAGE_LEDGER_PATH': os.path.join(STATE_DIR, 'usage.sqlite3'),
+    'TRANSCRIPT_CACHE_PATH': os.path.join(STATE_DIR, 'transcript.cache'),
+    'DOCS_CACHE_PATH': os.path.join(STATE_DIR, 'docs.cache'),
+    'MAIL_SPOOL_DIR': os.path.join(STATE_DIR, 'outbox'),
+    'BOILERPLATE_CACHE_DIR': os.path.join(STATE_DIR, 'boilerplates'),
+    'BOILERPLATE_PREBUILD': '0'
+}.items():
+    os.environ.setdefault(name, value)
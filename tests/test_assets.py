@@ -0,0 +1,92 @@
+import gzip
+import json
+import pytest
+from flask import Flask, render_template_string
+from website import assets
+
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    static = tmp_path / 'static'
+    (static / 'css').mkdir(parents=True)
+    (static / 'css' / 'site.css').write_text('body { color: red; }\n' * 50)
+    (static / 'robots.bin').write_bytes(b'\x00\x01')
+    dist = tmp_path / 'dist'
+    monkeypatch.setattr(assets, 'DIST_DIR', str(dist))
+    monkeypatch.setattr(assets, 'MANIFEST_PATH', str(dist / 'manifest.json'))
+    # Bundles are covered by test_bundles; here only the per-file pipeline runs
+    monkeypatch.setattr(assets, 'build_bundles', lambda static_dir: {})
+    monkeypatch.setattr(assets, '_manifest', {})
+    return static
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    assets.init_app(app)
+    return app
+
+
+def test_build_fingerprints_and_precompresses_text_files(static_dir):
+    manifest = assets.build(str(static_dir))
+    css_path = manifest['css/site.css']['path']
+    dist = static_dir.parent / 'dist'
+
+    assert css_path.startswith('css/site.') and css_path.endswith('.css')
+    assert gzip.decompress((dist / f"{css_path}.gz").read_bytes()) == (static_dir / 'css' / 'site.css').read_bytes()
+    # Binary files are copied but not compressed
+    assert not (dist / f"{manifest['robots.bin']['path']}.gz").exists()
+    assert json.loads((dist / 'manifest.json').read_text()) == manifest
+
+    # A changed file gets a new name, so old caches can never serve it
+    (static_dir / 'css' / 'site.css').write_text('body { color: blue; }')
+    assert assets.build(str(static_dir))['css/site.css']['path'] != css_path
+
+
+def test_asset_urls_use_the_manifest_once_built(static_dir, app):
+    with app.test_request_context():
+        assets.load_manifest()
+        assert assets.asset_url('css/site.css') == '/static/css/site.css'
+
+        assets.build(str(static_dir))
+        assets.load_manifest()
+        url = assets.asset_url('css/site.css')
+        assert url.startswith('/assets/css/site.') and url != '/assets/css/site.css'
+        assert render_template_string("{{ asset_url('css/site.css') }}") == url
+
+
+def test_assets_are_served_precompressed_and_immutable(static_dir, app):
+    assets.build(str(static_dir))
+    assets.load_manifest()
+    client = app.test_client()
+    with app.test_request_context():
+        url = assets.asset_url('css/site.css')
+
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.mimetype == 'text/css'
+    assert 'immutable' in compressed.headers['Cache-Control'] and 'max-age=31536000' in compressed.headers['Cache-Control']
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    compressed.close()
+
+    plain = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers and plain.data.startswith(b'body { color: red; }')
+    plain.close()
+
+    assert client.get('/assets/css/missing.css').status_code == 404
+
+
+def test_images_get_responsive_variants(static_dir, app):
+    image = pytest.importorskip('PIL.Image')
+    (static_dir / 'images').mkdir()
+    image.new('RGB', (700, 350), 'white').save(static_dir / 'images' / 'hero.png')
+
+    entry = assets.build(str(static_dir))['images/hero.png']
+    webp = [variant for variant in entry['variants'] if variant['type'] == 'image/webp']
+    assert entry['width'] == 700 and [variant['width'] for variant in webp] == [320, 640, 700]
+
+    assets.load_manifest()
+    with app.test_request_context():
+        html = str(assets.responsive_image('images/hero.png', alt='Hero', class_='w-100'))
+    assert html.startswith('<picture>') and 'type="image/webp"' in html and '640w' in html
+    assert 'alt="Hero"' in html and 'class="w-100"' in html
@@ -0,0 +1,126 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+import pytest
+from bench import fakes
+from website.sourcebox import assistant
+
+openai = pytest.importorskip('openai')
+
+
+class FakeOpenAI(fakes.OpenAIHandler):
+    """bench's fake OpenAI, noting when a client hangs up mid-stream."""
+    latency = 0
+    token_latency = 0.01
+    aborted = threading.Event()
+
+    def do_POST(self):
+        try:
+            super().do_POST()
+        except (BrokenPipeError, ConnectionResetError):
+            FakeOpenAI.aborted.set()
+
+
+@pytest.fixture(scope='module')
+def completions_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOpenAI)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def streams(completions_url, monkeypatch):
+    """Point the assistant at the fake and collect every stream it opens."""
+    FakeOpenAI.aborted.clear()
+    client = openai.OpenAI(api_key='test', base_url=f"{completions_url}/v1", max_retries=0)
+    monkeypatch.setattr(assistant, '_client', client)
+    opened = []
+    create = client.chat.completions.create
+
+    def tracking_create(**kwargs):
+        stream = create(**kwargs)
+        if kwargs.get('stream'):
+            close = stream.close
+            stream.closed = False
+
+            def tracking_close():
+                stream.closed = True
+                close()
+            stream.close = tracking_close
+            opened.append(stream)
+        return stream
+    monkeypatch.setattr(client.chat.completions, 'create', tracking_create)
+    return opened
+
+
+def _parse(frames):
+    events = []
+    for frame in frames:
+        lines = dict(line.split(': ', 1) for line in frame.strip().split('\n'))
+        events.append((lines.get('event'), json.loads(lines['data'])))
+    return events
+
+
+def test_stream_sends_token_frames_then_done(streams):
+    usage = []
+    events = _parse(assistant.stream_events('Hi', on_usage=lambda *tokens: usage.append(tokens)))
+
+    assert [data['delta'] for event, data in events[:-1]] == fakes.COMPLETION_TOKENS
+    assert all(event is None for event, _ in events[:-1])
+    assert events[-1] == ('done', {})
+    assert usage == [(12, len(fakes.COMPLETION_TOKENS))]
+    assert streams[0].closed and not FakeOpenAI.aborted.is_set()
+
+
+def test_stream_reports_a_failed_start_as_an_error_event(completions_url, monkeypatch):
+    # The fake only serves /v1/chat/completions, so this answers 404
+    monkeypatch.setattr(assistant, '_client', openai.OpenAI(api_key='test', base_url=f"{completions_url}/missing", max_retries=0))
+    events = _parse(assistant.stream_events('Hi'))
+
+    assert len(events) == 1 and events[0][0] == 'error'
+    assert events[0][1]['error']
+
+
+def test_failing_usage_callback_does_not_break_the_stream(streams):
+    def on_usage(prompt_tokens, completion_tokens):
+        raise RuntimeError("ledger unavailable")
+
+    events = _parse(assistant.stream_events('Hi', on_usage=on_usage))
+    assert events[-1] == ('done', {})
+
+
+def test_client_disconnect_closes_the_upstream_stream(streams):
+    events = assistant.stream_events('Hi')
+    assert json.loads(next(events).split('data: ', 1)[1]) == {'delta': fakes.COMPLETION_TOKENS[0]}
+
+    # What the WSGI server does when the browser goes away
+    events.close()
+    assert streams[0].closed
+    assert FakeOpenAI.aborted.wait(5)
+
+
+def test_chat_assistant_route_streams_events(streams):
+    from website import create_app
+    app = create_app()
+    response = app.test_client().post('/chat_assistant', json={'message': 'Hi', 'stream': True})
+    assert response.status_code == 200 and response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    frames = response.get_data(as_text=True).split('\n\n')[:-1]
+    response.close()
+    events = _parse(frames)
+    assert ''.join(data['delta'] for _, data in events[:-1]) == ''.join(fakes.COMPLETION_TOKENS)
+    assert events[-1] == ('done', {})
+
+
+def test_chat_assistant_route_disconnect_closes_the_upstream_stream(streams):
+    from website import create_app
+    app = create_app()
+    response = app.test_client().post('/chat_assistant', json={'message': 'Hi', 'stream': True}, buffered=False)
+    next(response.response)
+    response.close()
+    assert streams[0].closed
+    assert FakeOpenAI.aborted.wait(5)
@@ -0,0 +1,119 @@
+import os
+import time
+import zipfile
+import threading
+import subprocess
+import pytest
+from website.sourcebox.boilerplates import BoilerplateCache
+
+
+def git(*args, cwd=None):
+    subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True,
+                   env=dict(os.environ, GIT_AUTHOR_NAME='t', GIT_AUTHOR_EMAIL='t@t', GIT_COMMITTER_NAME='t',
+                            GIT_COMMITTER_EMAIL='t@t'))
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """A local bare repo with one commit, and a function that pushes another."""
+    bare = tmp_path / 'remote.git'
+    work = tmp_path / 'work'
+    git('init', '--bare', '-q', str(bare))
+    git('init', '-q', str(work))
+    counter = {'n': 0}
+
+    def commit():
+        counter['n'] += 1
+        (work / 'README.md').write_text(f"version {counter['n']}\n")
+        git('add', '.', cwd=work)
+        git('commit', '-q', '-m', f"v{counter['n']}", cwd=work)
+        git('push', '-q', str(bare), 'HEAD:refs/heads/master', cwd=work)
+
+    commit()
+    git('symbolic-ref', 'HEAD', 'refs/heads/master', cwd=bare)
+    return str(bare), commit
+
+
+def make_cache(tmp_path, remote_path, **kwargs):
+    options = dict(refresh_interval=0, prebuild=False)
+    options.update(kwargs)
+    return BoilerplateCache({'demo': remote_path}, str(tmp_path / 'cache'), **options)
+
+
+def count_builds(cache):
+    builds = []
+    original = cache._build
+
+    def build(*args, **kwargs):
+        builds.append(args)
+        return original(*args, **kwargs)
+
+    cache._build = build
+    return builds
+
+
+def test_builds_a_zip_once_and_reuses_it(tmp_path, remote):
+    cache = make_cache(tmp_path, remote[0])
+    builds = count_builds(cache)
+
+    archive = cache.get('demo')
+    assert archive.download_name == 'demo_repo.zip'
+    with zipfile.ZipFile(archive.path) as zf:
+        assert zf.read('demo_repo/README.md') == b"version 1\n"
+        assert not any('/.git/' in name for name in zf.namelist())
+
+    assert cache.get('demo').path == archive.path
+    # A fresh instance (another worker, or a restart) finds it on disk
+    assert make_cache(tmp_path, remote[0]).get('demo').path == archive.path
+    assert len(builds) == 1
+
+
+def test_concurrent_workers_share_one_build(tmp_path, remote):
+    # Separate instances have separate thread locks, so only the file lock keeps this to one clone
+    workers = [make_cache(tmp_path, remote[0]) for _ in range(4)]
+    builds = [count_builds(worker) for worker in workers]
+    results = []
+    threads = [threading.Thread(target=lambda w=w: results.append(w.get('demo').path)) for w in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(results)) == 1
+    assert sum(len(b) for b in builds) == 1
+
+
+def test_refresh_rebuilds_and_keeps_the_old_archive_for_the_grace_period(tmp_path, remote):
+    remote_path, commit = remote
+    cache = make_cache(tmp_path, remote_path, grace_period=60)
+    old = cache.get('demo')
+    commit()
+
+    new = cache.refresh('demo')
+    assert new.commit != old.commit
+    assert cache.get('demo').path == new.path
+    assert os.path.exists(old.path)
+
+    cache.grace_period = 0
+    cache._prune('demo')
+    assert not os.path.exists(old.path)
+    assert os.path.exists(new.path)
+
+
+def test_refresh_is_a_no_op_when_the_head_has_not_moved(tmp_path, remote):
+    cache = make_cache(tmp_path, remote[0])
+    builds = count_builds(cache)
+    archive = cache.get('demo')
+
+    assert cache.refresh('demo').path == archive.path
+    assert len(builds) == 1
+
+
+def test_start_prebuilds_in_the_background(tmp_path, remote):
+    cache = make_cache(tmp_path, remote[0], prebuild=True)
+    cache.start()
+
+    deadline = time.monotonic() + 30
+    while cache._current('demo') is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert cache._current('demo') is not None
@@ -0,0 +1,104 @@
+import json
+import pytest
+from flask import Flask, render_template_string
+from website import assets
+from website.assets import purge_css
+
+
+def test_purge_keeps_only_selectors_the_page_uses():
+    css = '.btn{color:red}.modal{display:none}.btn,.carousel{margin:0}body{margin:0}'
+    assert purge_css(css, {'btn'}) == '.btn{color:red}.btn{margin:0}body{margin:0}'
+
+
+def test_purge_ignores_classes_inside_not_and_checks_attributes():
+    css = '.nav:not(.disabled){color:red}[data-toggle]{cursor:pointer}[hidden]{display:none}'
+    assert purge_css(css, {'nav', 'hidden'}) == '.nav:not(.disabled){color:red}[hidden]{display:none}'
+
+
+def test_purge_recurses_into_media_queries_and_keeps_other_at_rules():
+    css = '@charset "utf-8";@media (min-width:768px){.col{float:left}.unused{float:right}}@font-face{font-family:x}'
+    assert purge_css(css, {'col'}) == '@charset "utf-8";@media (min-width:768px){.col{float:left}}@font-face{font-family:x}'
+
+
+@pytest.fixture(scope='module')
+def bundles(tmp_path_factory):
+    # Build from the real static files and templates into a scratch dist
+    dist = tmp_path_factory.mktemp('dist')
+    patch = pytest.MonkeyPatch()
+    patch.setattr(assets, 'DIST_DIR', str(dist))
+    entries = assets.build_bundles()
+    patch.undo()
+    return dist, entries
+
+
+def test_every_bundle_is_built_with_its_critical_css(bundles):
+    dist, entries = bundles
+    assert set(entries) == {f"bundles/{name}{extension}" for name in assets.BUNDLES for extension in ('.css', '.js')}
+    for name in assets.BUNDLES:
+        entry = entries[f"bundles/{name}.css"]
+        css = (dist / entry['path']).read_text()
+        assert (dist / f"{entry['path']}.gz").exists()
+        assert entry['critical'] and len(entry['critical']) < len(css)
+        assert '</' not in entry['critical']
+
+
+def test_bundles_drop_rules_for_classes_no_page_uses(bundles):
+    dist, entries = bundles
+    with open(f"{assets.STATIC_DIR}/vendor/bootstrap/bootstrap.min.css") as f:
+        full = f.read()
+    css = (dist / entries['bundles/base.css']['path']).read_text()
+    assert len(css) < len(full)
+    assert '.table-striped' in full and '.table-striped' not in css
+    # Kept because Bootstrap's scripts add it at runtime
+    assert '.modal-static' in css and '.navbar' in css
+
+
+def test_page_bundles_only_load_jquery_when_asked(bundles):
+    dist, entries = bundles
+    assert '/*! jQuery v' not in (dist / entries['bundles/base.js']['path']).read_text()
+    assert '/*! jQuery v' in (dist / entries['bundles/landing.js']['path']).read_text()
+
+
+@pytest.fixture
+def app(bundles, monkeypatch):
+    dist, entries = bundles
+    monkeypatch.setattr(assets, 'DIST_DIR', str(dist))
+    monkeypatch.setattr(assets, 'MANIFEST_PATH', str(dist / 'manifest.json'))
+    (dist / 'manifest.json').write_text(json.dumps(entries))
+    monkeypatch.setattr(assets, '_manifest', {})
+    app = Flask(__name__)
+    assets.init_app(app)
+    app.add_url_rule('/page', 'page', lambda: render_template_string(
+        "{{ bundle_styles('landing') }}{{ bundle_scripts('landing') }}"
+    ))
+    app.add_url_rule('/data', 'data', lambda: {'ok': True})
+    return app
+
+
+def test_bundle_tags_inline_critical_css_and_preload_the_rest(app, bundles):
+    _, entries = bundles
+    response = app.test_client().get('/page')
+    html = response.get_data(as_text=True)
+    css_url = f"/assets/{entries['bundles/landing.css']['path']}"
+    js_url = f"/assets/{entries['bundles/landing.js']['path']}"
+
+    assert html.startswith(f"<style>{entries['bundles/landing.css']['critical']}</style>")
+    assert f'<link rel="preload" href="{css_url}" as="style"' in html
+    assert f'<noscript><link rel="stylesheet" href="{css_url}"></noscript>' in html
+    assert f'<script defer src="{js_url}"></script>' in html
+    assert response.headers['Link'] == f"<{css_url}>; rel=preload; as=style, <{js_url}>; rel=preload; as=script"
+
+
+def test_only_html_responses_get_preload_links(app):
+    assert 'Link' not in app.test_client().get('/data').headers
+
+
+def test_unbuilt_bundles_fall_back_to_the_separate_files(monkeypatch):
+    monkeypatch.setattr(assets, '_manifest', {})
+    app = Flask(__name__, static_folder=assets.STATIC_DIR)
+    with app.test_request_context():
+        styles = str(assets.bundle_styles('landing'))
+        scripts = str(assets.bundle_scripts('landing'))
+        assert assets.preload_link_header() is None
+    assert styles.count('<link rel="stylesheet"') == len(assets.BASE_STYLES)
+    assert scripts.startswith(f'<script defer src="/static/{assets.JQUERY}">') and 'js/landing.js' in scripts
@@ -0,0 +1,163 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from flask import Blueprint, Flask
+from website.cache.memory import MemoryCache
+from website.sourcebox import demo_cache as demo_cache_module, proxy
+from website.sourcebox.demo_cache import CachedResult, DemoResultCache, result_key
+
+
+@pytest.fixture
+def cache():
+    return DemoResultCache(MemoryCache(max_entries=16))
+
+
+def test_claim_makes_one_leader_and_hands_others_its_event(cache):
+    entry, fill, event = cache.claim('k', 60)
+    assert entry is None and event is None and fill is not None
+
+    entry, other_fill, waiter_event = cache.claim('k', 60)
+    assert entry is None and other_fill is None
+    assert waiter_event is fill.event and not waiter_event.is_set()
+
+    fill.headers = {'Content-Type': 'text/plain'}
+    fill.complete(b'answer')
+    assert waiter_event.is_set()
+
+    entry, fill, event = cache.claim('k', 60)
+    assert fill is None and event is None
+    assert entry.body == b'answer' and entry.headers == {'Content-Type': 'text/plain'}
+
+
+def test_abandon_wakes_waiters_and_frees_the_key(cache):
+    _, fill, _ = cache.claim('k', 60)
+    _, _, event = cache.claim('k', 60)
+
+    fill.abandon()
+    assert event.is_set()
+    assert cache.get('k') is None
+    # The next request becomes the new leader
+    assert cache.claim('k', 60)[1] is not None
+
+
+def test_a_stale_fill_does_not_release_a_newer_leader(cache):
+    _, first, _ = cache.claim('k', 60)
+    first.abandon()
+    _, second, _ = cache.claim('k', 60)
+
+    first.abandon()
+    assert cache.claim('k', 60)[2] is second.event
+
+
+def test_oversized_bodies_are_not_kept(cache, monkeypatch):
+    monkeypatch.setattr(demo_cache_module, 'DEMO_CACHE_MAX_BODY', 4)
+    _, fill, _ = cache.claim('k', 60)
+    fill.complete(b'too long')
+    assert cache.get('k') is None
+
+
+def test_result_key_ignores_whitespace_but_not_encoding():
+    assert result_key('rag', {'prompt': ' hello\n world '}, 'gzip') == result_key('rag', {'prompt': 'hello world'}, 'gzip')
+    assert result_key('rag', {'prompt': 'hello'}, 'gzip') != result_key('rag', {'prompt': 'hello'}, 'identity')
+
+
+class FakeUpstream(BaseHTTPRequestHandler):
+    calls = 0
+    release = None
+
+    def do_POST(self):
+        type(self).calls += 1
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.release.wait(5)
+        body = b'{"answer": "42"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    FakeUpstream.calls = 0
+    FakeUpstream.release = threading.Event()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeUpstream)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(proxy, 'LLM_API_URL', f"http://127.0.0.1:{server.server_port}")
+    yield FakeUpstream
+    FakeUpstream.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def app(cache, monkeypatch):
+    monkeypatch.setattr(proxy, 'demo_cache', cache)
+    blueprint = Blueprint('demo', __name__)
+    proxy.register_proxy_routes(blueprint, [{
+        'path': '/demo',
+        'endpoint': 'demo',
+        'upstream': '/demo',
+        'method': 'POST',
+        'validate': proxy.require_prompt,
+        'rate_limit': None,
+        'cache_ttl': 60
+    }])
+    app = Flask(__name__)
+    app.register_blueprint(blueprint)
+    return app
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def _post(app, results):
+    response = app.test_client().post('/demo', json={'prompt': 'same question'})
+    results.append((response.status_code, response.get_data()))
+    response.close()
+
+
+def test_identical_requests_share_one_upstream_call(app, cache, upstream):
+    results = []
+    leader = threading.Thread(target=_post, args=(app, results))
+    leader.start()
+    # Wait until the leader has claimed the key before sending the followers
+    _wait_for(lambda: cache._in_flight)
+    followers = [threading.Thread(target=_post, args=(app, results)) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    upstream.release.set()
+    for thread in [leader] + followers:
+        thread.join(10)
+
+    assert upstream.calls == 1
+    assert results == [(200, b'{"answer": "42"}')] * 5
+    assert isinstance(cache.get(result_key('demo', {'prompt': 'same question'}, 'identity')), CachedResult)
+
+
+def test_waiters_stop_waiting_after_the_coalesce_timeout(app, cache, upstream, monkeypatch):
+    monkeypatch.setattr(proxy, 'DEMO_COALESCE_WAIT', 0.2)
+    results = []
+    leader = threading.Thread(target=_post, args=(app, results))
+    leader.start()
+    _wait_for(lambda: cache._in_flight)
+
+    # The leader is still stuck upstream, so the waiter gives up and makes its own call
+    follower = threading.Thread(target=_post, args=(app, results))
+    follower.start()
+    _wait_for(lambda: upstream.calls == 2)
+    upstream.release.set()
+    leader.join(10)
+    follower.join(10)
+
+    assert upstream.calls == 2
+    assert [status for status, _ in results] == [200, 200]
@@ -0,0 +1,92 @@
+import pytest
+from website.cache.mapped import MappedFileCache
+from website.sourcebox import documentation
+from website.sourcebox.documentation import DocsLibrary, HELP_PAGE, compile_page, source_hash
+
+pytest.importorskip('markdown')
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+    (docs / '10-getting-started.md').write_text('# Getting Started\n\nIntro.\n\n## Install\n\nRun it.\n')
+    (docs / '20-pack-man.md').write_text('# Pack Man\n\n## Usage\n\n### Flags\n')
+    (docs / 'help.md').write_text('# Help\n\nAsk us.\n')
+    return docs
+
+
+@pytest.fixture
+def compiled(monkeypatch):
+    """Slugs passed to the Markdown compiler, in order."""
+    slugs = []
+    compile = documentation.compile_page
+
+    def tracking_compile(slug, source):
+        slugs.append(slug)
+        return compile(slug, source)
+    monkeypatch.setattr(documentation, 'compile_page', tracking_compile)
+    return slugs
+
+
+def make_library(docs_dir, tmp_path):
+    return DocsLibrary(str(docs_dir), MappedFileCache(str(tmp_path / 'pages.cache'), check_interval=0))
+
+
+def test_pages_are_compiled_once_then_read_from_the_cache(docs_dir, tmp_path, compiled):
+    assert make_library(docs_dir, tmp_path).load() == 3
+
+    # The next boot, or another worker, only reads the cache
+    library = make_library(docs_dir, tmp_path)
+    assert library.load() == 0
+    assert compiled == ['getting-started', 'pack-man', 'help']
+    assert library.page('pack-man').title == 'Pack Man'
+
+
+def test_an_edit_recompiles_only_that_page(docs_dir, tmp_path, compiled):
+    library = make_library(docs_dir, tmp_path)
+    library.load()
+    old_hash = source_hash((docs_dir / '20-pack-man.md').read_bytes())
+
+    (docs_dir / '20-pack-man.md').write_text('# Pack Man\n\n## Usage\n\nNew text.\n')
+    assert library.load() == 1
+    assert compiled[-1] == 'pack-man'
+    assert 'New text.' in library.page('pack-man').html
+    # The page compiled from the old source is gone
+    assert library.cache.get(old_hash, namespace='pack-man') is None
+
+
+def test_sections_are_ordered_and_exclude_the_help_page(docs_dir, tmp_path):
+    library = make_library(docs_dir, tmp_path)
+    library.load()
+    assert [page.slug for page in library.sections()] == ['getting-started', 'pack-man']
+    assert library.page(HELP_PAGE).title == 'Help'
+
+
+def test_compiled_page_has_its_title_and_slug_prefixed_toc():
+    page = compile_page('pack-man', b'# Pack Man\n\n## Usage\n\n### Flags\n\n#### Too deep\n')
+    assert page.title == 'Pack Man' and '<h1' not in page.html
+    assert page.toc == [
+        {'id': 'pack-man-usage', 'name': 'Usage', 'level': 2},
+        {'id': 'pack-man-flags', 'name': 'Flags', 'level': 3}
+    ]
+    assert 'id="pack-man-usage"' in page.html
+    # Without a heading the slug becomes the title
+    assert compile_page('pack-man', b'Just text.').title == 'Pack Man'
+
+
+def test_documentation_routes_serve_the_loaded_pages():
+    from website import create_app
+    client = create_app().test_client()
+    sections = documentation.docs_library.sections()
+    assert sections
+
+    response = client.get('/documentation')
+    assert response.status_code == 200
+    assert all(f'id="{page.toc[0]["id"]}"' in response.get_data(as_text=True) for page in sections if page.toc)
+    response.close()
+
+    response = client.get('/documentation/help')
+    assert response.status_code == 200
+    assert documentation.docs_library.page(HELP_PAGE).html in response.get_data(as_text=True)
+    response.close()
@@ -0,0 +1,64 @@
+import os
+import runpy
+import tempfile
+import pytest
+import requests
+from bench import run as bench
+
+CONFIG_PATH = os.path.join(bench.ROOT_DIR, 'gunicorn.conf.py')
+
+GUNICORN_VARIABLES = ('GUNICORN_WORKER_CLASS', 'GUNICORN_THREADS', 'GUNICORN_PRELOAD', 'WEB_CONCURRENCY')
+
+
+@pytest.fixture
+def load_config(monkeypatch):
+    for name in GUNICORN_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+
+    def load(**environment):
+        for name, value in environment.items():
+            monkeypatch.setenv(name, value)
+        return runpy.run_path(CONFIG_PATH)
+    return load
+
+
+def test_defaults_are_preloaded_gthread_workers(load_config):
+    config = load_config()
+    assert config['worker_class'] == 'gthread'
+    assert config['threads'] == 8
+    assert config['workers'] == 2
+    assert config['preload_app'] is True
+    assert config['timeout'] == 30 and config['graceful_timeout'] < config['timeout']
+
+
+def test_gevent_is_never_preloaded(load_config):
+    config = load_config(GUNICORN_WORKER_CLASS='gevent')
+    assert config['preload_app'] is False
+    assert config['threads'] == 1
+
+
+def test_sync_workers_stay_single_threaded(load_config):
+    assert load_config(GUNICORN_WORKER_CLASS='sync')['threads'] == 1
+
+
+def test_app_boots_under_gunicorn_with_the_config():
+    pytest.importorskip('gunicorn')
+    fakes, environment = bench._start_fakes({name: 0 for name in bench.DEFAULT_LATENCY})
+    state_dir = tempfile.mkdtemp(prefix='sourcebox-gunicorn-test-')
+    port = bench._free_port()
+    app = bench._start_app(environment, port, 2, ['--config', CONFIG_PATH], state_dir, rate_limit=False)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        bench._wait_until_ready(base_url, app)
+        for path in ('/documentation', '/updates', '/search.json?q=doc'):
+            assert requests.get(base_url + path, timeout=10).status_code == 200
+    finally:
+        app.terminate()
+        fakes.terminate()
+        app.wait(timeout=30)
+        fakes.wait(timeout=30)
+
+    with open(os.path.join(state_dir, 'gunicorn.log')) as f:
+        log = f.read()
+    assert 'Using worker: gthread' in log
+    assert 'Traceback' not in log
@@ -0,0 +1,131 @@
+import json
+import time
+import hmac
+import base64
+import hashlib
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from website.authentication import jwt_verifier as verifier_module
+from website.authentication.jwt_verifier import JWTVerifier, VALID, INVALID, UNDECIDED
+
+SECRET = 'test-secret-that-is-long-enough-for-hs256'
+
+
+@pytest.fixture(scope='module')
+def rsa_key():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode('ascii')
+    return private_key, public_pem
+
+
+def claims(**overrides):
+    data = {'sub': 'user-1', 'exp': int(time.time()) + 600}
+    data.update(overrides)
+    return data
+
+
+def b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def test_disabled_verifier_defers_everything():
+    assert JWTVerifier(secret=None, public_key=None, jwks_url=None).verify('anything') == (UNDECIDED, None)
+
+
+def test_hs256_valid_expired_and_forged():
+    verifier = JWTVerifier(secret=SECRET, public_key=None, jwks_url=None, algorithms=['HS256'], leeway=0)
+
+    verdict, decoded = verifier.verify(jwt.encode(claims(), SECRET, algorithm='HS256'))
+    assert verdict == VALID and decoded['sub'] == 'user-1'
+    assert verifier.verify(jwt.encode(claims(exp=int(time.time()) - 60), SECRET, algorithm='HS256'))[0] == INVALID
+    assert verifier.verify(jwt.encode(claims(), 'some-other-secret-entirely-and-long-enough', algorithm='HS256'))[0] == INVALID
+
+
+def test_opaque_tokens_and_missing_exp_go_to_the_lambda():
+    verifier = JWTVerifier(secret=SECRET, public_key=None, jwks_url=None, algorithms=['HS256'])
+
+    assert verifier.verify('not-a-jwt')[0] == UNDECIDED
+    no_exp = jwt.encode({'sub': 'user-1'}, SECRET, algorithm='HS256')
+    assert verifier.verify(no_exp)[0] == UNDECIDED
+
+
+def test_audience_and_issuer_are_enforced():
+    verifier = JWTVerifier(secret=SECRET, public_key=None, jwks_url=None, algorithms=['HS256'],
+                           audience='sourcebox', issuer='https://auth.example')
+
+    good = jwt.encode(claims(aud='sourcebox', iss='https://auth.example'), SECRET, algorithm='HS256')
+    assert verifier.verify(good)[0] == VALID
+    assert verifier.verify(jwt.encode(claims(aud='other', iss='https://auth.example'), SECRET, algorithm='HS256'))[0] == INVALID
+    assert verifier.verify(jwt.encode(claims(aud='sourcebox', iss='https://evil'), SECRET, algorithm='HS256'))[0] == INVALID
+
+
+def test_rs256_with_a_public_key(rsa_key):
+    private_key, public_pem = rsa_key
+    verifier = JWTVerifier(secret=None, public_key=public_pem, jwks_url=None, algorithms=['RS256'])
+
+    assert verifier.verify(jwt.encode(claims(), private_key, algorithm='RS256'))[0] == VALID
+
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    assert verifier.verify(jwt.encode(claims(), other_key, algorithm='RS256'))[0] == INVALID
+
+
+def test_refuses_hs256_signed_with_the_public_key(rsa_key):
+    # Algorithm confusion: an attacker HMAC-signs with the (public) RSA key as the secret
+    _, public_pem = rsa_key
+    verifier = JWTVerifier(secret=None, public_key=public_pem, jwks_url=None, algorithms=['RS256'])
+
+    header = b64(json.dumps({'alg': 'HS256', 'typ': 'JWT'}).encode())
+    payload = b64(json.dumps(claims()).encode())
+    signature = hmac.new(public_pem.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+    forged = f"{header}.{payload}.{b64(signature)}"
+
+    assert verifier.verify(forged)[0] == INVALID
+
+
+def test_refuses_unsigned_tokens(rsa_key):
+    _, public_pem = rsa_key
+    verifier = JWTVerifier(secret=None, public_key=public_pem, jwks_url=None, algorithms=['RS256'])
+
+    header = b64(json.dumps({'alg': 'none', 'typ': 'JWT'}).encode())
+    payload = b64(json.dumps(claims()).encode())
+
+    assert verifier.verify(f"{header}.{payload}.")[0] != VALID
+
+
+class FakeJWKSResponse:
+    def __init__(self, document):
+        self.document = document
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.document
+
+
+def test_jwks_keys_are_looked_up_by_kid_and_fetches_are_rate_limited(rsa_key, monkeypatch):
+    private_key, _ = rsa_key
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update(kid='key-1', use='sig', alg='RS256')
+    fetches = []
+
+    def get(url):
+        fetches.append(url)
+        return FakeJWKSResponse({'keys': [jwk]})
+
+    monkeypatch.setattr(verifier_module.http_client, 'get', get)
+    verifier = JWTVerifier(secret=None, public_key=None, jwks_url='http://auth/jwks', algorithms=['RS256'])
+
+    token = jwt.encode(claims(), private_key, algorithm='RS256', headers={'kid': 'key-1'})
+    assert verifier.verify(token)[0] == VALID
+    assert verifier.verify(token)[0] == VALID
+
+    unknown = jwt.encode(claims(), private_key, algorithm='RS256', headers={'kid': 'key-2'})
+    assert verifier.verify(unknown)[0] == UNDECIDED
+    assert verifier.verify(unknown)[0] == UNDECIDED
+    # One fetch at start; the unknown kid is inside the minimum gap so doesn't refetch
+    assert fetches == ['http://auth/jwks']
@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import threading
+import subprocess
+import socketserver
+import pytest
+from website import mail_outbox
+from website.mail_outbox import MailOutbox
+
+
+class FakeSmtp(socketserver.StreamRequestHandler):
+    """Accepts every message, or answers DATA with ``data_reply`` when it is set."""
+    data_reply = None
+    delivered = []
+
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        self._reply('220 test ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self._reply('250 test')
+            elif command == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if line in (b'.\r\n', b''):
+                        break
+                    lines.append(line)
+                if self.data_reply:
+                    self._reply(self.data_reply)
+                else:
+                    FakeSmtp.delivered.append(b''.join(lines))
+                    self._reply('250 Queued')
+            elif command == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('250 OK')
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+@pytest.fixture
+def smtp():
+    FakeSmtp.data_reply = None
+    FakeSmtp.delivered = []
+    server = _Server(('127.0.0.1', 0), FakeSmtp)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def outbox(tmp_path, smtp, monkeypatch):
+    # Drive the sender by hand; only the end-to-end test runs the real thread
+    monkeypatch.setattr(MailOutbox, '_ensure_worker', lambda self: None)
+    outbox = MailOutbox(str(tmp_path), host='127.0.0.1', port=smtp.server_address[1],
+                        username='site@example.com', starttls=False)
+    yield outbox
+    outbox._disconnect()
+
+
+def _spool(outbox, state):
+    return sorted(os.listdir(os.path.join(outbox.spool_dir, state)))
+
+
+def _read(outbox, state, name):
+    with open(os.path.join(outbox.spool_dir, state, name)) as f:
+        return json.load(f)
+
+
+def test_sender_thread_delivers_enqueued_mail(tmp_path, smtp):
+    outbox = MailOutbox(str(tmp_path), host='127.0.0.1', port=smtp.server_address[1],
+                        username='site@example.com', starttls=False)
+    outbox.enqueue('Hello', 'First message')
+
+    deadline = time.monotonic() + 5
+    while not FakeSmtp.delivered and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(FakeSmtp.delivered) == 1 and b'Subject: Hello' in FakeSmtp.delivered[0]
+    assert outbox.pending_count() == 0 and _spool(outbox, 'sending') == []
+
+
+def test_each_message_is_claimed_by_one_worker(outbox):
+    for index in range(3):
+        outbox.enqueue(f"Message {index}", 'body')
+    other_worker = MailOutbox(outbox.spool_dir)
+
+    claimed = outbox._claim_batch()
+    assert len(claimed) == 3
+    assert other_worker._claim_batch() == []
+    assert all(name.endswith(f".{os.getpid()}") for name in _spool(outbox, 'sending'))
+
+
+def test_claim_skips_mail_that_is_backing_off(outbox):
+    message_id = outbox.enqueue('Later', 'body')
+    message = _read(outbox, 'pending', f"{message_id}.json")
+    message['next_attempt_at'] = time.time() + 60
+    outbox._write(os.path.join(outbox.spool_dir, 'pending', f"{message_id}.json"), message)
+
+    assert outbox._claim_batch() == []
+    assert outbox.pending_count() == 1
+
+
+def test_transient_failure_requeues_the_batch_with_backoff(outbox):
+    first = outbox.enqueue('First', 'body')
+    second = outbox.enqueue('Second', 'body')
+    FakeSmtp.data_reply = '451 Try again later'
+
+    before = time.time()
+    assert outbox._send_batch() is False
+    assert _spool(outbox, 'sending') == [] and _spool(outbox, 'failed') == []
+    assert _spool(outbox, 'pending') == sorted([f"{first}.json", f"{second}.json"])
+
+    # Exactly one message was tried; the other went back untouched
+    messages = [_read(outbox, 'pending', name) for name in _spool(outbox, 'pending')]
+    tried = [message for message in messages if message['attempts']]
+    assert len(tried) == 1
+    assert tried[0]['next_attempt_at'] >= before + 2 * mail_outbox.MAIL_POLL_INTERVAL
+
+    # Once the server recovers and the backoff has passed, both are delivered
+    FakeSmtp.data_reply = None
+    tried[0]['next_attempt_at'] = 0
+    outbox._write(os.path.join(outbox.spool_dir, 'pending', f"{tried[0]['id']}.json"), tried[0])
+    while outbox._send_batch():
+        pass
+    assert len(FakeSmtp.delivered) == 2 and outbox.pending_count() == 0
+
+
+def test_permanent_failure_moves_mail_to_failed(outbox):
+    message_id = outbox.enqueue('Bounced', 'body')
+    FakeSmtp.data_reply = '550 No such user'
+
+    outbox._send_batch()
+    assert outbox.pending_count() == 0
+    assert _spool(outbox, 'failed') == [f"{message_id}.json"]
+    assert _read(outbox, 'failed', f"{message_id}.json")['attempts'] == 1
+
+
+def test_mail_gives_up_after_max_attempts(outbox, monkeypatch):
+    monkeypatch.setattr(mail_outbox, 'MAIL_MAX_ATTEMPTS', 2)
+    message_id = outbox.enqueue('Flaky', 'body')
+    FakeSmtp.data_reply = '451 Try again later'
+
+    outbox._send_batch()
+    assert outbox.pending_count() == 1
+    message = _read(outbox, 'pending', f"{message_id}.json")
+    message['next_attempt_at'] = 0
+    outbox._write(os.path.join(outbox.spool_dir, 'pending', f"{message_id}.json"), message)
+
+    outbox._send_batch()
+    assert outbox.pending_count() == 0
+    assert _read(outbox, 'failed', f"{message_id}.json")['attempts'] == 2
+
+
+def test_orphans_of_dead_workers_are_requeued(outbox):
+    dead = subprocess.Popen(['true'])
+    dead.wait()
+    outbox._ensure_dirs()
+    sending = os.path.join(outbox.spool_dir, 'sending')
+    for name, pid in (('orphan.json', dead.pid), ('mine.json', os.getpid())):
+        outbox._write(os.path.join(sending, f"{name}.{pid}"), {'id': name})
+
+    outbox._requeue_orphans()
+    assert _spool(outbox, 'pending') == ['orphan.json']
+    assert _spool(outbox, 'sending') == [f"mine.json.{os.getpid()}"]
@@ -0,0 +1,69 @@
+import time
+import pytest
+from website.cache.mapped import MappedFileCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'values.cache')
+
+
+def test_writes_are_seen_by_other_handles_on_the_file(path):
+    writer = MappedFileCache(path)
+    reader = MappedFileCache(path, check_interval=0)
+    assert reader.get('k') is None
+
+    writer.set('k', {'value': 1})
+    assert reader.get('k') == {'value': 1}
+    writer.set('k', {'value': 2})
+    assert reader.get('k') == {'value': 2}
+
+
+def test_entries_expire_after_their_ttl(path, monkeypatch):
+    cache = MappedFileCache(path, default_ttl=10)
+    cache.set('default', 1)
+    cache.set('short', 2, ttl=1)
+    cache.set('skipped', 3, ttl=0)
+
+    later = time.time() + 5
+    monkeypatch.setattr('website.cache.mapped.time.time', lambda: later)
+    assert cache.get('default') == 1 and cache.get('short') is None and cache.get('skipped') is None
+
+    # The next rewrite drops the expired entry from the file
+    cache.set('other', 4)
+    assert len(cache) == 2
+
+
+def test_namespaces_are_separate(path):
+    cache = MappedFileCache(path)
+    cache.set('k', 'a', namespace='one')
+    cache.set('k', 'b', namespace='two')
+
+    assert cache.invalidate('one') == 1
+    assert cache.get('k', namespace='one') is None and cache.get('k', namespace='two') == 'b'
+    assert cache.delete('k', namespace='two') and not cache.delete('k', namespace='two')
+    cache.set('k', 'c', namespace='two')
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_oldest_values_are_evicted_past_max_bytes(path):
+    cache = MappedFileCache(path, max_bytes=25)
+    for key in ('a', 'b', 'c'):
+        cache.set(key, 'x' * 8)
+
+    assert cache.get('a') is None
+    assert cache.get('b') == 'x' * 8 and cache.get('c') == 'x' * 8
+    # A value that could never fit isn't stored
+    cache.set('huge', 'x' * 100)
+    assert cache.get('huge') is None and cache.get('c') == 'x' * 8
+
+
+def test_a_corrupt_file_reads_as_empty(path):
+    with open(path, 'wb') as f:
+        f.write(b'not a cache file at all')
+    cache = MappedFileCache(path)
+    assert cache.get('k') is None and len(cache) == 0
+
+    cache.set('k', 'v')
+    assert cache.get('k') == 'v'
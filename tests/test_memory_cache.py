@@ -0,0 +1,72 @@
+import pytest
+from website.cache import memory
+from website.cache.memory import MemoryCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(memory.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = MemoryCache(default_ttl=10)
+    cache.set('default', 1)
+    cache.set('short', 2, ttl=1)
+    cache.set('skipped', 3, ttl=0)
+
+    clock[0] += 5
+    assert cache.get('default') == 1 and cache.get('short') is None and cache.get('skipped') is None
+    clock[0] += 5
+    assert cache.get('default') is None
+    assert cache.stats.to_dict()['expirations'] == 2
+
+
+def test_namespaces_are_separate():
+    cache = MemoryCache()
+    cache.set('k', 'a', namespace='one')
+    cache.set('k', 'b', namespace='two')
+
+    assert cache.invalidate('one') == 1
+    assert cache.get('k', namespace='one') is None and cache.get('k', namespace='two') == 'b'
+    assert cache.delete('k', namespace='two') and not cache.delete('k', namespace='two')
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = MemoryCache(max_entries=2, policy='lru')
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_fifo_evicts_the_oldest_written():
+    cache = MemoryCache(max_entries=2, policy='fifo')
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('a') is None and cache.get('b') == 2
+
+
+def test_lfu_evicts_the_least_read_but_never_the_new_entry():
+    cache = MemoryCache(max_entries=2, policy='lfu')
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1 and cache.get('c') == 3
+
+
+@pytest.mark.parametrize('policy', memory.POLICIES)
+def test_zero_entries_stores_nothing(policy):
+    cache = MemoryCache(max_entries=0, policy=policy)
+    cache.set('a', 1)
+    assert len(cache) == 0 and cache.get('a') is None
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        MemoryCache(policy='random')
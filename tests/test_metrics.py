@@ -0,0 +1,53 @@
+import os
+import pytest
+from flask import Flask
+from website import metrics
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    metrics.init_app(app)
+
+    @app.route('/items/<int:item_id>')
+    def item(item_id):
+        return 'ok'
+    return app
+
+
+def test_metrics_are_closed_without_a_token(app, monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_TOKEN', None)
+    assert app.test_client().get('/metrics').status_code == 503
+
+
+def test_metrics_require_the_bearer_token(app, monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_TOKEN', 'scrape')
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape'}).status_code == 200
+
+
+def test_requests_are_recorded_per_route_and_worker(app, monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_TOKEN', 'scrape')
+    client = app.test_client()
+    client.get('/items/1')
+    client.get('/items/2')
+
+    body = client.get('/metrics', headers={'Authorization': 'Bearer scrape'}).get_data(as_text=True)
+    series = f'sourcebox_http_request_duration_seconds_count{{worker="{os.getpid()}",route="/items/<int:item_id>",method="GET",status="200"}}'
+    count = [line for line in body.splitlines() if line.startswith(series)]
+    assert count and int(count[0].split()[-1]) >= 2
+    assert f'sourcebox_http_requests_in_flight{{worker="{os.getpid()}"}}' in body
+
+
+def test_spans_record_the_outcome():
+    with pytest.raises(RuntimeError):
+        with metrics.span('test', 'explode'):
+            raise RuntimeError()
+    with metrics.span('test', 'fine'):
+        pass
+
+    body = metrics.render()
+    assert 'kind="test",operation="explode",outcome="error"' in body
+    assert 'kind="test",operation="fine",outcome="ok"' in body
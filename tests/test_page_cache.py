@@ -0,0 +1,62 @@
+import gzip
+import pytest
+from flask import Flask, flash, get_flashed_messages
+from flask_login import LoginManager
+from website import page_cache as page_cache_module
+from website.page_cache import cached_page
+
+
+@pytest.fixture
+def app(monkeypatch):
+    page_cache_module.page_cache.clear()
+    monkeypatch.setattr(page_cache_module, 'preload_link_header', lambda: None)
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    LoginManager(app).user_loader(lambda user_id: None)
+    app.renders = 0
+
+    @app.route('/page')
+    @cached_page
+    def page():
+        app.renders += 1
+        return f"<p>{' '.join(get_flashed_messages())} rendered</p>" * 50
+
+    @app.route('/flash')
+    def set_flash():
+        flash('Saved')
+        return 'ok'
+
+    yield app
+    page_cache_module.page_cache.clear()
+
+
+def test_repeat_visits_are_served_from_the_cache(app):
+    client = app.test_client()
+    first = client.get('/page', headers={'Accept-Encoding': 'gzip'})
+    second = client.get('/page', headers={'Accept-Encoding': 'gzip'})
+
+    assert app.renders == 1
+    assert second.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(second.data) == gzip.decompress(first.data)
+    assert client.get('/page', headers={'If-None-Match': second.headers['ETag']}).status_code == 304
+
+
+def test_query_strings_bypass_the_cache(app):
+    client = app.test_client()
+    client.get('/page')
+    for index in range(3):
+        assert client.get(f"/page?{index}").status_code == 200
+
+    assert app.renders == 4
+    # The bypassed renders didn't displace the real entry
+    client.get('/page')
+    assert app.renders == 4
+
+
+def test_pages_with_flashed_messages_are_not_cached(app):
+    client = app.test_client()
+    client.get('/flash')
+    assert b'Saved rendered' in client.get('/page').data
+
+    assert b'Saved' not in client.get('/page').data
+    assert app.renders == 2
@@ -0,0 +1,96 @@
+import gzip
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from flask import Blueprint, Flask
+from website.sourcebox import proxy
+
+
+class FakeLlmApi(BaseHTTPRequestHandler):
+    """Echoes the JSON body gzipped on /echo and fails on /broken."""
+    received = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        FakeLlmApi.received.append((self.path, body, self.headers.get('Accept-Encoding')))
+        if self.path == '/broken':
+            data = b'model overloaded'
+            self.send_response(503)
+            self.send_header('Content-Type', 'text/plain')
+        else:
+            data = gzip.compress(json.dumps({'echo': body['prompt']}).encode('utf-8'))
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream_url(monkeypatch):
+    FakeLlmApi.received = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeLlmApi)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(proxy, 'LLM_API_URL', url)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def _route(path, upstream):
+    return {'path': path, 'endpoint': path.strip('/'), 'upstream': upstream, 'method': 'POST',
+            'validate': proxy.require_prompt, 'rate_limit': None}
+
+
+@pytest.fixture
+def client():
+    blueprint = Blueprint('demo', __name__)
+    proxy.register_proxy_routes(blueprint, [_route('/echo', '/echo'), _route('/broken', '/broken')])
+    app = Flask(__name__)
+    app.register_blueprint(blueprint)
+    return app.test_client()
+
+
+def test_body_is_relayed_without_decoding(client, upstream_url):
+    response = client.post('/echo', json={'prompt': 'hello'}, headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data)) == {'echo': 'hello'}
+    assert FakeLlmApi.received == [('/echo', {'prompt': 'hello'}, 'gzip')]
+
+
+def test_form_posts_are_accepted(client, upstream_url):
+    response = client.post('/echo', data={'prompt': 'from a form'})
+    assert response.status_code == 200
+    assert FakeLlmApi.received[0][1] == {'prompt': 'from a form'}
+
+
+@pytest.mark.parametrize('payload', [{}, {'prompt': '   '}, {'prompt': 42}])
+def test_invalid_prompts_never_reach_upstream(client, upstream_url, payload):
+    response = client.post('/echo', json=payload)
+    assert response.status_code == 400 and response.json == {'error': 'Prompt is required'}
+    assert FakeLlmApi.received == []
+
+
+def test_upstream_errors_are_wrapped(client, upstream_url):
+    response = client.post('/broken', json={'prompt': 'hello'})
+    assert response.status_code == 503
+    assert response.json == {'error': 'Failed to get a response from external API', 'details': 'model overloaded'}
+
+
+def test_unreachable_upstream_is_a_500(client, monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setattr(proxy, 'LLM_API_URL', f"http://127.0.0.1:{port}")
+
+    response = client.post('/echo', json={'prompt': 'hello'})
+    assert response.status_code == 500 and 'error' in response.json
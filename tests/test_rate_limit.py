@@ -0,0 +1,149 @@
+import threading
+import multiprocessing
+import pytest
+from flask import Flask, session
+from website import rate_limit
+from website.rate_limit import Limit, TokenBucketStore, rate_limited
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TokenBucketStore(str(tmp_path / 'buckets.sqlite3'))
+
+
+def test_bucket_allows_a_burst_then_refills(store, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limit.time, 'time', lambda: clock[0])
+    limit = Limit(2, 10)  # 2 per 10s
+
+    assert store.take('k', limit) == (True, 0)
+    assert store.take('k', limit) == (True, 0)
+    allowed, retry_after = store.take('k', limit)
+    assert not allowed and retry_after == pytest.approx(5)
+
+    clock[0] += 5
+    assert store.take('k', limit)[0]
+    assert not store.take('k', limit)[0]
+
+
+def test_take_all_spends_nothing_unless_every_bucket_has_a_token(store):
+    limit = Limit(1, 3600)
+    assert store.take('b', limit)[0]
+
+    assert not store.take_all(['a', 'b'], limit)[0]
+    # 'a' kept its token because 'b' was dry
+    assert store.take('a', limit)[0]
+
+
+def _take_many(path, count, results):
+    store = TokenBucketStore(path)
+    results.put(sum(store.take('shared', Limit(10, 3600))[0] for _ in range(count)))
+
+
+def test_workers_never_overspend_a_shared_bucket(tmp_path):
+    path = str(tmp_path / 'buckets.sqlite3')
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    processes = [context.Process(target=_take_many, args=(path, 10, results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert sum(results.get() for _ in processes) == 10
+
+
+def get(client, path):
+    # Guarded responses hold their concurrency slot until closed
+    response = client.get(path)
+    response.close()
+    return response
+
+
+@pytest.fixture
+def app(store, monkeypatch):
+    monkeypatch.setattr(rate_limit, 'bucket_store', store)
+    monkeypatch.setattr(rate_limit, '_slots', {})
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    release = threading.Event()
+    entered = threading.Event()
+
+    @app.route('/login')
+    def login():
+        session['access_token'] = 'token-1'
+        return 'ok'
+
+    @app.route('/limited')
+    @rate_limited('test', Limit(2, 3600), concurrency=1)
+    def limited():
+        return 'ok'
+
+    @app.route('/slow')
+    @rate_limited('test', Limit(2, 3600), concurrency=1)
+    def slow():
+        entered.set()
+        release.wait(5)
+        return 'ok'
+
+    app.release = release
+    app.entered = entered
+    return app
+
+
+def test_rejected_requests_do_not_spend_tokens(app, store):
+    client = app.test_client()
+    thread = threading.Thread(target=lambda: get(app.test_client(), '/slow'))
+    thread.start()
+    app.entered.wait(5)
+
+    # The single slot is taken: turned away as busy, without touching the buckets
+    busy = get(client, '/limited')
+    assert busy.status_code == 429 and 'busy' in busy.json['details']
+    app.release.set()
+    thread.join()
+
+    # The slow request spent one of two IP tokens; one is left
+    assert get(client, '/limited').status_code == 200
+    limited = get(client, '/limited')
+    assert limited.status_code == 429 and int(limited.headers['Retry-After']) > 0
+
+
+def test_session_bucket_running_dry_leaves_the_ip_bucket_alone(app, store):
+    client = app.test_client()
+    get(client, '/login')
+    session_key = [key for key in _keys(app, client) if ':session:' in key][0]
+    # Drain the session bucket directly
+    store.take(session_key, Limit(2, 3600))
+    store.take(session_key, Limit(2, 3600))
+
+    assert get(client, '/limited').status_code == 429
+    # A different client on the same IP still has the full IP allowance
+    other = app.test_client()
+    assert get(other, '/limited').status_code == 200
+    assert get(other, '/limited').status_code == 200
+
+
+def _keys(app, client):
+    with client.session_transaction() as stored:
+        token = stored['access_token']
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+        session['access_token'] = token
+        return rate_limit._client_keys('test')
+
+
+@pytest.mark.parametrize('value', ['10/0', '0/60', '-5/60', 'ten/60', '10/inf'])
+def test_invalid_limits_from_env_fall_back_to_the_default(value, monkeypatch):
+    default = Limit(3, 60)
+    monkeypatch.setenv('RATE_LIMIT_TEST', value)
+    assert Limit.from_env('RATE_LIMIT_TEST', default) is default
+
+
+def test_limit_from_env_reads_requests_per_seconds(monkeypatch):
+    monkeypatch.setenv('RATE_LIMIT_TEST', '20/10')
+    limit = Limit.from_env('RATE_LIMIT_TEST', Limit(3, 60))
+    assert limit.capacity == 20 and limit.rate == 2
+
+    # A missing period means per minute
+    monkeypatch.setenv('RATE_LIMIT_TEST', '30/')
+    assert Limit.from_env('RATE_LIMIT_TEST', Limit(3, 60)).rate == pytest.approx(0.5)
@@ -0,0 +1,72 @@
+import pytest
+from website.sourcebox import search_index as search_module
+from website.sourcebox.search_index import SearchIndex, edit_distance, template_text
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.add_page('DeepQuery', '/deepquery', 'Ask questions about your documents.')
+    index.add_page('Documentation', '/documentation', 'Guides for DeepQuery and Pack-Man.')
+    index.add_page('Pack-Man', '/pack-man', 'Package a repository for an LLM.')
+    return index
+
+
+def test_titles_outrank_body_text(index):
+    assert [result.url for result in index.search('deepquery')] == ['/deepquery', '/documentation']
+
+
+def test_prefixes_and_typos_still_match(index):
+    assert index.search('docu')[0].url == '/documentation'
+    assert index.search('repositroy')[0].url == '/pack-man'
+    assert index.search('zzz') == []
+
+
+def test_edit_distance_gives_up_past_the_limit():
+    assert edit_distance('search', 'serach', 1) == 1
+    assert edit_distance('search', 'sea', 1) == 2
+    assert edit_distance('search', 'speech', 1) == 2
+
+
+def test_template_text_drops_markup_and_jinja():
+    source = "{% block x %}<h1>Hi &amp; bye</h1><script>var a;</script>{{ value }}{% endblock %}"
+    assert template_text(source) == 'Hi & bye'
+
+
+def test_long_queries_are_capped(index, monkeypatch):
+    monkeypatch.setattr(search_module, 'SEARCH_MAX_TERMS', 3)
+    expanded = []
+    original = SearchIndex._expand
+    monkeypatch.setattr(SearchIndex, '_expand', lambda self, term: expanded.append(term) or original(self, term))
+
+    index.search(' '.join(['deepquery'] * 5 + [f"term{number}" for number in range(300)]))
+    # Repeats count once, and only the first terms are matched
+    assert expanded == ['deepquery', 'term0', 'term1']
+
+    expanded.clear()
+    index.search('x' * 10000 + ' deepquery')
+    assert expanded == ['x' * search_module.SEARCH_MAX_QUERY_LENGTH]
+
+
+@pytest.fixture(scope='module')
+def client():
+    from website import create_app
+    return create_app().test_client()
+
+
+def test_suggestion_limit_is_clamped(client):
+    for limit in (-5, 0):
+        response = client.get(f"/search.json?q=deepquery&limit={limit}")
+        assert response.status_code == 200 and len(response.json['results']) == 1
+    assert len(client.get('/search.json?q=deepquery&limit=100').json['results']) <= 20
+
+
+def test_suggestions_are_rate_limited(client):
+    from website import rate_limit
+    from website.rate_limit import Limit
+    key = 'search:ip:127.0.0.1'
+    # Drain this client's bucket directly
+    while rate_limit.bucket_store.take(key, Limit(120, 60))[0]:
+        pass
+    response = client.get('/search.json?q=deepquery')
+    assert response.status_code == 429 and 'Retry-After' in response.headers
@@ -0,0 +1,45 @@
+import sqlite3
+import pytest
+from website.cache.sqlite import SQLiteCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SQLiteCache(str(tmp_path / 'cache.sqlite3'), max_entries=2)
+
+
+def test_entries_are_namespaced_and_shared_between_handles(cache):
+    cache.set('k', {'value': 1}, namespace='a')
+    cache.set('k', {'value': 2}, namespace='b')
+    other = SQLiteCache(cache.path)
+
+    assert other.get('k', namespace='a') == {'value': 1}
+    assert cache.invalidate('a') == 1
+    assert other.get('k', namespace='a') is None and other.get('k', namespace='b') == {'value': 2}
+    assert cache.delete('k', namespace='b') and not cache.delete('k', namespace='b')
+
+
+def test_expired_entries_are_misses_and_trim_enforces_max_entries(cache):
+    cache.set('gone', 1, ttl=-1)
+    cache.set('stale', 1, ttl=0.000001)
+    for key in ('a', 'b', 'c'):
+        cache.set(key, key)
+
+    assert cache.get('gone') is None and cache.get('stale') is None
+    cache.trim()
+    assert len(cache) == 2 and cache.get('a') is None and cache.get('c') == 'c'
+
+
+def test_a_broken_cache_file_never_raises(tmp_path):
+    # A directory can't be opened as a database, so every statement fails
+    cache = SQLiteCache(str(tmp_path))
+    with pytest.raises(sqlite3.Error):
+        cache._connection()
+
+    cache.set('k', 'v')
+    assert cache.get('k') is None
+    assert cache.delete('k') is False
+    assert cache.invalidate('default') == 0
+    assert cache.clear() is None
+    assert len(cache) == 0
+    assert cache.trim() == 0
@@ -0,0 +1,26 @@
+import time
+from website.authentication.token_cache import TokenValidationCache
+
+
+def test_verdicts_expire_after_their_ttl():
+    cache = TokenValidationCache(ttl=60, negative_ttl=0.05, name='test_tokens_ttl')
+    cache.set('good', True)
+    cache.set('bad', False)
+    cache.set('fresh-login', True, ttl=0.05)
+
+    assert cache.get('good') is True
+    assert cache.get('bad') is False
+    time.sleep(0.1)
+    assert cache.get('bad') is None
+    assert cache.get('fresh-login') is None
+    assert cache.get('good') is True
+
+
+def test_invalidate_drops_one_token():
+    cache = TokenValidationCache(name='test_tokens_invalidate')
+    cache.set('a', True)
+    cache.set('b', True)
+    cache.invalidate('a')
+
+    assert cache.get('a') is None
+    assert cache.get('b') is True
@@ -0,0 +1,98 @@
+import os
+import fcntl
+import pytest
+import requests
+from website.cache.mapped import MappedFileCache
+from website.sourcebox import transcript_cache as transcript_module
+from website.sourcebox.transcript_cache import TranscriptCache
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.status_code = status_code
+        self.headers = {'Content-Type': 'application/json'}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Serves whatever ``upstream.body`` holds; None means the upstream is down."""
+    class Upstream:
+        body = '{"transcript": "hello"}'
+        calls = 0
+
+    def get(url, **kwargs):
+        Upstream.calls += 1
+        if Upstream.body is None:
+            raise requests.ConnectionError("upstream down")
+        return FakeResponse(Upstream.body)
+
+    monkeypatch.setattr(transcript_module.http_client, 'get', get)
+    return Upstream
+
+
+def make_cache(tmp_path, refresh_interval=0):
+    path = str(tmp_path / 'transcript.cache')
+    return TranscriptCache('http://llm/landing-transcript-example', MappedFileCache(path, check_interval=0),
+                           lock_path=f"{path}.refresh-lock", refresh_interval=refresh_interval)
+
+
+def test_fetched_once_then_served_from_disk(tmp_path, upstream):
+    cache = make_cache(tmp_path)
+    assert cache.get().body == '{"transcript": "hello"}'
+    assert cache.get().body == '{"transcript": "hello"}'
+
+    # Another worker, or the next boot, reads the stored copy
+    upstream.body = None
+    assert make_cache(tmp_path).get().body == '{"transcript": "hello"}'
+    assert upstream.calls == 1
+
+
+def test_failed_refresh_keeps_the_stored_copy(tmp_path, upstream):
+    cache = make_cache(tmp_path)
+    stored = cache.get()
+    upstream.body = None
+    assert cache.refresh() is stored
+    assert cache.get().etag == stored.etag
+
+
+def test_nothing_stored_and_upstream_down_is_none(tmp_path, upstream):
+    upstream.body = None
+    assert make_cache(tmp_path).get() is None
+
+
+def test_only_one_worker_refreshes_a_stale_copy(tmp_path, upstream):
+    cache = make_cache(tmp_path, refresh_interval=60)
+    cache.refresh()
+    data = cache.store.get('example')
+    cache.store.set('example', dict(data, fetched_at=data['fetched_at'] - 120))
+    upstream.body = '{"transcript": "new"}'
+
+    # Another worker holds the refresh lock, so this one leaves it to them
+    fd = os.open(cache.lock_path, os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    cache._refresh_once_across_workers()
+    os.close(fd)
+    assert upstream.calls == 1
+
+    cache._refresh_once_across_workers()
+    assert upstream.calls == 2 and cache.load().body == '{"transcript": "new"}'
+    # Fresh again, so a second pass doesn't refetch
+    cache._refresh_once_across_workers()
+    assert upstream.calls == 2
+
+
+def test_view_serves_the_transcript_conditionally(tmp_path, upstream, monkeypatch):
+    from website import create_app
+    cache = make_cache(tmp_path)
+    monkeypatch.setattr('website.sourcebox.views.transcript_cache', cache)
+    client = create_app().test_client()
+
+    upstream.body = None
+    assert client.get('/rag-api-transcript').status_code == 502
+
+    upstream.body = '{"transcript": "hello"}'
+    response = client.get('/rag-api-transcript')
+    assert response.status_code == 200 and response.json == {'transcript': 'hello'}
+    assert client.get('/rag-api-transcript', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
@@ -0,0 +1,130 @@
+from website.sourcebox import updates_feed
+from website.sourcebox.updates_feed import UpdatesCache
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200, headers=None):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self.payload
+
+
+def serve(monkeypatch, *payloads):
+    calls = []
+    responses = iter(payloads)
+
+    def get(url, params=None, headers=None):
+        calls.append(params)
+        return FakeResponse(next(responses))
+
+    monkeypatch.setattr(updates_feed.http_client, 'get', get)
+    return calls
+
+
+def entries(*ids):
+    return [{'id': i, 'title': f"Update {i}", 'content': "text"} for i in ids]
+
+
+def test_pages_newest_first_by_id(monkeypatch):
+    serve(monkeypatch, entries(3, 1, 2, 5, 4))
+    snapshot = UpdatesCache('http://api/list').get()
+
+    page, cursor = snapshot.page(limit=2)
+    assert [update['id'] for update in page] == [5, 4]
+    page, cursor = snapshot.page(cursor, limit=2)
+    assert [update['id'] for update in page] == [3, 2]
+    page, cursor = snapshot.page(cursor, limit=2)
+    assert [update['id'] for update in page] == [1]
+    assert cursor is None
+
+
+def test_refresh_asks_since_newest_id_and_merges(monkeypatch):
+    calls = serve(monkeypatch, entries(1, 2), entries(2, 3))
+    cache = UpdatesCache('http://api/list')
+    cache.get()
+    with cache._lock:
+        assert cache._refresh()
+
+    assert calls == [{}, {'since': 2}]
+    assert [update['id'] for update in cache.get().updates] == [1, 2, 3]
+
+
+def test_full_sync_replaces_the_copy(monkeypatch):
+    calls = serve(monkeypatch, entries(1, 2, 3), entries(1, 3))
+    cache = UpdatesCache('http://api/list', full_sync_interval=0)
+    cache.get()
+    with cache._lock:
+        cache._refresh()
+
+    assert calls == [{}, {}]
+    assert [update['id'] for update in cache.get().updates] == [1, 3]
+
+
+def test_missing_ids_keep_upstream_order_and_page_by_offset(monkeypatch):
+    payload = [{'title': 'B', 'content': ''}, {'title': 'A', 'content': ''}, {'title': 'C', 'content': ''}]
+    calls = serve(monkeypatch, payload, payload)
+    cache = UpdatesCache('http://api/list')
+    snapshot = cache.get()
+
+    assert not snapshot.keyed
+    page, cursor = snapshot.page(limit=2)
+    assert [update['title'] for update in page] == ['B', 'A']
+    page, cursor = snapshot.page(cursor, limit=2)
+    assert [update['title'] for update in page] == ['C']
+    assert cursor is None
+
+    # No usable cursor, so the next refresh fetches everything again
+    with cache._lock:
+        cache._refresh()
+    assert calls == [{}, {}]
+
+
+def test_mixed_id_types_are_not_sorted(monkeypatch):
+    serve(monkeypatch, [{'id': 2, 'title': 'x'}, {'id': 'a', 'title': 'y'}, {'title': 'z'}])
+    snapshot = UpdatesCache('http://api/list').get()
+
+    assert not snapshot.keyed
+    assert [update['title'] for update in snapshot.page()[0]] == ['x', 'y', 'z']
+
+
+def test_invalid_payload_is_not_cached(monkeypatch):
+    serve(monkeypatch, {'error': 'nope'})
+    assert UpdatesCache('http://api/list').get() is None
+
+
+def test_failed_first_load_is_not_retried_until_retry_interval(monkeypatch):
+    calls = []
+
+    def get(url, params=None, headers=None):
+        calls.append(params)
+        raise updates_feed.requests.ConnectionError("upstream down")
+
+    monkeypatch.setattr(updates_feed.http_client, 'get', get)
+    cache = UpdatesCache('http://api/list', retry_interval=60)
+    assert cache.get() is None
+    assert cache.get() is None
+    assert len(calls) == 1
+
+    serve(monkeypatch, entries(1))
+    cache._failed_at -= 60
+    assert [update['id'] for update in cache.get().updates] == [1]
+
+
+def test_a_page_showing_a_flash_is_not_revalidated(monkeypatch):
+    from website import create_app
+    serve(monkeypatch, entries(1, 2))
+    monkeypatch.setattr(updates_feed, 'updates_cache', UpdatesCache('http://api/list'))
+    monkeypatch.setattr('website.sourcebox.views.updates_cache', updates_feed.updates_cache)
+    client = create_app().test_client()
+
+    plain = client.get('/updates')
+    assert plain.headers.get('ETag') and client.get('/updates', headers={'If-None-Match': plain.headers['ETag']}).status_code == 304
+
+    with client.session_transaction() as session:
+        session['_flashes'] = [('message', 'Signed out')]
+    flashed = client.get('/updates', headers={'If-None-Match': plain.headers['ETag']})
+    assert flashed.status_code == 200 and b'Signed out' in flashed.data
+    assert 'ETag' not in flashed.headers
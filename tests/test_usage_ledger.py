@@ -0,0 +1,85 @@
+import time
+from website import usage_ledger as ledger_module
+from website.usage_ledger import UsageLedger
+from website.sourcebox import user_context
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def make_ledger(tmp_path, **kwargs):
+    return UsageLedger(str(tmp_path / 'usage.sqlite3'), **kwargs)
+
+
+def test_usage_counts_locally_without_a_flush_endpoint(tmp_path):
+    ledger = make_ledger(tmp_path, flush_path=None)
+    ledger.record(7, 100, 50)
+    ledger.record(7, 10, 5)
+
+    assert ledger.tokens_used(7) == 165
+    assert ledger.flush() == 0
+    assert ledger._flusher is None
+
+
+def test_reconcile_replaces_the_reported_total(tmp_path):
+    ledger = make_ledger(tmp_path, flush_path=None)
+    assert ledger.reconciled_at(7) is None
+    ledger.record(7, 100, 0)
+    # A row created by record() hasn't been reconciled yet
+    assert ledger.reconciled_at(7) is None
+
+    ledger.reconcile(7, 1000, time.time())
+    assert ledger.is_fresh(7)
+    assert ledger.tokens_used(7) == 1100
+
+
+def test_flush_sends_pending_and_keeps_later_usage(tmp_path, monkeypatch):
+    ledger = make_ledger(tmp_path, flush_interval=0, flush_path='/usage')
+    sent = []
+
+    def post(url, json=None, headers=None):
+        sent.append((url, json))
+        ledger.record(7, 1, 1)  # recorded while the flush is in flight
+        return FakeResponse(200)
+
+    monkeypatch.setattr(ledger_module.http_client, 'post', post)
+    ledger.record(7, 100, 50)
+
+    assert ledger.flush() == 1
+    assert sent[0][0].endswith('/usage')
+    assert sent[0][1] == {'usage': [{'user_id': '7', 'prompt_tokens': 100, 'completion_tokens': 50}]}
+    assert ledger.tokens_used(7) == 152
+    assert ledger.flush() == 1
+
+
+def test_failed_flush_keeps_deltas_pending(tmp_path, monkeypatch):
+    ledger = make_ledger(tmp_path, flush_interval=0, flush_path='/usage')
+    monkeypatch.setattr(ledger_module.http_client, 'post', lambda *a, **k: FakeResponse(404))
+    ledger.record(7, 100, 50)
+
+    assert ledger.flush() == 0
+    assert ledger.tokens_used(7) == 150
+
+
+def test_reconcile_token_usage_fetches_when_the_ledger_has_no_entry(tmp_path, monkeypatch):
+    ledger = make_ledger(tmp_path, flush_path=None)
+    monkeypatch.setattr(user_context, 'usage_ledger', ledger)
+    monkeypatch.setattr(user_context, '_fetch_token_usage', lambda headers: 2000000)
+
+    assert user_context.reconcile_token_usage(7, 'token')
+    assert ledger.over_free_limit(7, limit=1000000)
+
+
+def test_reconcile_token_usage_fails_closed_without_any_figure(tmp_path, monkeypatch):
+    ledger = make_ledger(tmp_path, flush_path=None)
+    monkeypatch.setattr(user_context, 'usage_ledger', ledger)
+    monkeypatch.setattr(user_context, '_fetch_token_usage', lambda headers: None)
+
+    assert not user_context.reconcile_token_usage(7, 'token')
+    ledger.reconcile(7, 10, time.time())
+    ledger._connection().execute("UPDATE usage_ledger SET reconciled_at = ?", (time.time() - 3600,))
+    assert not ledger.is_fresh(7)
+    # A stale figure is better than none when the backend is down
+    assert user_context.reconcile_token_usage(7, 'token')
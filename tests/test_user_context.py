@@ -0,0 +1,93 @@
+import multiprocessing
+import pytest
+from website.sourcebox import user_context
+from website.sourcebox.user_context import user_id_for_token, premium_status
+from website.user_cache import user_cache, token_key
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Answers the user lookups and records every URL asked for."""
+    calls = []
+    answers = {'/user/id': {'user_id': 'u-1'}, '/user/u-1/premium/status': {'premium_status': True}}
+
+    def get(url, headers=None, **kwargs):
+        calls.append(url)
+        path = url[len(user_context.API_URL):]
+        if headers != {'Authorization': 'Bearer token-1'} or path not in answers:
+            return FakeResponse({}, 401)
+        return FakeResponse(answers[path])
+
+    monkeypatch.setattr(user_context.http_client, 'get', get)
+    for key in ('u-1', token_key('token-1')):
+        user_cache.invalidate(key)
+    return calls
+
+
+def test_lookups_are_cached_after_the_first_call(backend):
+    assert user_id_for_token('token-1') == 'u-1'
+    assert premium_status('u-1', 'token-1') is True
+    assert len(backend) == 2
+
+    assert user_id_for_token('token-1') == 'u-1'
+    assert premium_status('u-1', 'token-1') is True
+    assert len(backend) == 2
+
+
+def test_failed_lookups_are_not_cached(backend):
+    assert user_id_for_token('token-2') is None
+    assert user_id_for_token('token-2') is None
+    assert len(backend) == 2
+
+
+def _warm_in_child():
+    # A forked worker opens its own connection to the shared file
+    user_cache.set('u-1', 'premium', True)
+
+
+def test_workers_share_cached_entries(backend):
+    user_cache.get('u-1', 'premium')  # open a connection in this process before forking
+    child = multiprocessing.get_context('fork').Process(target=_warm_in_child)
+    child.start()
+    child.join()
+
+    assert child.exitcode == 0
+    assert premium_status('u-1', 'token-1') is True
+    assert backend == []
+
+
+def test_internal_invalidation_forces_a_refetch(backend, monkeypatch):
+    from website import create_app
+    monkeypatch.setenv('INTERNAL_API_TOKEN', 'internal')
+    client = create_app().test_client()
+    premium_status('u-1', 'token-1')
+
+    response = client.post('/internal/user-cache/invalidate', json={'user_id': 'u-1', 'fields': ['premium']},
+                           headers={'Authorization': 'Bearer internal'})
+    assert response.status_code == 200 and response.json['removed'] == 1
+    premium_status('u-1', 'token-1')
+    assert len(backend) == 2
+
+
+def _use_pool_in_child(inherited):
+    import os
+    executor = user_context._get_executor()
+    assert executor is not inherited and user_context._executor_pid == os.getpid()
+    assert executor.submit(lambda: 42).result(timeout=5) == 42
+
+
+def test_forked_workers_get_their_own_lookup_pool():
+    inherited = user_context._get_executor()
+    child = multiprocessing.get_context('fork').Process(target=_use_pool_in_child, args=(inherited,))
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
@@ -4,11 +4,18 @@ from flask_login import LoginManager, current_user
 from dotenv import load_dotenv
 import os
 from os import path
+import logging
+import time
 import requests
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Identifies the running deploy; anything cached across requests should key on it
+RELEASE_ID = os.getenv('HEROKU_RELEASE_VERSION') or os.getenv('SOURCE_VERSION') or str(int(time.time()))
+
 # Database
 db = SQLAlchemy()
 DB_NAME = "database.db"
@@ -19,32 +26,70 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
     db.init_app(app)
 
+    # Per-route latency and upstream timings, exported at /metrics
+    from website import metrics
+    metrics.init_app(app)
+
     # Global template like base
     @app.context_processor
     def inject_user():
         return dict(current_user=current_user)
 
+    from website import http_client
     from website.sourcebox.views import views
     from website.authentication.auth import auth
     from website.services.services import service
+    from website.internal.internal import internal
+    from website.user_cache import user_cache
 
     app.register_blueprint(views, url_prefix='/')
     app.register_blueprint(auth, url_prefix='/')
     app.register_blueprint(service, url_prefix='/service')
+    app.register_blueprint(internal, url_prefix='/internal')
+
+    # Every cache the blueprints registered, with overrides from CACHES / CACHE_CONFIG
+    from website import cache
+    cache.init_app(app)
 
     create_database(app)
 
+    # Boilerplate archives are built in the background, not on the first download
+    from website.sourcebox import boilerplates
+    boilerplates.init_app(app)
+
+    # Fingerprinted, precompressed static assets (built by `python -m website.assets build`)
+    from website import assets
+    assets.init_app(app)
+
+    # Docs pages compiled from Markdown (by `python -m website.sourcebox.documentation build`)
+    from website.sourcebox import documentation
+    documentation.init_app(app)
+
+    # Index page titles, template text and docs once, rather than on every search
+    from website.sourcebox.search_index import build_search_index
+    build_search_index(app)
+
     login_manager = LoginManager()
     login_manager.login_view = 'auth.login'
     login_manager.init_app(app)
 
     @login_manager.user_loader
     def load_user(id):
+        # Profiles are shared across workers through the user cache
+        cached = user_cache.get(id, 'profile')
+        if cached is not None:
+            return User(*cached)
+
         api_url = os.getenv('API_URL')
         admin_token = os.getenv('ADMIN_TOKEN')
-        response = requests.get(f"{api_url}/users/{id}", headers={'Authorization': f'Bearer {admin_token}'})
+        try:
+            response = http_client.get(f"{api_url}/users/{id}", headers={'Authorization': f'Bearer {admin_token}'})
+        except requests.RequestException as e:
+            logger.error("Failed to load user %s: %s", id, e)
+            return None
         if response.status_code == 200:
             user_data = response.json()
+            user_cache.set(id, 'profile', [user_data['id'], user_data['email'], user_data['username']])
             return User(user_data['id'], user_data['email'], user_data['username'])
         return None
 
@@ -0,0 +1,505 @@
+import io
+import os
+import re
+import sys
+import glob
+import gzip
+import json
+import shutil
+import hashlib
+import logging
+import mimetypes
+from markupsafe import Markup, escape
+from flask import url_for, send_from_directory, request, abort, g
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip copies are produced without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(PACKAGE_DIR, 'static')
+TEMPLATE_GLOB = os.path.join(PACKAGE_DIR, '*', 'templates', '*.html')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt'}
+RESIZABLE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp'}
+RESPONSIVE_WIDTHS = (320, 640, 960, 1280)
+IMAGE_QUALITY = 80
+# AVIF encoding is slow at the default effort; 8 keeps the build quick with little size cost
+AVIF_SPEED = 8
+IMMUTABLE_MAX_AGE = 31536000
+DEFAULT_SIZES = "(max-width: 768px) 100vw, 50vw"
+
+# Preference order when the client accepts several encodings
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Every page gets Bootstrap, our stylesheet and the navbar search, served from
+# static/vendor rather than CDNs. jQuery is the slim build (no ajax/effects).
+BASE_STYLES = ('vendor/bootstrap/bootstrap.min.css', 'css/style.css')
+BASE_SCRIPTS = ('vendor/popper/popper.min.js', 'vendor/bootstrap/bootstrap.min.js', 'js/search.js')
+JQUERY = 'vendor/jquery/jquery.slim.min.js'
+
+# Page bundles: name -> (the page's own scripts, whether it needs jQuery). A
+# template picks one with {% set bundle = '<name>' %}; the rest use 'base'.
+BUNDLES = {
+    'base': ((), False),
+    'landing': (('js/landing.js',), True),
+    'content': (('js/content.js',), True),
+    'dashboard': (('js/dashboard.js',), True),
+    'premium_info': (('js/premium_info.js',), True),
+    'user_settings': (('js/user_settings.js',), True),
+    'learn_more': ((), True)
+}
+# Roughly one screen of a page's markup; CSS it needs is inlined into the page
+ABOVE_THE_FOLD_CHARS = 4000
+
+_BUNDLE_RE = re.compile(r"{%-?\s*set\s+bundle\s*=\s*['\"](\w+)['\"]\s*-?%}")
+_NAME_RE = re.compile(r"[A-Za-z_][\w-]*")
+_CLASS_SELECTOR_RE = re.compile(r"\.(-?[A-Za-z_][\w-]*)")
+_ATTRIBUTE_SELECTOR_RE = re.compile(r"\[\s*([A-Za-z_][\w-]*)")
+_PARENTHESES_RE = re.compile(r"\([^()]*\)")
+_SOURCE_MAP_RE = re.compile(r"(/\*# sourceMappingURL=[^*]*\*/|//# sourceMappingURL=\S+)\s*$")
+# At-rules whose block holds further rules rather than declarations
+_GROUPING_AT_RULES = ('@media', '@supports', '@container', '@layer')
+
+_manifest = {}
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _fingerprinted(relative_path, digest, extension=None):
+    stem, original_extension = os.path.splitext(relative_path)
+    return f"{stem}.{digest}{extension or original_extension.lower()}"
+
+
+def _write(relative_path, data):
+    path = os.path.join(DIST_DIR, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _write_compressed(relative_path, data):
+    _write(relative_path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(relative_path + '.br', brotli.compress(data, quality=11))
+
+
+def _image_variants(relative_path, source_path):
+    """Write WebP (and AVIF, if supported) copies at each responsive width."""
+    from PIL import Image, features
+
+    formats = [('webp', 'image/webp', '.webp', {})]
+    if features.check('avif'):
+        formats.insert(0, ('avif', 'image/avif', '.avif', {'speed': AVIF_SPEED}))
+
+    variants = []
+    with Image.open(source_path) as image:
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        original_width = image.width
+        widths = [width for width in RESPONSIVE_WIDTHS if width < original_width] + [original_width]
+        for width in widths:
+            height = round(image.height * width / original_width)
+            resized = image if width == original_width else image.resize((width, height), Image.LANCZOS)
+            for image_format, mime_type, extension, options in formats:
+                buffer = io.BytesIO()
+                resized.save(buffer, format=image_format.upper(), quality=IMAGE_QUALITY, **options)
+                data = buffer.getvalue()
+                stem, _ = os.path.splitext(relative_path)
+                variant_path = _fingerprinted(f"{stem}-{width}w{extension}", _digest(data))
+                _write(variant_path, data)
+                variants.append({'path': variant_path, 'width': width, 'type': mime_type})
+    return original_width, variants
+
+
+def _scan(css, i, stops):
+    """Index of the first character in ``stops`` at or after ``i``, outside strings, comments and brackets."""
+    depth = 0
+    while i < len(css):
+        char = css[i]
+        if char in '"\'':
+            i += 1
+            while i < len(css) and css[i] != char:
+                i += 2 if css[i] == '\\' else 1
+        elif css.startswith('/*', i):
+            i = css.find('*/', i + 2) + 1 or len(css)
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif depth == 0 and char in stops:
+            return i
+        i += 1
+    return len(css)
+
+
+def _parse_css(css, i=0):
+    """
+    Split a stylesheet into [(prelude, body)]: body is the declaration text
+    of a style rule, a nested list for @media and friends, or None for
+    statements such as @charset. Returns (rules, index after the block).
+    """
+    rules = []
+    while True:
+        while i < len(css) and (css[i].isspace() or css.startswith('/*', i)):
+            if css.startswith('/*!', i):
+                # Licence headers are kept
+                end = css.find('*/', i) + 2
+                rules.append((css[i:end], None))
+                i = end
+            elif css.startswith('/*', i):
+                i = css.find('*/', i) + 2
+            else:
+                i += 1
+        if i >= len(css) or css[i] == '}':
+            return rules, i + 1
+
+        end = _scan(css, i, '{;}')
+        prelude = css[i:end].strip()
+        if end >= len(css) or css[end] != '{':
+            rules.append((prelude, None))
+            i = end + 1 if end < len(css) and css[end] == ';' else end
+        elif prelude.lower().startswith(_GROUPING_AT_RULES):
+            children, i = _parse_css(css, end + 1)
+            rules.append((prelude, children))
+        else:
+            # Declarations, or keyframe steps for @keyframes; kept verbatim
+            depth, j = 1, end + 1
+            while depth:
+                j = _scan(css, j, '{}')
+                if j >= len(css):
+                    break
+                depth += 1 if css[j] == '{' else -1
+                j += 1
+            rules.append((prelude, css[end + 1:j - 1]))
+            i = j
+
+
+def _serialize_css(rules):
+    parts = []
+    for prelude, body in rules:
+        if body is None:
+            parts.append(prelude if prelude.startswith('/*') else prelude + ';')
+        elif isinstance(body, list):
+            inner = _serialize_css(body)
+            if inner:
+                parts.append(f"{prelude}{{{inner}}}")
+        else:
+            parts.append(f"{prelude}{{{body}}}")
+    return ''.join(parts)
+
+
+def _split_selectors(prelude):
+    selectors = []
+    while prelude:
+        end = _scan(prelude, 0, ',')
+        selectors.append(prelude[:end].strip())
+        prelude = prelude[end + 1:]
+    return selectors
+
+
+def _selector_used(selector, names):
+    # Classes inside :not(), :is() and the like don't have to be present for a match
+    while '(' in selector:
+        stripped = _PARENTHESES_RE.sub('', selector)
+        if stripped == selector:
+            break
+        selector = stripped
+    required = _CLASS_SELECTOR_RE.findall(selector) + _ATTRIBUTE_SELECTOR_RE.findall(selector)
+    return all(name in names for name in required)
+
+
+def purge_css(css, names):
+    """
+    Drop the selectors of ``css`` that need a class or attribute not in
+    ``names``, and rules left without selectors. At-rules are kept.
+    """
+    def purge(rules):
+        kept = []
+        for prelude, body in rules:
+            if isinstance(body, list):
+                kept.append((prelude, purge(body)))
+            elif body is None or prelude.startswith('@'):
+                kept.append((prelude, body))
+            else:
+                selectors = [selector for selector in _split_selectors(prelude) if _selector_used(selector, names)]
+                if selectors:
+                    kept.append((','.join(selectors), body))
+        return kept
+
+    return _serialize_css(purge(_parse_css(css)[0]))
+
+
+def _read_text(static_dir, relative_path):
+    with open(os.path.join(static_dir, relative_path), encoding='utf-8') as f:
+        return _SOURCE_MAP_RE.sub('', f.read())
+
+
+def _content_block(source):
+    start = source.find('{% block content %}')
+    return source[start:] if start >= 0 else source
+
+
+def _templates_by_bundle():
+    """{bundle: [template source]} for every template that extends base.html."""
+    bundles = {name: [] for name in BUNDLES}
+    for path in sorted(glob.glob(TEMPLATE_GLOB)):
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        if "extends 'base.html'" not in source and 'extends "base.html"' not in source:
+            continue
+        match = _BUNDLE_RE.search(source)
+        name = match.group(1) if match else 'base'
+        if name not in BUNDLES:
+            raise ValueError(f"{os.path.basename(path)} asks for unknown bundle {name!r}")
+        bundles[name].append(source)
+    return bundles
+
+
+def build_bundles(static_dir=STATIC_DIR):
+    """
+    Build one minified CSS and one JS file per page bundle, plus the CSS to
+    inline for its first screen. Returns manifest entries.
+
+    The CSS is Bootstrap and style.css without the rules for classes that
+    never appear in base.html, the bundle's templates or any script it
+    loads (Bootstrap's own scripts add classes like ``show`` at runtime).
+    The inlined part is the same CSS cut down to the classes in base.html
+    and, for single-page bundles, the first ABOVE_THE_FOLD_CHARS of the
+    page's content; the shared 'base' bundle inlines only the shell.
+    """
+    # Optional, like Pillow: without them bundles are built unminified
+    try:
+        import rcssmin
+        import rjsmin
+    except ImportError:
+        rcssmin = rjsmin = None
+        logger.warning("rcssmin/rjsmin are not installed; bundles will not be minified.")
+
+    with open(os.path.join(PACKAGE_DIR, 'sourcebox', 'templates', 'base.html'), encoding='utf-8') as f:
+        base_template = f.read()
+
+    styles = []
+    for relative_path in BASE_STYLES:
+        css = _read_text(static_dir, relative_path)
+        if rcssmin is not None and not relative_path.startswith('vendor/'):
+            css = rcssmin.cssmin(css)
+        styles.append(css)
+    stylesheet = '\n'.join(styles)
+
+    entries = {}
+    for name, templates in _templates_by_bundle().items():
+        own_scripts, needs_jquery = BUNDLES[name]
+        scripts = ((JQUERY,) if needs_jquery else ()) + BASE_SCRIPTS + own_scripts
+        script_sources = []
+        for relative_path in scripts:
+            source = _read_text(static_dir, relative_path)
+            if rjsmin is not None and not relative_path.startswith('vendor/'):
+                source = rjsmin.jsmin(source)
+            script_sources.append(source.strip())
+        javascript = ';\n'.join(script_sources).encode('utf-8')
+
+        script_names = set(_NAME_RE.findall(''.join(script_sources)))
+        page_names = set(_NAME_RE.findall(base_template + ''.join(templates))) | script_names
+        css = purge_css(stylesheet, page_names)
+        fold_sources = [] if name == 'base' else templates
+        fold_names = set(_NAME_RE.findall(base_template + ''.join(
+            _content_block(source)[:ABOVE_THE_FOLD_CHARS] for source in fold_sources
+        )))
+        critical = purge_css(css, fold_names)
+        if rcssmin is not None:
+            css = rcssmin.cssmin(css, keep_bang_comments=True)
+            critical = rcssmin.cssmin(critical)
+
+        for extension, data in (('.css', css.encode('utf-8')), ('.js', javascript)):
+            relative_path = f"bundles/{name}{extension}"
+            entry = entries[relative_path] = {'path': _fingerprinted(relative_path, _digest(data))}
+            _write(entry['path'], data)
+            _write_compressed(entry['path'], data)
+        # Inlined in a <style> element, which must not be closed early
+        entries[f"bundles/{name}.css"]['critical'] = critical.replace('</', '<\\/')
+        logger.info("Bundle %s: %s KB CSS (%s KB inlined), %s KB JS", name, len(css) // 1024,
+                    len(critical) // 1024, len(javascript) // 1024)
+    return entries
+
+
+def build(static_dir=STATIC_DIR):
+    """
+    Fingerprint every static file into ``static/dist`` and write the manifest.
+
+    Text assets also get ``.gz``/``.br`` siblings so they are served
+    precompressed, raster images get resized WebP/AVIF variants for
+    ``srcset``, and each page bundle is built. Returns the manifest.
+    """
+    # Pillow is optional and only needed here, so it stays out of worker boot
+    try:
+        import PIL
+    except ImportError:
+        PIL = None
+        logger.warning("Pillow is not installed; no resized image variants will be built.")
+
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != DIST_DIR]
+        for filename in sorted(files):
+            source_path = os.path.join(root, filename)
+            relative_path = os.path.relpath(source_path, static_dir).replace(os.sep, '/')
+            with open(source_path, 'rb') as f:
+                data = f.read()
+
+            entry = {'path': _fingerprinted(relative_path, _digest(data))}
+            _write(entry['path'], data)
+
+            extension = os.path.splitext(filename)[1].lower()
+            if extension in COMPRESSIBLE_EXTENSIONS:
+                _write_compressed(entry['path'], data)
+            if extension in RESIZABLE_EXTENSIONS and PIL is not None:
+                try:
+                    entry['width'], entry['variants'] = _image_variants(relative_path, source_path)
+                except OSError as e:
+                    logger.warning("Could not create variants for %s: %s", relative_path, e)
+            manifest[relative_path] = entry
+
+    manifest.update(build_bundles(static_dir))
+
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def load_manifest():
+    global _manifest
+    try:
+        with open(MANIFEST_PATH) as f:
+            _manifest = json.load(f)
+    except FileNotFoundError:
+        logger.info("No asset manifest at %s; serving unversioned static files.", MANIFEST_PATH)
+        _manifest = {}
+    return _manifest
+
+
+def asset_url(filename):
+    """URL of the fingerprinted copy of a static file, or the plain static URL before a build."""
+    entry = _manifest.get(filename)
+    if entry is None:
+        return url_for('static', filename=filename)
+    return url_for('assets', filename=entry['path'])
+
+
+def responsive_image(filename, alt='', sizes=DEFAULT_SIZES, **attributes):
+    """Render a ``<picture>`` whose sources list every built variant of ``filename``."""
+    attributes = ''.join(f' {escape(name.rstrip("_"))}="{escape(value)}"' for name, value in attributes.items())
+    img = Markup(f'<img src="{escape(asset_url(filename))}" alt="{escape(alt)}" loading="lazy" decoding="async"{attributes}>')
+
+    variants = _manifest.get(filename, {}).get('variants')
+    if not variants:
+        return img
+
+    sources = []
+    for mime_type in ('image/avif', 'image/webp'):
+        candidates = [variant for variant in variants if variant['type'] == mime_type]
+        if candidates:
+            srcset = ', '.join(f"{url_for('assets', filename=variant['path'])} {variant['width']}w" for variant in candidates)
+            sources.append(f'<source type="{mime_type}" srcset="{escape(srcset)}" sizes="{escape(sizes)}">')
+    return Markup(f"<picture>{''.join(sources)}{img}</picture>")
+
+
+def _preload(url, destination):
+    g.setdefault('_asset_preloads', []).append((url, destination))
+
+
+def preload_link_header():
+    """``Link`` header value preloading the bundles rendered for this request, or None."""
+    preloads = g.get('_asset_preloads')
+    if not preloads:
+        return None
+    return ', '.join(f"<{url}>; rel=preload; as={destination}" for url, destination in preloads)
+
+
+def bundle_styles(name='base'):
+    """
+    The page's CSS: its first-screen rules inline, and the full bundle
+    loaded without blocking render. Before a build, the plain stylesheets.
+    """
+    entry = _manifest.get(f"bundles/{name}.css")
+    if entry is None:
+        return Markup(''.join(f'<link rel="stylesheet" href="{escape(asset_url(path))}">' for path in BASE_STYLES))
+
+    url = url_for('assets', filename=entry['path'])
+    _preload(url, 'style')
+    return Markup(
+        f"<style>{entry['critical']}</style>"
+        f'<link rel="preload" href="{escape(url)}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+        f'<noscript><link rel="stylesheet" href="{escape(url)}"></noscript>'
+    )
+
+
+def bundle_scripts(name='base'):
+    """Deferred ``<script>`` for the page's JS bundle (its separate files before a build)."""
+    entry = _manifest.get(f"bundles/{name}.js")
+    if entry is None:
+        own_scripts, needs_jquery = BUNDLES[name]
+        paths = ((JQUERY,) if needs_jquery else ()) + BASE_SCRIPTS + own_scripts
+        return Markup(''.join(f'<script defer src="{escape(asset_url(path))}"></script>' for path in paths))
+
+    url = url_for('assets', filename=entry['path'])
+    _preload(url, 'script')
+    return Markup(f'<script defer src="{escape(url)}"></script>')
+
+
+def serve_asset(filename):
+    """Serve a fingerprinted file, precompressed when the client allows it, cached for a year."""
+    if not os.path.isfile(os.path.join(DIST_DIR, filename)):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    accepted = request.accept_encodings
+    for encoding, suffix in ENCODINGS:
+        if accepted[encoding] and os.path.isfile(os.path.join(DIST_DIR, filename + suffix)):
+            response = send_from_directory(DIST_DIR, filename + suffix, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(DIST_DIR, filename, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    load_manifest()
+    app.add_url_rule('/assets/<path:filename>', endpoint='assets', view_func=serve_asset)
+    app.add_template_global(asset_url)
+    app.add_template_global(responsive_image)
+    app.add_template_global(bundle_styles)
+    app.add_template_global(bundle_scripts)
+
+    # gunicorn can't send 103 Early Hints, so the hints ride on the final response
+    @app.after_request
+    def _add_preload_links(response):
+        link = preload_link_header()
+        if link and 'Link' not in response.headers and response.mimetype == 'text/html':
+            response.headers['Link'] = link
+        return response
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['build']:
+        sys.exit("usage: python -m website.assets build")
+    logging.basicConfig(level=logging.INFO)
+    built = build()
+    logger.info("Built %s assets into %s", len(built), DIST_DIR)
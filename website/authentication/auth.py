@@ -1,17 +1,18 @@
 import os
 import json
 import logging
-import boto3
 from dotenv import load_dotenv
 from functools import wraps
-from flask import Blueprint, render_template, redirect, url_for, request, flash, session
+from flask import Blueprint, render_template, redirect, url_for, request, flash, session, g
+from .token_cache import TokenValidationCache
+from .jwt_verifier import jwt_verifier, VALID, INVALID, JWT_REVOCATION_CHECK_INTERVAL
+from website.user_cache import user_cache, token_key
+from website import metrics
+from website.aws import get_lambda_client
 
 # Load environment variables
 load_dotenv()
 
-# Read AWS credentials from environment variables
-ACCESS_KEY = os.getenv("AWS_ACCESS_KEY_ID", "")
-SECRET_KEY = os.getenv("AWS_SECRET_ACCESS_KEY", "")
 REGION = os.getenv("AWS_REGION", "")
 
 # Log the loaded AWS Region (Do NOT log ACCESS_KEY or SECRET_KEY)
@@ -31,19 +32,92 @@ for var in required_env_vars:
         raise EnvironmentError(f"Missing required environment variable: {var}")
 
 
-# Create a Boto3 session and Lambda client
-aws_session = boto3.Session(
-    aws_access_key_id=ACCESS_KEY,
-    aws_secret_access_key=SECRET_KEY,
-    region_name=REGION
+# Cache of GET_USER verdicts so protected pages don't pay a Lambda round trip per hit
+token_cache = TokenValidationCache(
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("TOKEN_CACHE_TTL", "300")),
+    negative_ttl=float(os.getenv("TOKEN_CACHE_NEGATIVE_TTL", "30"))
 )
-lambda_client = aws_session.client('lambda')
+# The token login just received hasn't been checked by GET_USER, so trust it only briefly
+TOKEN_CACHE_LOGIN_TTL = float(os.getenv("TOKEN_CACHE_LOGIN_TTL", "30"))
+
+def _invoke_auth_lambda(payload):
+    """Invoke the auth Lambda synchronously and return its decoded response payload."""
+    with metrics.span('lambda', payload['action']):
+        response = get_lambda_client().invoke(
+            FunctionName='sb-user-auth-sbUserAuthFunction-zjl3761VSGKj',  # Replace with your actual Lambda function name
+            InvocationType='RequestResponse',
+            Payload=json.dumps(payload)
+        )
+        return json.loads(response['Payload'].read())
+
+def _invoke_get_user(token):
+    """
+    Ask the auth Lambda whether the token is valid.
+    Returns True/False for a definite answer, or None if the call itself failed.
+    """
+    payload = {
+        "action": "GET_USER",
+        "token": token
+    }
+
+    try:
+        response_payload = _invoke_auth_lambda(payload)
+        logger.info("Lambda GET_USER response: %s", response_payload)
+    except Exception as e:
+        logger.error("Error calling Lambda for token validation: %s", e)
+        return None
+
+    return response_payload.get('statusCode') == 200
+
+def _revocation_check_due(token):
+    """Whether a locally verified token should be re-confirmed with the Lambda."""
+    if JWT_REVOCATION_CHECK_INTERVAL <= 0:
+        return False
+    # Shared across workers, so one confirmation covers the whole dyno
+    return user_cache.get(token_key(token), 'lambda_confirmed') is None
+
+def _record_lambda_confirmation(token):
+    if JWT_REVOCATION_CHECK_INTERVAL > 0:
+        user_cache.set(token_key(token), 'lambda_confirmed', True, ttl=JWT_REVOCATION_CHECK_INTERVAL)
+
+def validate_token(token):
+    """
+    Check a session token. Signature, expiry and claims are verified locally
+    when a JWT key is configured; the auth Lambda is only called for tokens
+    that can't be decided locally or whose revocation check is due, and its
+    verdicts go through the validation cache. The result is also pinned to
+    the current request so nested checks never validate the same token twice.
+    """
+    memo = g.get('_token_validation')
+    if memo is not None and memo[0] == token:
+        return memo[1]
+
+    verdict, _ = jwt_verifier.verify(token)
+    if verdict == INVALID:
+        valid = False
+    elif verdict == VALID and not _revocation_check_due(token):
+        valid = True
+    else:
+        valid = token_cache.get(token)
+        if valid is None:
+            valid = _invoke_get_user(token)
+            if valid is None:
+                # Lambda unreachable: fail closed for this request but don't cache it
+                valid = False
+            else:
+                token_cache.set(token, valid)
+                if valid:
+                    _record_lambda_confirmation(token)
+
+    g._token_validation = (token, valid)
+    return valid
 
 def token_required(f):
     """
     Decorator to ensure the user is logged in and has a valid token.
     It invokes the Lambda function with action "GET_USER" to validate
-    the token stored in the session.
+    the token stored in the session, via the validation cache.
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -52,25 +126,7 @@ def token_required(f):
             flash("Please log in to access this page.", "warning")
             return redirect(url_for('auth.login'))
 
-        payload = {
-            "action": "GET_USER",
-            "token": token
-        }
-
-        try:
-            response = lambda_client.invoke(
-                FunctionName='sb-user-auth-sbUserAuthFunction-zjl3761VSGKj',  # Replace with your actual Lambda function name
-                InvocationType='RequestResponse',
-                Payload=json.dumps(payload)
-            )
-            response_payload = json.loads(response['Payload'].read())
-            logger.info("Lambda GET_USER response: %s", response_payload)
-        except Exception as e:
-            logger.error("Error calling Lambda for token validation: %s", e)
-            flash("Session expired or invalid. Please log in again.", "warning")
-            return redirect(url_for('auth.login'))
-
-        if response_payload.get('statusCode') != 200:
+        if not validate_token(token):
             flash("Session expired or invalid. Please log in again.", "warning")
             return redirect(url_for('auth.login'))
 
@@ -103,12 +159,7 @@ def sign_up():
         }
 
         try:
-            response = lambda_client.invoke(
-                FunctionName='sb-user-auth-sbUserAuthFunction-zjl3761VSGKj',  # Replace with your actual Lambda function name
-                InvocationType='RequestResponse',
-                Payload=json.dumps(payload)
-            )
-            response_payload = json.loads(response['Payload'].read())
+            response_payload = _invoke_auth_lambda(payload)
             logger.info("Lambda REGISTER_USER response: %s", response_payload)
         except Exception as e:
             logger.error("Error calling Lambda for sign up: %s", e)
@@ -150,12 +201,7 @@ def login():
         }
 
         try:
-            response = lambda_client.invoke(
-                FunctionName='sb-user-auth-sbUserAuthFunction-zjl3761VSGKj',  # Replace with your actual Lambda function name
-                InvocationType='RequestResponse',
-                Payload=json.dumps(payload)
-            )
-            response_payload = json.loads(response['Payload'].read())
+            response_payload = _invoke_auth_lambda(payload)
             logger.info("Lambda LOGIN_USER response: %s", response_payload)
         except Exception as e:
             logger.error("Error calling Lambda for login: %s", e)
@@ -174,6 +220,7 @@ def login():
             token = body_content.get('token')
             if token:
                 session['access_token'] = token
+                token_cache.set(token, True, ttl=TOKEN_CACHE_LOGIN_TTL)
                 flash("Login successful", "success")
                 return redirect(url_for('views.dashboard'))
             else:
@@ -198,6 +245,9 @@ def logout():
     """
     access_token = session.pop('access_token', None)
     if access_token:
+        # Only this worker's cache entry goes; others accept the token until theirs expires (TOKEN_CACHE_TTL)
+        token_cache.invalidate(access_token)
+        user_cache.invalidate(token_key(access_token))
         logger.info("User logged out, token removed: %s", access_token)
     else:
         logger.info("User tried to log out but no token was found in session.")
@@ -0,0 +1,134 @@
+import os
+import time
+import logging
+import threading
+import jwt
+import requests
+from website import http_client
+
+logger = logging.getLogger(__name__)
+
+# Verdicts
+VALID = 'valid'
+INVALID = 'invalid'
+UNDECIDED = 'undecided'
+
+JWT_SECRET = os.getenv('JWT_SECRET')
+JWT_PUBLIC_KEY = os.getenv('JWT_PUBLIC_KEY')
+JWT_JWKS_URL = os.getenv('JWT_JWKS_URL')
+JWT_ALGORITHMS = [alg.strip() for alg in os.getenv('JWT_ALGORITHMS', 'HS256' if JWT_SECRET else 'RS256').split(',') if alg.strip()]
+JWT_AUDIENCE = os.getenv('JWT_AUDIENCE')
+JWT_ISSUER = os.getenv('JWT_ISSUER')
+JWT_LEEWAY = float(os.getenv('JWT_LEEWAY', '30'))
+JWT_KEY_REFRESH_INTERVAL = float(os.getenv('JWT_KEY_REFRESH_INTERVAL', '3600'))
+# Minimum gap between JWKS fetches, so unknown kids or a JWKS outage can't cause a fetch per request
+JWT_KEY_MIN_REFRESH_GAP = 30
+# A locally valid token is still confirmed with the auth Lambda this often, to catch revocations
+JWT_REVOCATION_CHECK_INTERVAL = float(os.getenv('JWT_REVOCATION_CHECK_INTERVAL', '900'))
+
+
+class JWTVerifier:
+    """
+    Verifies session tokens locally from a shared secret, a PEM public key or
+    a JWKS document.
+
+    ``verify`` never raises; it returns VALID, INVALID or UNDECIDED. Anything
+    it cannot judge with confidence - opaque tokens, an unknown ``kid``, keys
+    that failed to load - is UNDECIDED so the caller falls back to the Lambda.
+    """
+
+    def __init__(self, secret=JWT_SECRET, public_key=JWT_PUBLIC_KEY, jwks_url=JWT_JWKS_URL,
+                 algorithms=JWT_ALGORITHMS, audience=JWT_AUDIENCE, issuer=JWT_ISSUER,
+                 leeway=JWT_LEEWAY, refresh_interval=JWT_KEY_REFRESH_INTERVAL):
+        self.secret = secret
+        self.public_key = public_key
+        self.jwks_url = jwks_url
+        self.algorithms = algorithms
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+        self.refresh_interval = refresh_interval
+        self._jwks = {}
+        self._jwks_loaded_at = None
+        self._jwks_attempted_at = None
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.secret or self.public_key or self.jwks_url)
+
+    def verify(self, token):
+        """Return (verdict, claims); claims is None unless the verdict is VALID."""
+        if not self.enabled:
+            return UNDECIDED, None
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.DecodeError:
+            # Not a JWT at all; only the Lambda can judge it
+            return UNDECIDED, None
+
+        key = self._key_for(header.get('kid'))
+        if key is None:
+            return UNDECIDED, None
+
+        options = {'require': ['exp']}
+        if self.audience is None:
+            options['verify_aud'] = False
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=self.algorithms,
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.leeway,
+                options=options
+            )
+        except jwt.MissingRequiredClaimError:
+            return UNDECIDED, None
+        except (jwt.ExpiredSignatureError, jwt.InvalidSignatureError, jwt.InvalidAudienceError,
+                jwt.InvalidIssuerError, jwt.ImmatureSignatureError, jwt.InvalidAlgorithmError):
+            return INVALID, None
+        except jwt.InvalidTokenError as e:
+            logger.info("Could not verify token locally: %s", e)
+            return UNDECIDED, None
+        return VALID, claims
+
+    def _key_for(self, kid):
+        if self.secret:
+            return self.secret
+        if self.public_key:
+            return self.public_key
+
+        stale = self._jwks_loaded_at is None or time.monotonic() - self._jwks_loaded_at > self.refresh_interval
+        if stale or (kid and kid not in self._jwks):
+            self._refresh_jwks()
+        if kid:
+            return self._jwks.get(kid)
+        # Tokens without a kid are only decidable when the set holds a single key
+        return next(iter(self._jwks.values())) if len(self._jwks) == 1 else None
+
+    def _refresh_jwks(self):
+        # Only one thread refreshes; the others keep using the keys they have
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            if self._jwks_attempted_at is not None and now - self._jwks_attempted_at < JWT_KEY_MIN_REFRESH_GAP:
+                return
+            self._jwks_attempted_at = now
+
+            response = http_client.get(self.jwks_url)
+            response.raise_for_status()
+            key_set = jwt.PyJWKSet.from_dict(response.json())
+            self._jwks = {key.key_id: key.key for key in key_set.keys}
+            self._jwks_loaded_at = now
+            logger.info("Loaded %s signing key(s) from %s", len(self._jwks), self.jwks_url)
+        except (requests.RequestException, ValueError, jwt.PyJWKSetError) as e:
+            logger.error("Error refreshing JWKS from %s: %s", self.jwks_url, e)
+        finally:
+            self._refresh_lock.release()
+
+
+jwt_verifier = JWTVerifier()
@@ -0,0 +1,45 @@
+import hashlib
+from website.cache import caches
+
+
+class TokenValidationCache:
+    """
+    Bounded LRU cache of token validation results.
+
+    Entries are keyed by a SHA-256 digest of the token so raw session tokens
+    never sit in memory longer than the request that carried them. Accepted
+    tokens are kept for ``ttl`` seconds and rejected tokens for the (usually
+    shorter) ``negative_ttl`` so a bad cookie cannot hammer the auth Lambda.
+
+    Each worker process has its own copy. A token revoked at the auth
+    service, or logged out through another worker, stays accepted here
+    until its entry expires, so ``ttl`` is also the revocation window.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, negative_ttl=30, name='auth_tokens'):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = caches.register(name, backend='memory', policy='lru', max_entries=maxsize)
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token):
+        """Return True/False for a cached verdict, or None on a miss."""
+        return self._entries.get(self._key(token))
+
+    def set(self, token, valid, ttl=None):
+        """Cache a verdict; ``ttl`` overrides the default lifetime for this entry."""
+        if ttl is None:
+            ttl = self.ttl if valid else self.negative_ttl
+        self._entries.set(self._key(token), valid, ttl)
+
+    def invalidate(self, token):
+        self._entries.delete(self._key(token))
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,27 @@
+import os
+import threading
+
+_lambda_client = None
+_lambda_client_lock = threading.Lock()
+
+
+def get_lambda_client():
+    """
+    Return the process-wide Lambda client, creating it on first use.
+
+    boto3 is imported here rather than at module level: it adds a noticeable
+    chunk to every worker boot, and most requests never touch AWS. botocore
+    clients are thread-safe, so one client is shared by every thread.
+    """
+    global _lambda_client
+    if _lambda_client is None:
+        with _lambda_client_lock:
+            if _lambda_client is None:
+                import boto3
+                aws_session = boto3.Session(
+                    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", ""),
+                    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", ""),
+                    region_name=os.getenv("AWS_REGION", "")
+                )
+                _lambda_client = aws_session.client('lambda')
+    return _lambda_client
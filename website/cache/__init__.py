@@ -0,0 +1,132 @@
+import os
+import json
+import pickle
+import threading
+from website.cache.base import CacheBackend, CacheStats, DEFAULT_NAMESPACE, JSON
+from website.cache.memory import MemoryCache
+from website.cache.sqlite import SQLiteCache
+from website.cache.mapped import MappedFileCache
+
+BACKENDS = {backend.name: backend for backend in (MemoryCache, SQLiteCache, MappedFileCache)}
+SERIALIZERS = {'json': JSON, 'pickle': pickle}
+
+
+class CacheRegistry:
+    """
+    The app's named caches and their configuration.
+
+    Modules declare the caches they need with defaults::
+
+        page_cache = caches.register('pages', backend='memory', policy='lru', max_entries=256)
+
+    and get back a Cache handle. The backend behind each name is built on
+    first use from those defaults plus any overrides in
+    ``app.config['CACHES']``, e.g. ``{"pages": {"policy": "lfu"}}``:
+
+        memory  in-process, LRU/LFU/FIFO eviction by entry count
+        sqlite  one file shared by every worker on the dyno
+        mmap    memory-mapped file shared by every worker, for read-mostly data
+    """
+
+    def __init__(self):
+        self._defaults = {}
+        self._overrides = {}
+        self._backends = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, backend='memory', **options):
+        """Declare cache ``name`` with default settings. Returns its Cache handle."""
+        with self._lock:
+            self._defaults[name] = dict(options, backend=backend)
+            self._backends.pop(name, None)
+        return Cache(self, name)
+
+    def configure(self, overrides):
+        """Replace the per-cache overrides; backends are rebuilt on next use."""
+        with self._lock:
+            self._overrides = {name: dict(options) for name, options in (overrides or {}).items()}
+            self._backends.clear()
+
+    def settings(self, name):
+        if name not in self._defaults:
+            raise KeyError(f"No cache named {name!r} is registered")
+        return dict(self._defaults[name], **self._overrides.get(name, {}))
+
+    def backend(self, name):
+        backend = self._backends.get(name)
+        if backend is None:
+            with self._lock:
+                backend = self._backends.get(name)
+                if backend is None:
+                    backend = self._backends[name] = self._build(name)
+        return backend
+
+    def _build(self, name):
+        options = self.settings(name)
+        kind = options.pop('backend')
+        if kind not in BACKENDS:
+            raise ValueError(f"Cache {name!r}: unknown backend {kind!r}; expected one of {', '.join(BACKENDS)}")
+        if isinstance(options.get('serializer'), str):
+            options['serializer'] = SERIALIZERS[options['serializer']]
+        return BACKENDS[kind](**options)
+
+    def names(self):
+        return sorted(self._defaults)
+
+    def stats(self):
+        """Counters for every cache built in this process."""
+        return {name: dict(self._backends[name].stats.to_dict(), backend=self._backends[name].name)
+                for name in self.names() if name in self._backends}
+
+
+class Cache:
+    """A registered cache. Calls go to whichever backend the app configured for its name."""
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    @property
+    def backend(self):
+        return self.registry.backend(self.name)
+
+    @property
+    def stats(self):
+        return self.backend.stats
+
+    def get(self, key, namespace=DEFAULT_NAMESPACE):
+        return self.backend.get(key, namespace)
+
+    def set(self, key, value, ttl=None, namespace=DEFAULT_NAMESPACE):
+        self.backend.set(key, value, ttl, namespace)
+
+    def get_or_set(self, key, factory, ttl=None, namespace=DEFAULT_NAMESPACE):
+        return self.backend.get_or_set(key, factory, ttl, namespace)
+
+    def delete(self, key, namespace=DEFAULT_NAMESPACE):
+        return self.backend.delete(key, namespace)
+
+    def invalidate(self, namespace):
+        return self.backend.invalidate(namespace)
+
+    def clear(self):
+        self.backend.clear()
+
+    def __len__(self):
+        return len(self.backend)
+
+
+caches = CacheRegistry()
+
+
+def init_app(app):
+    """
+    Apply ``app.config['CACHES']`` (from CACHE_CONFIG as JSON when unset) and
+    build every registered cache, so a bad setting fails at boot.
+    """
+    overrides = app.config.get('CACHES')
+    if overrides is None:
+        overrides = app.config['CACHES'] = json.loads(os.getenv('CACHE_CONFIG') or '{}')
+    caches.configure(overrides)
+    for name in caches.names():
+        caches.backend(name)
@@ -0,0 +1,102 @@
+import json
+import time
+import threading
+
+DEFAULT_NAMESPACE = 'default'
+
+
+class JSONSerializer:
+    """Compact JSON, for the backends that store values outside the process."""
+
+    @staticmethod
+    def dumps(value):
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+
+JSON = JSONSerializer()
+
+
+class CacheStats:
+    """Hit/miss counters for one backend in this process."""
+
+    FIELDS = ('hits', 'misses', 'sets', 'evictions', 'expirations')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            for field in self.FIELDS:
+                setattr(self, field, 0)
+
+    def record(self, field, count=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + count)
+
+    def to_dict(self):
+        with self._lock:
+            data = {field: getattr(self, field) for field in self.FIELDS}
+        lookups = data['hits'] + data['misses']
+        data['hit_ratio'] = round(data['hits'] / lookups, 4) if lookups else None
+        return data
+
+
+class CacheBackend:
+    """
+    Interface every backend implements.
+
+    Keys live in a namespace (``'default'`` unless given), and a whole
+    namespace can be dropped at once with ``invalidate``. ``ttl`` is in
+    seconds; None means the backend's ``default_ttl``, which itself may be
+    None for no expiry. ``get`` returns None on a miss, so None can't be
+    cached.
+    """
+
+    name = None
+
+    def __init__(self, default_ttl=None):
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+
+    def get(self, key, namespace=DEFAULT_NAMESPACE):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None, namespace=DEFAULT_NAMESPACE):
+        raise NotImplementedError
+
+    def delete(self, key, namespace=DEFAULT_NAMESPACE):
+        """Remove one entry. Returns True if it was there."""
+        raise NotImplementedError
+
+    def invalidate(self, namespace):
+        """Remove every entry in ``namespace``. Returns how many were removed."""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def get_or_set(self, key, factory, ttl=None, namespace=DEFAULT_NAMESPACE):
+        """Return the cached value, or call ``factory()`` and cache what it returns (unless None)."""
+        value = self.get(key, namespace)
+        if value is None:
+            value = factory()
+            if value is not None:
+                self.set(key, value, ttl, namespace)
+        return value
+
+    def _ttl(self, ttl):
+        return self.default_ttl if ttl is None else ttl
+
+    @staticmethod
+    def _expires_at(ttl, now=None):
+        if ttl is None:
+            return None
+        return (time.time() if now is None else now) + ttl
@@ -0,0 +1,201 @@
+import os
+import json
+import mmap
+import time
+import fcntl
+import struct
+import logging
+import tempfile
+import threading
+from website.cache.base import CacheBackend, DEFAULT_NAMESPACE, JSON
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SBCACHE1'
+# Magic, then the length of the JSON index that follows
+HEADER = struct.Struct('<8sQ')
+
+
+class _Snapshot:
+    """One version of the file: its index and a read-only map of it."""
+
+    def __init__(self, index=None, buffer=None, data_offset=0, identity=None):
+        # namespace -> key -> [offset, length, expires_at, stored_at]
+        self.index = index or {}
+        self.buffer = buffer
+        self.data_offset = data_offset
+        self.identity = identity
+
+    def blob(self, entry):
+        start = self.data_offset + entry[0]
+        return self.buffer[start:start + entry[1]]
+
+
+_EMPTY = _Snapshot()
+
+
+class MappedFileCache(CacheBackend):
+    """
+    Read-mostly cache in one memory-mapped file shared by every worker.
+
+    The file holds a JSON index followed by the serialized values. Readers
+    map it once per version and slice values straight out of the page
+    cache, so a hit is a dict lookup plus deserializing one value; whether
+    another worker replaced the file is checked at most every
+    ``check_interval`` seconds.
+
+    Every write rewrites the whole file under a file lock and swaps it in
+    with a rename, so readers never see a partial file. That makes writes
+    cost O(file size): use it for data read far more often than written.
+    Past ``max_bytes`` the oldest-written values are dropped.
+    """
+
+    name = 'mmap'
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, default_ttl=None, serializer=JSON, check_interval=1.0):
+        super().__init__(default_ttl)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.serializer = serializer
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._snapshot = _EMPTY
+                return self._snapshot
+            identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if self._snapshot is None or self._snapshot.identity != identity:
+                self._snapshot = self._map(identity)
+            return self._snapshot
+
+    def _map(self, identity):
+        # Older maps are closed when the last reader drops them, not here
+        try:
+            with open(self.path, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, index_length = HEADER.unpack_from(buffer, 0)
+            if magic != MAGIC:
+                raise ValueError("not a cache file")
+            index = json.loads(buffer[HEADER.size:HEADER.size + index_length])
+            return _Snapshot(index, buffer, HEADER.size + index_length, identity)
+        except (OSError, ValueError, struct.error) as e:
+            logger.error("Could not map cache file %s: %s", self.path, e)
+            return _Snapshot(identity=identity)
+
+    def get(self, key, namespace=DEFAULT_NAMESPACE):
+        snapshot = self._current()
+        entry = snapshot.index.get(namespace, {}).get(str(key))
+        if entry is not None and entry[2] is not None and entry[2] <= time.time():
+            self.stats.record('expirations')
+            entry = None
+        if entry is None:
+            self.stats.record('misses')
+            return None
+        self.stats.record('hits')
+        return self.serializer.loads(snapshot.blob(entry))
+
+    def set(self, key, value, ttl=None, namespace=DEFAULT_NAMESPACE):
+        ttl = self._ttl(ttl)
+        if ttl is not None and ttl <= 0:
+            return
+        blob = self.serializer.dumps(value)
+        if len(blob) > self.max_bytes:
+            logger.warning("Not caching %s/%s in %s: %s bytes is over max_bytes", namespace, key, self.path, len(blob))
+            return
+
+        def add(entries):
+            now = time.time()
+            entries.setdefault(namespace, {})[str(key)] = [blob, self._expires_at(ttl, now), now]
+
+        self._rewrite(add)
+        self.stats.record('sets')
+
+    def delete(self, key, namespace=DEFAULT_NAMESPACE):
+        return self._rewrite(lambda entries: entries.get(namespace, {}).pop(str(key), None) is not None)
+
+    def invalidate(self, namespace):
+        return self._rewrite(lambda entries: len(entries.pop(namespace, {})))
+
+    def clear(self):
+        self._rewrite(lambda entries: entries.clear())
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._current().index.values())
+
+    def _rewrite(self, mutate):
+        """Apply ``mutate`` to {namespace: {key: [blob, expires_at, stored_at]}} and swap the file in."""
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        lock_fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            try:
+                stat = os.stat(self.path)
+                snapshot = self._map((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                snapshot = _EMPTY
+
+            now = time.time()
+            entries = {}
+            for namespace, keys in snapshot.index.items():
+                for key, entry in keys.items():
+                    if entry[2] is not None and entry[2] <= now:
+                        self.stats.record('expirations')
+                        continue
+                    entries.setdefault(namespace, {})[key] = [snapshot.blob(entry), entry[2], entry[3]]
+
+            result = mutate(entries)
+            self._enforce_size(entries)
+            self._write(directory, entries)
+        finally:
+            os.close(lock_fd)
+
+        # Our own write is visible straight away rather than after check_interval
+        with self._lock:
+            self._checked_at = 0.0
+        return result
+
+    def _enforce_size(self, entries):
+        flat = [(entry[2], namespace, key, len(entry[0]))
+                for namespace, keys in entries.items() for key, entry in keys.items()]
+        total = sum(size for _, _, _, size in flat)
+        for _, namespace, key, size in sorted(flat):
+            if total <= self.max_bytes:
+                break
+            del entries[namespace][key]
+            total -= size
+            self.stats.record('evictions')
+
+    def _write(self, directory, entries):
+        index = {}
+        blobs = []
+        offset = 0
+        for namespace, keys in entries.items():
+            for key, (blob, expires_at, stored_at) in keys.items():
+                index.setdefault(namespace, {})[key] = [offset, len(blob), expires_at, stored_at]
+                blobs.append(blob)
+                offset += len(blob)
+        index_data = json.dumps(index, separators=(',', ':')).encode('utf-8')
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.cache-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, len(index_data)))
+                f.write(index_data)
+                for blob in blobs:
+                    f.write(blob)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
@@ -0,0 +1,92 @@
+import time
+import threading
+from collections import OrderedDict
+from website.cache.base import CacheBackend, DEFAULT_NAMESPACE
+
+POLICIES = ('lru', 'lfu', 'fifo')
+
+
+class MemoryCache(CacheBackend):
+    """
+    Bounded in-process cache; each worker process has its own copy.
+
+    Once ``max_entries`` is reached an entry is evicted by ``policy``:
+
+        lru   least recently read or written
+        lfu   fewest reads, oldest first among ties; never the entry being written
+        fifo  oldest written
+
+    Values are stored as-is, not copied, so callers must not mutate them.
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_entries=1024, policy='lru', default_ttl=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown eviction policy {policy!r}; expected one of {', '.join(POLICIES)}")
+        super().__init__(default_ttl)
+        self.max_entries = max_entries
+        self.policy = policy
+        # (namespace, key) -> [value, expires_at, reads], in LRU/insertion order
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, namespace=DEFAULT_NAMESPACE):
+        full_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                del self._entries[full_key]
+                self.stats.record('expirations')
+                entry = None
+            if entry is None:
+                self.stats.record('misses')
+                return None
+            if self.policy == 'lru':
+                self._entries.move_to_end(full_key)
+            elif self.policy == 'lfu':
+                entry[2] += 1
+        self.stats.record('hits')
+        return entry[0]
+
+    def set(self, key, value, ttl=None, namespace=DEFAULT_NAMESPACE):
+        ttl = self._ttl(ttl)
+        if ttl is not None and ttl <= 0:
+            return
+        full_key = (namespace, key)
+        with self._lock:
+            previous = self._entries.pop(full_key, None)
+            reads = previous[2] if previous is not None else 0
+            self._entries[full_key] = [value, self._expires_at(ttl, time.monotonic()), reads]
+            while len(self._entries) > self.max_entries:
+                self._evict(full_key)
+        self.stats.record('sets')
+
+    def _evict(self, keep):
+        if self.policy == 'lfu':
+            # A linear scan; fine at the sizes this backend is meant for. With
+            # max_entries=0 the entry being written is the only one to drop
+            victim = min((key for key in self._entries if key != keep), key=lambda key: self._entries[key][2],
+                         default=keep)
+        else:
+            victim = next(iter(self._entries))
+        del self._entries[victim]
+        self.stats.record('evictions')
+
+    def delete(self, key, namespace=DEFAULT_NAMESPACE):
+        with self._lock:
+            return self._entries.pop((namespace, key), None) is not None
+
+    def invalidate(self, namespace):
+        with self._lock:
+            doomed = [key for key in self._entries if key[0] == namespace]
+            for key in doomed:
+                del self._entries[key]
+        return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
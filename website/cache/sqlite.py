@@ -0,0 +1,147 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from website.cache.base import CacheBackend, DEFAULT_NAMESPACE, JSON
+
+logger = logging.getLogger(__name__)
+
+# Sweep expired rows and enforce max_entries every this many writes
+TRIM_EVERY = 500
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache shared by every gunicorn worker on a dyno.
+
+    Backed by a WAL-mode SQLite file, so all workers see one another's
+    entries and invalidations. One row per (namespace, key). Expired rows
+    are skipped on read and swept every ``TRIM_EVERY`` writes, when the
+    oldest-written rows beyond ``max_entries`` are dropped as well.
+
+    No operation raises sqlite3.Error: a broken cache file logs and
+    behaves as a miss or an empty cache, so it can't take a page down.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path, max_entries=100000, default_ttl=None, serializer=JSON):
+        super().__init__(default_ttl)
+        self.path = path
+        self.max_entries = max_entries
+        self.serializer = serializer
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialised = False
+        self._writes = 0
+
+    def _connection(self):
+        # sqlite3 connections can't cross threads or forks, so keep one per thread per process
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._init_lock:
+            if not self._initialised:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache_entries ("
+                    "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+                    "expires_at REAL, stored_at REAL NOT NULL, PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS cache_entries_stored_at ON cache_entries (stored_at)")
+                self._initialised = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, namespace=DEFAULT_NAMESPACE):
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, str(key))
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error("Cache read from %s failed: %s", self.path, e)
+            row = None
+        if row is not None and row[1] is not None and row[1] <= time.time():
+            self.stats.record('expirations')
+            row = None
+        if row is None:
+            self.stats.record('misses')
+            return None
+        self.stats.record('hits')
+        return self.serializer.loads(row[0])
+
+    def set(self, key, value, ttl=None, namespace=DEFAULT_NAMESPACE):
+        ttl = self._ttl(ttl)
+        if ttl is not None and ttl <= 0:
+            return
+        now = time.time()
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, stored_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, str(key), self.serializer.dumps(value), self._expires_at(ttl, now), now)
+            )
+        except sqlite3.Error as e:
+            logger.error("Cache write to %s failed: %s", self.path, e)
+            return
+        self.stats.record('sets')
+        self._writes += 1
+        if self._writes % TRIM_EVERY == 0:
+            self.trim()
+
+    def trim(self):
+        """Drop expired rows, then the oldest rows past ``max_entries``. Returns rows removed."""
+        try:
+            conn = self._connection()
+            expired = conn.execute(
+                "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            ).rowcount
+            excess = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0] - self.max_entries
+            evicted = 0
+            if excess > 0:
+                evicted = conn.execute(
+                    "DELETE FROM cache_entries WHERE (namespace, key) IN "
+                    "(SELECT namespace, key FROM cache_entries ORDER BY stored_at LIMIT ?)",
+                    (excess,)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.error("Cache trim of %s failed: %s", self.path, e)
+            return 0
+        self.stats.record('expirations', expired)
+        self.stats.record('evictions', evicted)
+        return expired + evicted
+
+    def delete(self, key, namespace=DEFAULT_NAMESPACE):
+        try:
+            return self._connection().execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, str(key))
+            ).rowcount > 0
+        except sqlite3.Error as e:
+            logger.error("Cache delete from %s failed: %s", self.path, e)
+            return False
+
+    def invalidate(self, namespace):
+        try:
+            return self._connection().execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,)).rowcount
+        except sqlite3.Error as e:
+            logger.error("Cache invalidation of %s in %s failed: %s", namespace, self.path, e)
+            return 0
+
+    def clear(self):
+        try:
+            self._connection().execute("DELETE FROM cache_entries")
+        except sqlite3.Error as e:
+            logger.error("Cache clear of %s failed: %s", self.path, e)
+
+    def __len__(self):
+        try:
+            return self._connection().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error("Cache count of %s failed: %s", self.path, e)
+            return 0
@@ -0,0 +1,108 @@
+import os
+import logging
+import threading
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from website import metrics
+
+logger = logging.getLogger(__name__)
+
+# Timeouts in seconds; a hung upstream must never pin a worker forever
+CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '15'))
+# LLM-backed upstreams legitimately take a while to answer
+SLOW_READ_TIMEOUT = float(os.getenv('HTTP_SLOW_READ_TIMEOUT', '120'))
+
+# One urllib3 pool per upstream host, each keeping up to POOL_MAXSIZE sockets alive
+POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '10'))
+POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '10'))
+
+# Only idempotent requests are retried; POSTs to the LLM API are never replayed
+RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+RETRY_BACKOFF = float(os.getenv('HTTP_RETRY_BACKOFF', '0.3'))
+RETRY_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+RETRY_STATUSES = (502, 503, 504)
+
+# Calls under API_URL are reported as the 'api' upstream in metrics
+API_URL = os.getenv('API_URL')
+
+
+def _build_adapter():
+    retry = Retry(
+        total=RETRIES,
+        connect=RETRIES,
+        read=RETRIES,
+        status=RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        raise_on_status=False
+    )
+    return HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+
+
+_adapter = None
+_adapter_pid = None
+_adapter_lock = threading.Lock()
+_local = threading.local()
+
+
+def _shared_adapter():
+    """
+    The process's connection pools. urllib3 pools are thread-safe, so every
+    thread shares them; they are rebuilt after a fork so a preloaded master
+    never hands its sockets to the workers.
+    """
+    global _adapter, _adapter_pid
+    if _adapter_pid != os.getpid():
+        with _adapter_lock:
+            if _adapter_pid != os.getpid():
+                _adapter = _build_adapter()
+                _adapter_pid = os.getpid()
+    return _adapter
+
+
+def get_session():
+    """
+    This thread's Session. A requests.Session carries mutable state (cookies,
+    redirect handling) and isn't safe to share across threads or greenlets,
+    so each gets its own, mounted on the shared keep-alive pools.
+    """
+    adapter = _shared_adapter()
+    session = getattr(_local, 'session', None)
+    if session is None or _local.adapter is not adapter:
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _local.session = session
+        _local.adapter = adapter
+    return session
+
+
+def request(method, url, timeout=None, upstream=None, **kwargs):
+    """
+    Issue a request over the shared keep-alive connection pools.
+    ``timeout`` defaults to (CONNECT_TIMEOUT, READ_TIMEOUT). ``upstream``
+    names the service in metrics; calls under API_URL default to "api".
+    """
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    if upstream is None:
+        upstream = 'api' if API_URL and url.startswith(API_URL) else 'http'
+
+    parts = urlsplit(url)
+    with metrics.span(upstream, f"{method} {parts.netloc}{metrics.normalise_path(parts.path)}") as span:
+        response = get_session().request(method, url, timeout=timeout, **kwargs)
+        if response.status_code >= 500:
+            span.outcome = 'error'
+    return response
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
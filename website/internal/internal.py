@@ -0,0 +1,95 @@
+import os
+import hmac
+import logging
+from functools import wraps
+from flask import Blueprint, request, jsonify
+from website.cache import caches
+from website.user_cache import user_cache
+from website.sourcebox.transcript_cache import transcript_cache
+
+logger = logging.getLogger(__name__)
+
+internal = Blueprint('internal', __name__)
+
+
+def admin_token_required(f):
+    """
+    Decorator for backend-to-website calls. The caller must send
+    ``Authorization: Bearer <INTERNAL_API_TOKEN>`` (falls back to ADMIN_TOKEN).
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = os.getenv('INTERNAL_API_TOKEN') or os.getenv('ADMIN_TOKEN')
+        provided = request.headers.get('Authorization', '')
+        if not expected:
+            logger.error("Internal endpoint called but no INTERNAL_API_TOKEN/ADMIN_TOKEN is configured")
+            return jsonify({"error": "Not configured"}), 503
+        if not hmac.compare_digest(provided.encode('utf-8'), f"Bearer {expected}".encode('utf-8')):
+            return jsonify({"error": "Unauthorized"}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@internal.route('/user-cache/invalidate', methods=['POST'])
+@admin_token_required
+def invalidate_user_cache():
+    """
+    Called by the backend when a user's profile or premium status changes.
+    Body: {"user_id": ..., "fields": ["premium", "profile"]} (omit fields for all).
+    """
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('user_id')
+    fields = data.get('fields')
+
+    if user_id is None:
+        return jsonify({"error": "user_id is required"}), 400
+    if fields is not None and (not isinstance(fields, list) or not all(isinstance(field, str) for field in fields)):
+        return jsonify({"error": "fields must be a list of field names"}), 400
+
+    removed = user_cache.invalidate(user_id, fields)
+    logger.info("Invalidated %s cached field(s) for user_id=%s", removed, user_id)
+    return jsonify({"user_id": user_id, "removed": removed})
+
+
+@internal.route('/cache/stats', methods=['GET'])
+@admin_token_required
+def cache_stats():
+    """Hit/miss counters for the caches of whichever worker answers."""
+    return jsonify({"pid": os.getpid(), "caches": caches.stats()})
+
+
+@internal.route('/cache/invalidate', methods=['POST'])
+@admin_token_required
+def invalidate_cache():
+    """
+    Drop one namespace of a cache, or the whole cache.
+    Body: {"cache": "pages", "namespace": "default"} (omit namespace to clear it all).
+    Memory caches only clear in the worker that handles this request.
+    """
+    data = request.get_json(silent=True) or {}
+    name = data.get('cache')
+    namespace = data.get('namespace')
+
+    if name not in caches.names():
+        return jsonify({"error": "Unknown cache", "details": f"Expected one of {', '.join(caches.names())}"}), 400
+
+    cache = caches.backend(name)
+    if namespace is None:
+        cache.clear()
+        removed = None
+    else:
+        removed = cache.invalidate(str(namespace))
+    logger.info("Invalidated cache %s namespace=%s (%s removed)", name, namespace, removed)
+    return jsonify({"cache": name, "namespace": namespace, "removed": removed})
+
+
+@internal.route('/transcript/refresh', methods=['POST'])
+@admin_token_required
+def refresh_transcript():
+    """Refetch the landing page transcript example now, e.g. after the sample audio changes."""
+    previous = transcript_cache.load()
+    transcript = transcript_cache.refresh()
+    if transcript is None or transcript is previous:
+        return jsonify({"error": "Refresh failed; the stored copy is unchanged",
+                        "fetched_at": previous.fetched_at if previous else None}), 502
+    return jsonify({"fetched_at": transcript.fetched_at, "etag": transcript.etag})
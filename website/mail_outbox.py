@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import uuid
+import logging
+import tempfile
+import threading
+from website import metrics
+
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') == '1'
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', '15'))
+
+MAIL_SPOOL_DIR = os.getenv('MAIL_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'sourcebox-outbox'))
+MAIL_BATCH_SIZE = int(os.getenv('MAIL_BATCH_SIZE', '20'))
+MAIL_MAX_ATTEMPTS = int(os.getenv('MAIL_MAX_ATTEMPTS', '8'))
+MAIL_POLL_INTERVAL = float(os.getenv('MAIL_POLL_INTERVAL', '5'))
+# Drop the SMTP session after this long without mail; Gmail closes idle ones anyway
+MAIL_IDLE_TIMEOUT = float(os.getenv('MAIL_IDLE_TIMEOUT', '60'))
+
+
+class MailOutbox:
+    """
+    Spool-directory mail queue drained by a background sender thread.
+
+    ``enqueue`` writes the message to ``pending/`` (write + rename, so it is
+    atomic and needs no lock) and returns straight away. The sender claims a
+    batch by renaming files into ``sending/`` - only one worker process can
+    win each rename - and delivers them over a single long-lived,
+    authenticated SMTP connection. Transient failures go back to ``pending/``
+    with exponential backoff; anything left in ``sending/`` by a process
+    that died is requeued on startup, so mail survives restarts.
+
+    smtplib and the email package are only imported by the sender thread,
+    keeping them out of worker boot.
+    """
+
+    def __init__(self, spool_dir=MAIL_SPOOL_DIR, host=SMTP_HOST, port=SMTP_PORT,
+                 username=None, password=None, starttls=SMTP_STARTTLS):
+        self.spool_dir = spool_dir
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self._pending_dir = os.path.join(spool_dir, 'pending')
+        self._sending_dir = os.path.join(spool_dir, 'sending')
+        self._failed_dir = os.path.join(spool_dir, 'failed')
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._worker_pid = None
+        self._worker_lock = threading.Lock()
+        self._smtp = None
+        self._last_used = 0.0
+
+    def enqueue(self, subject, body, to_addr=None, from_addr=None):
+        """Persist a plain-text message for delivery and return its ID."""
+        sender = from_addr or self.username
+        message = {
+            'id': uuid.uuid4().hex,
+            'from': sender,
+            'to': to_addr or sender,
+            'subject': subject,
+            'body': body,
+            'attempts': 0,
+            'next_attempt_at': 0,
+            'created_at': time.time()
+        }
+        self._ensure_dirs()
+        self._write(os.path.join(self._pending_dir, f"{message['id']}.json"), message)
+        self._ensure_worker()
+        self._wakeup.set()
+        return message['id']
+
+    def pending_count(self):
+        self._ensure_dirs()
+        return len(os.listdir(self._pending_dir))
+
+    def _ensure_dirs(self):
+        for directory in (self._pending_dir, self._sending_dir, self._failed_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _write(path, message):
+        temp_path = f"{path}.tmp-{os.getpid()}"
+        with open(temp_path, 'w') as f:
+            json.dump(message, f)
+        os.replace(temp_path, path)
+
+    def _ensure_worker(self):
+        # A thread started before gunicorn forks does not exist in the worker
+        with self._worker_lock:
+            if self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            self._ensure_dirs()
+            self._requeue_orphans()
+            self._worker = threading.Thread(target=self._run, name='mail-outbox', daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+
+    def start(self):
+        """Start the sender now, e.g. to flush mail left over from a previous run."""
+        self._ensure_worker()
+
+    def _requeue_orphans(self):
+        for name in os.listdir(self._sending_dir):
+            message_file, _, pid = name.rpartition('.')
+            if pid.isdigit() and _process_alive(int(pid)):
+                continue
+            try:
+                os.replace(os.path.join(self._sending_dir, name), os.path.join(self._pending_dir, message_file))
+            except FileNotFoundError:
+                pass
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(MAIL_POLL_INTERVAL)
+            self._wakeup.clear()
+            try:
+                while self._send_batch():
+                    pass
+            except Exception as e:
+                logger.error("Mail outbox sender error: %s", e)
+            if self._smtp is not None and time.monotonic() - self._last_used > MAIL_IDLE_TIMEOUT:
+                self._disconnect()
+
+    def _claim_batch(self):
+        now = time.time()
+        claimed = []
+        for name in sorted(os.listdir(self._pending_dir)):
+            if len(claimed) >= MAIL_BATCH_SIZE:
+                break
+            if not name.endswith('.json'):
+                continue
+            source = os.path.join(self._pending_dir, name)
+            try:
+                with open(source) as f:
+                    message = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if message.get('next_attempt_at', 0) > now:
+                continue
+            target = os.path.join(self._sending_dir, f"{name}.{os.getpid()}")
+            try:
+                os.rename(source, target)
+            except FileNotFoundError:
+                # Another worker claimed it first
+                continue
+            claimed.append((target, message))
+        return claimed
+
+    def _send_batch(self):
+        """Deliver one batch. Returns True if there may be more due mail."""
+        batch = self._claim_batch()
+        if not batch:
+            return False
+
+        for index, (path, message) in enumerate(batch):
+            try:
+                self._deliver(message)
+            except Exception as e:
+                self._disconnect()
+                self._reschedule(path, message, e)
+                # The connection just failed; leave the rest of the batch for the retry
+                for other_path, other_message in batch[index + 1:]:
+                    os.replace(other_path, os.path.join(self._pending_dir, f"{other_message['id']}.json"))
+                return False
+            os.remove(path)
+        return len(batch) == MAIL_BATCH_SIZE
+
+    def _deliver(self, message):
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+
+        msg = MIMEMultipart()
+        msg['From'] = message['from']
+        msg['To'] = message['to']
+        msg['Subject'] = message['subject']
+        msg.attach(MIMEText(message['body'], 'plain'))
+
+        with metrics.span('smtp', 'send'):
+            self._connection().send_message(msg)
+        self._last_used = time.monotonic()
+
+    def _reschedule(self, path, message, error):
+        message['attempts'] += 1
+        if not _is_transient(error) or message['attempts'] >= MAIL_MAX_ATTEMPTS:
+            logger.error("Giving up on mail %s after %s attempts: %s", message['id'], message['attempts'], error)
+            self._write(os.path.join(self._failed_dir, f"{message['id']}.json"), message)
+            os.remove(path)
+            return
+
+        delay = min(2 ** message['attempts'] * MAIL_POLL_INTERVAL, 900)
+        message['next_attempt_at'] = time.time() + delay
+        logger.warning("Mail %s failed (%s); retrying in %.0fs", message['id'], error, delay)
+        self._write(os.path.join(self._pending_dir, f"{message['id']}.json"), message)
+        os.remove(path)
+
+    def _connection(self):
+        import smtplib
+
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except smtplib.SMTPException:
+                pass
+            self._disconnect()
+
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        if self.starttls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        self._smtp = server
+        return server
+
+    def _disconnect(self):
+        import smtplib
+
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+
+
+def _is_transient(error):
+    """Whether a delivery failure is worth retrying (network trouble, 4xx replies)."""
+    import smtplib
+
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        # Almost always bad or rotated credentials; keep the mail until they're fixed
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return False
+    return isinstance(error, OSError)
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+outbox = MailOutbox(username=os.getenv('GMAIL_USERNAME'), password=os.getenv('GOOGLE_PASSWORD'))
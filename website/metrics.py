@@ -0,0 +1,211 @@
+import os
+import re
+import hmac
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from flask import request, g, Response
+
+logger = logging.getLogger(__name__)
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Seconds; the tail covers LLM-backed routes that legitimately run for a minute
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_ID_SEGMENT = re.compile(r'/(?:\d+|[0-9a-fA-F-]{16,})(?=/|$)')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self, worker):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"]
+        names = ('worker',) + self.label_names
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_series(names, (worker,) + key, value) for key, value in items)
+        return '\n'.join(lines)
+
+    def _render_series(self, names, key, value):
+        return f"{self.name}{_format_labels(names, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (non-cumulative), +Inf, sum
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def _render_series(self, names, key, series):
+        counts, total = series
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _format_value(bound)
+            bucket_labels = _format_labels(names, key, f'le="{le}"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        labels = _format_labels(names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return '\n'.join(lines)
+
+
+request_duration = Histogram(
+    'sourcebox_http_request_duration_seconds',
+    'Time spent handling a request, by route.',
+    labels=('route', 'method', 'status')
+)
+requests_in_flight = Gauge(
+    'sourcebox_http_requests_in_flight',
+    'Requests currently being handled by this worker.'
+)
+upstream_duration = Histogram(
+    'sourcebox_upstream_duration_seconds',
+    'Time spent waiting on an upstream (Lambda, API, LLM API, OpenAI, SMTP, git).',
+    labels=('kind', 'operation', 'outcome')
+)
+
+REGISTRY = (request_duration, requests_in_flight, upstream_duration)
+
+
+class Span:
+    def __init__(self, kind, operation):
+        self.kind = kind
+        self.operation = operation
+        self.outcome = 'ok'
+
+
+@contextmanager
+def span(kind, operation):
+    """
+    Time one upstream call. The outcome is ``error`` if the block raises;
+    callers can also set ``span.outcome`` for failures signalled by a value,
+    such as a 5xx response.
+    """
+    current = Span(kind, operation)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException:
+        current.outcome = 'error'
+        raise
+    finally:
+        upstream_duration.observe(time.perf_counter() - started, kind=current.kind,
+                                  operation=current.operation, outcome=current.outcome)
+
+
+def normalise_path(path):
+    """Collapse numeric and hex ID segments so paths make bounded label values."""
+    return _ID_SEGMENT.sub('/:id', path) or '/'
+
+
+def render():
+    # Each gunicorn worker counts on its own, so every series carries the worker's
+    # pid; a scrape answered by another worker then adds series instead of
+    # making these ones jump backwards. Aggregate with sum(rate(...)) by route.
+    worker = os.getpid()
+    return '\n'.join(metric.render(worker) for metric in REGISTRY) + '\n'
+
+
+def metrics_view():
+    """
+    Prometheus text exposition for this worker. The scraper must send
+    METRICS_TOKEN as a bearer token; without one configured the endpoint
+    is closed, like the /internal ones.
+    """
+    if not METRICS_TOKEN:
+        logger.error("/metrics called but no METRICS_TOKEN is configured")
+        return Response("Not configured\n", status=503, mimetype='text/plain')
+    provided = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(provided.encode('utf-8'), f"Bearer {METRICS_TOKEN}".encode('utf-8')):
+        return Response("Unauthorized\n", status=401, mimetype='text/plain')
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """
+    Time every request by its URL rule and expose the registry at /metrics.
+
+    Metrics live in each worker process and are labelled with its pid, so
+    with several workers a scrape reports whichever one answered it; sum
+    the per-worker series for totals.
+    """
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+        g._metrics_status = 500
+        requests_in_flight.inc()
+
+    @app.after_request
+    def _record_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _observe(exc):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return
+        requests_in_flight.dec()
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = 500 if exc is not None else g.pop('_metrics_status', 500)
+        request_duration.observe(time.perf_counter() - started, route=route,
+                                 method=request.method, status=status)
+
+    app.add_url_rule('/metrics', endpoint='metrics', view_func=metrics_view)
@@ -0,0 +1,95 @@
+import os
+import gzip
+import hashlib
+from functools import wraps
+from flask import request, session, make_response, Response
+from flask_login import current_user
+from website import RELEASE_ID
+from website.assets import preload_link_header
+from website.cache import caches
+
+try:
+    import brotli
+except ImportError:  # optional: pages are served gzip or identity without it
+    brotli = None
+
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '256'))
+PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', '1') == '1'
+# Pages are compressed on a cache miss, in the request; the maximum levels are
+# kept for the build-time assets step, where they're paid once per deploy
+PAGE_GZIP_LEVEL = int(os.getenv('PAGE_GZIP_LEVEL', '6'))
+PAGE_BROTLI_QUALITY = int(os.getenv('PAGE_BROTLI_QUALITY', '5'))
+
+
+class CachedPage:
+    """A rendered page plus its precompressed encodings and preload hints."""
+
+    def __init__(self, body, content_type, link=None):
+        self.content_type = content_type
+        self.link = link
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.encodings = {'identity': body, 'gzip': gzip.compress(body, compresslevel=PAGE_GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            self.encodings['br'] = brotli.compress(body, quality=PAGE_BROTLI_QUALITY)
+
+    def to_response(self):
+        accepted = request.accept_encodings
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in self.encodings and accepted[candidate]:
+                encoding = candidate
+                break
+
+        response = Response(self.encodings[encoding], content_type=self.content_type)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        if self.link:
+            response.headers['Link'] = self.link
+        response.vary.add('Accept-Encoding')
+        # Same body, different bytes per encoding, so the validator is weak
+        response.set_etag(self.etag, weak=True)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+
+# CachedPage objects keyed by route, auth state and release
+page_cache = caches.register('pages', backend='memory', policy='lru', max_entries=PAGE_CACHE_MAX_ENTRIES)
+
+
+def _cacheable_request():
+    if not PAGE_CACHE_ENABLED or request.method not in ('GET', 'HEAD'):
+        return False
+    # None of the cached views read the query string; keying on it would let
+    # /?<random> force a render and evict the real entries
+    if request.query_string:
+        return False
+    # Flashed messages and a logged-in navbar are baked into the render
+    if '_flashes' in session or current_user.is_authenticated:
+        return False
+    return True
+
+
+def cached_page(view):
+    """
+    Serve a view's rendered HTML from memory for anonymous visitors.
+
+    Only 200 responses are stored, and requests with a query string are
+    always rendered afresh. Entries are keyed on RELEASE_ID, so a
+    deploy starts from an empty cache even if a worker survives it.
+    """
+    @wraps(view)
+    def decorated_view(*args, **kwargs):
+        if not _cacheable_request():
+            return view(*args, **kwargs)
+
+        auth_state = 'session' if session.get('access_token') else 'anonymous'
+        key = (request.endpoint, request.path, auth_state, RELEASE_ID)
+        page = page_cache.get(key)
+        if page is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            page = CachedPage(response.get_data(), response.content_type, preload_link_header())
+            page_cache.set(key, page)
+        return page.to_response()
+    return decorated_view
@@ -0,0 +1,211 @@
+import os
+import math
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from functools import wraps
+from flask import request, session, jsonify, make_response
+from website.user_cache import token_key
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_PATH = os.getenv('RATE_LIMIT_PATH', os.path.join(tempfile.gettempdir(), 'sourcebox-rate-limit.sqlite3'))
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1') == '1'
+# Heroku's router appends the connecting address to X-Forwarded-For; anything left of it is client-supplied
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '1'))
+# Requests each worker process runs at once on the expensive (LLM-backed) routes. Keep it
+# below GUNICORN_THREADS so cheap pages always have a free thread.
+EXPENSIVE_CONCURRENCY = int(os.getenv('EXPENSIVE_CONCURRENCY', '4'))
+# Sweep idle buckets every this many takes
+PURGE_EVERY = 1000
+
+
+class Limit:
+    """``requests`` per ``seconds``, allowing bursts of up to ``burst`` (default ``requests``)."""
+
+    def __init__(self, requests, seconds, burst=None):
+        self.rate = requests / seconds
+        self.capacity = burst or requests
+
+    @classmethod
+    def from_env(cls, name, default):
+        """
+        Read ``requests/seconds`` (e.g. ``10/60``) from ``name``, falling back
+        to ``default`` when it is unset or not two positive numbers.
+        """
+        value = os.getenv(name)
+        if not value:
+            return default
+        requests, _, seconds = value.partition('/')
+        try:
+            requests, seconds = float(requests), float(seconds or 60)
+        except ValueError:
+            requests = seconds = 0
+        if requests <= 0 or seconds <= 0 or math.isinf(requests) or math.isinf(seconds):
+            logger.warning("Ignoring invalid %s=%r; expected e.g. 10/60", name, value)
+            return default
+        return cls(requests, seconds)
+
+
+class TokenBucketStore:
+    """
+    Token buckets shared by every gunicorn worker on a dyno.
+
+    One WAL-mode SQLite row per bucket; each take is a single IMMEDIATE
+    transaction, so concurrent workers never both spend the last token.
+    That read-modify-write is why this isn't a website.cache backend:
+    a get followed by a set would let two workers spend the same token.
+    """
+
+    def __init__(self, path=RATE_LIMIT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialised = False
+        self._takes = 0
+
+    def _connection(self):
+        # sqlite3 connections can't cross threads or forks, so keep one per thread per process
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=2, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        with self._init_lock:
+            if not self._initialised:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS buckets ("
+                    "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL) WITHOUT ROWID"
+                )
+                self._initialised = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key, limit):
+        """Spend one token from ``key``. Returns (allowed, seconds until a token is available)."""
+        return self.take_all([key], limit)
+
+    def take_all(self, keys, limit):
+        """
+        Spend one token from every bucket in ``keys``, or from none of them if
+        any is empty. Returns (allowed, seconds until all have a token).
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = {}
+            for key in keys:
+                row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+                levels[key] = limit.capacity if row is None else min(limit.capacity, row[0] + (now - row[1]) * limit.rate)
+            allowed = all(tokens >= 1 for tokens in levels.values())
+            conn.executemany(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                [(key, tokens - 1 if allowed else tokens, now) for key, tokens in levels.items()]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._takes += 1
+        if self._takes % PURGE_EVERY == 0:
+            self.purge_idle()
+        if allowed:
+            return True, 0
+        return False, max((1 - tokens) / limit.rate for tokens in levels.values() if tokens < 1)
+
+    def purge_idle(self, max_idle=3600):
+        """Drop buckets untouched for ``max_idle`` seconds; they would be full again anyway."""
+        return self._connection().execute("DELETE FROM buckets WHERE updated_at < ?", (time.time() - max_idle,)).rowcount
+
+
+bucket_store = TokenBucketStore()
+
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+def _slot(name, size):
+    # Per-process, so recreated after a fork rather than inherited from the master
+    key = (name, os.getpid())
+    with _slots_lock:
+        if key not in _slots:
+            _slots[key] = threading.BoundedSemaphore(size)
+        return _slots[key]
+
+
+def client_ip():
+    """The caller's address as seen by the outermost trusted proxy."""
+    forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+    if TRUSTED_PROXY_COUNT and len(forwarded) >= TRUSTED_PROXY_COUNT:
+        return forwarded[-TRUSTED_PROXY_COUNT]
+    return request.remote_addr or 'unknown'
+
+
+def _client_keys(name):
+    keys = [f"{name}:ip:{client_ip()}"]
+    token = session.get('access_token')
+    if token:
+        keys.append(f"{name}:session:{token_key(token)}")
+    return keys
+
+
+def _too_many(message, retry_after):
+    # Consume the unread body, or the next request on this keep-alive connection is garbled
+    request.get_data()
+    response = jsonify({"error": "Too many requests", "details": message})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limited(name, limit, concurrency=EXPENSIVE_CONCURRENCY, pool='expensive'):
+    """
+    Guard an expensive view with a per-client token bucket and a per-process
+    concurrency cap.
+
+    The caller's IP and, when signed in, their session token each get a
+    bucket named ``name``; either running dry returns 429 with Retry-After.
+    If ``concurrency`` requests for views sharing its ``pool`` are already
+    running in this worker, the request is turned away straight away rather
+    than queued behind them. Streamed responses hold their slot until the stream
+    is closed.
+
+    The concurrency cap is checked first, and tokens are only spent when
+    every bucket has one, so a rejected request costs the client nothing.
+    """
+    def decorator(view):
+        @wraps(view)
+        def decorated_view(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED:
+                return view(*args, **kwargs)
+
+            slot = _slot(pool, concurrency)
+            if not slot.acquire(blocking=False):
+                return _too_many("The server is busy; try again shortly.", 1)
+
+            try:
+                allowed, retry_after = bucket_store.take_all(_client_keys(name), limit)
+            except sqlite3.Error as e:
+                # Fail open: a broken limiter must not take the demos down
+                logger.error("Rate limiter unavailable: %s", e)
+                allowed = True
+            if not allowed:
+                slot.release()
+                return _too_many("Rate limit exceeded for this endpoint; try again later.", retry_after)
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except BaseException:
+                slot.release()
+                raise
+            response.call_on_close(slot.release)
+            return response
+        return decorated_view
+    return decorator
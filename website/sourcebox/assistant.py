@@ -0,0 +1,101 @@
+import os
+import json
+import logging
+import threading
+from website import metrics
+
+logger = logging.getLogger(__name__)
+
+CHAT_ASSISTANT_MODEL = os.getenv('CHAT_ASSISTANT_MODEL', 'gpt-3.5-turbo')
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '60'))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client():
+    """
+    Return this worker's long-lived OpenAI client, creating it on first use.
+    The openai package is only imported here; it is the slowest import in the app.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), timeout=OPENAI_TIMEOUT)
+    return _client
+
+
+def _messages(user_message):
+    return [
+        {
+            "role": "user",
+            "content": user_message,
+        }
+    ]
+
+
+def _report_usage(usage, on_usage):
+    if usage is None or on_usage is None:
+        return
+    try:
+        on_usage(usage.prompt_tokens or 0, usage.completion_tokens or 0)
+    except Exception as e:
+        logger.error("Error recording chat completion usage: %s", e)
+
+
+def complete(user_message, on_usage=None):
+    """
+    Run one blocking chat completion and return the assistant's reply.
+    ``on_usage(prompt_tokens, completion_tokens)`` is called with its token usage.
+    """
+    with metrics.span('openai', 'chat.completions'):
+        chat_completion = get_openai_client().chat.completions.create(
+            messages=_messages(user_message),
+            model=CHAT_ASSISTANT_MODEL,
+        )
+    _report_usage(chat_completion.usage, on_usage)
+    return chat_completion.choices[0].message.content
+
+
+def _sse(data, event=None):
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+
+def stream_events(user_message, on_usage=None):
+    """
+    Yield server-sent events for a streamed chat completion.
+
+    Each token batch is sent as ``data: {"delta": ...}`` followed by a final
+    ``done`` event. If the browser goes away the WSGI server closes this
+    generator, and closing the OpenAI stream aborts the upstream request.
+    The usage OpenAI appends to the end of the stream goes to ``on_usage``.
+    """
+    try:
+        # Measures time to the first byte; the stream itself is timed by the request
+        with metrics.span('openai', 'chat.completions.stream'):
+            stream = get_openai_client().chat.completions.create(
+                messages=_messages(user_message),
+                model=CHAT_ASSISTANT_MODEL,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+    except Exception as e:
+        logger.error("Error starting chat completion stream: %s", e)
+        yield _sse({"error": str(e)}, event='error')
+        return
+
+    try:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield _sse({"delta": delta})
+            _report_usage(getattr(chunk, 'usage', None), on_usage)
+        yield _sse({}, event='done')
+    except Exception as e:
+        logger.error("Chat completion stream failed: %s", e)
+        yield _sse({"error": str(e)}, event='error')
+    finally:
+        stream.close()
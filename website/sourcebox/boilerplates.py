@@ -0,0 +1,258 @@
+import os
+import glob
+import time
+import fcntl
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from website import metrics
+
+logger = logging.getLogger(__name__)
+
+BOILERPLATE_REPOS = {
+    'pc_scanner': "https://github.com/SourceBox-LLC/SourceLighting-PC-scannerApp.git",
+    'vanilla_gpt': "https://github.com/SourceBox-LLC/SourceLightning-Vanilla-GPT.git",
+    'vanilla_claud': "https://github.com/SourceBox-LLC/SourceLightning-Vanilla-Claude.git"
+}
+BOILERPLATE_CACHE_DIR = os.getenv('BOILERPLATE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'sourcebox-boilerplates'))
+BOILERPLATE_REFRESH_INTERVAL = float(os.getenv('BOILERPLATE_REFRESH_INTERVAL', '3600'))
+GIT_TIMEOUT = float(os.getenv('BOILERPLATE_GIT_TIMEOUT', '120'))
+# Build every archive in the background as soon as a worker starts serving
+BOILERPLATE_PREBUILD = os.getenv('BOILERPLATE_PREBUILD', '1') == '1'
+# How long a replaced archive stays on disk for downloads that already picked it
+BOILERPLATE_ARCHIVE_GRACE = float(os.getenv('BOILERPLATE_ARCHIVE_GRACE', '600'))
+
+# Never let git block a worker waiting for credentials
+GIT_ENV = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+
+
+class BoilerplateArchive:
+    """A built zip of one boilerplate repo at a given commit."""
+
+    def __init__(self, name, commit, path):
+        self.name = name
+        self.commit = commit
+        self.path = path
+
+    @property
+    def download_name(self):
+        return f"{self.name}_repo.zip"
+
+
+class BoilerplateCache:
+    """
+    Builds each boilerplate repo into a zip once and serves it from disk.
+
+    Archives are named after the commit they were built from, so a restart
+    (or another gunicorn worker) picks up an existing build instead of
+    cloning again. Builds for the same repo are serialised with a thread lock
+    inside a worker and a file lock across workers, so concurrent requests
+    share one build. A background thread started by ``start`` builds any
+    missing archive straight away (with ``prebuild``), then polls
+    ``git ls-remote`` and rebuilds when the branch head moves. A request
+    only waits on a build if it arrives before that first one finishes.
+
+    An archive that has been replaced is kept for ``grace_period`` seconds,
+    so a download that already resolved its path can still open it.
+    Archives are files handed to ``send_file`` by path, which is why they
+    are managed here and not stored in a website.cache backend.
+    """
+
+    def __init__(self, repos=BOILERPLATE_REPOS, cache_dir=BOILERPLATE_CACHE_DIR,
+                 refresh_interval=BOILERPLATE_REFRESH_INTERVAL, prebuild=BOILERPLATE_PREBUILD,
+                 grace_period=BOILERPLATE_ARCHIVE_GRACE):
+        self.repos = repos
+        self.cache_dir = cache_dir
+        self.refresh_interval = refresh_interval
+        self.prebuild = prebuild
+        self.grace_period = grace_period
+        self._archives = {}
+        self._locks = {name: threading.Lock() for name in repos}
+        self._refresher = None
+        self._refresher_pid = None
+        self._refresher_lock = threading.Lock()
+
+    def start(self):
+        """Start this process's background builder/refresher if it isn't running."""
+        refresher = self._refresher
+        if refresher is not None and self._refresher_pid == os.getpid() and refresher.is_alive():
+            return
+        self._ensure_refresher()
+
+    def get(self, name):
+        """Return the BoilerplateArchive for ``name``, building it if needed."""
+        if name not in self.repos:
+            raise KeyError(name)
+
+        self._ensure_refresher()
+        archive = self._current(name)
+        if archive is not None:
+            return archive
+
+        with self._locks[name], self._file_lock(name):
+            archive = self._current(name)
+            if archive is None:
+                archive = self._build(name)
+            return archive
+
+    def refresh(self, name):
+        """Rebuild ``name`` if its remote head moved. Returns the current archive."""
+        commit = self._remote_head(name)
+        archive = self._current(name)
+        if commit is None or (archive is not None and archive.commit == commit):
+            return archive
+
+        with self._locks[name], self._file_lock(name):
+            archive = self._current(name)
+            if archive is None or archive.commit != commit:
+                archive = self._build(name, commit)
+            return archive
+
+    def _current(self, name):
+        """The newest archive on disk for ``name``, which may come from another worker."""
+        archive = self._archives.get(name)
+        if archive is not None and os.path.exists(archive.path):
+            return archive
+
+        paths = glob.glob(os.path.join(self.cache_dir, f"{name}_repo-*.zip"))
+        if not paths:
+            return None
+        path = max(paths, key=os.path.getmtime)
+        commit = os.path.basename(path)[len(f"{name}_repo-"):-len('.zip')]
+        archive = BoilerplateArchive(name, commit, path)
+        self._archives[name] = archive
+        return archive
+
+    def _file_lock(self, name):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return _FileLock(os.path.join(self.cache_dir, f"{name}.lock"))
+
+    def _remote_head(self, name):
+        try:
+            with metrics.span('git', 'ls-remote'):
+                result = subprocess.run(
+                    ["git", "ls-remote", self.repos[name], "HEAD"],
+                    check=True, capture_output=True, text=True, timeout=GIT_TIMEOUT, env=GIT_ENV
+                )
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.error("Error checking remote head for %s: %s", name, e)
+            return None
+        output = result.stdout.split()
+        return output[0][:12] if output else None
+
+    def _build(self, name, commit=None):
+        commit = commit or self._remote_head(name)
+        if commit is None:
+            raise RuntimeError(f"Could not resolve the remote head of {name}")
+
+        parent_folder_name = f"{name}_repo"
+        temp_dir = tempfile.mkdtemp(dir=self.cache_dir)
+        started = time.monotonic()
+        try:
+            repo_dir = os.path.join(temp_dir, parent_folder_name)
+            with metrics.span('git', 'clone'):
+                subprocess.run(
+                    ["git", "clone", "--depth", "1", self.repos[name], repo_dir],
+                    check=True, capture_output=True, timeout=GIT_TIMEOUT, env=GIT_ENV
+                )
+            shutil.rmtree(os.path.join(repo_dir, '.git'), ignore_errors=True)
+
+            built = shutil.make_archive(os.path.join(temp_dir, name), 'zip', temp_dir, parent_folder_name)
+            final_path = os.path.join(self.cache_dir, f"{parent_folder_name}-{commit}.zip")
+            os.replace(built, final_path)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        self._prune(name)
+        logger.info("Built %s at %s in %.1fs", name, commit, time.monotonic() - started)
+        archive = BoilerplateArchive(name, commit, final_path)
+        self._archives[name] = archive
+        return archive
+
+    def _prune(self, name):
+        """Delete archives for older commits once they have been replaced for ``grace_period`` seconds."""
+        archives = []
+        for path in glob.glob(os.path.join(self.cache_dir, f"{name}_repo-*.zip")):
+            try:
+                archives.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                pass
+        archives.sort()
+        # Each archive was replaced when the next newer one was written
+        for (_, path), (replaced_at, _) in zip(archives, archives[1:]):
+            if time.time() - replaced_at < self.grace_period:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _ensure_refresher(self):
+        # Threads don't survive a fork, so check the refresher belongs to this process
+        if self.refresh_interval <= 0 and not self.prebuild:
+            return
+        with self._refresher_lock:
+            if self._refresher_pid == os.getpid() and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name='boilerplate-refresh', daemon=True)
+            self._refresher_pid = os.getpid()
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        if self.prebuild:
+            self._refresh_all()
+        while self.refresh_interval > 0:
+            time.sleep(self.refresh_interval)
+            self._refresh_all()
+
+    def _refresh_all(self):
+        for name in self.repos:
+            try:
+                if self._current(name) is None:
+                    # Another worker may be building it already; the file lock makes us share that build
+                    if self.prebuild:
+                        self.get(name)
+                    continue
+                self.refresh(name)
+                self._prune(name)
+            except Exception as e:
+                logger.error("Error refreshing boilerplate %s: %s", name, e)
+
+
+class _FileLock:
+    """
+    Exclusive flock on a file, used to share one build across worker processes.
+    The lock is polled rather than waited on, because a blocking flock would
+    stall every greenlet in a gevent worker for the length of a clone.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        while True:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return self
+            except BlockingIOError:
+                time.sleep(0.1)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+boilerplate_cache = BoilerplateCache()
+
+
+def init_app(app):
+    # Started from the first request rather than here: with preload_app this runs in the
+    # gunicorn master, and the builder thread has to belong to each worker
+    @app.before_request
+    def _start_boilerplate_builds():
+        boilerplate_cache.start()
@@ -0,0 +1,101 @@
+import os
+import hashlib
+import threading
+import unicodedata
+from website.cache import caches
+
+DEMO_CACHE_SIZE = int(os.getenv('DEMO_CACHE_SIZE', '512'))
+# Bodies bigger than this (bytes) are relayed but not kept
+DEMO_CACHE_MAX_BODY = int(os.getenv('DEMO_CACHE_MAX_BODY', str(2 * 1024 * 1024)))
+
+
+def normalise_prompt(prompt):
+    """Collapse whitespace and Unicode forms so trivially different prompts share an entry."""
+    return ' '.join(unicodedata.normalize('NFC', prompt).split())
+
+
+def result_key(endpoint, payload, accept_encoding):
+    """
+    Cache key for a demo call. The client's Accept-Encoding is part of it,
+    since the upstream body is stored exactly as it was encoded for them.
+    """
+    prompt = normalise_prompt((payload or {}).get('prompt', ''))
+    digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    return (endpoint, digest, accept_encoding)
+
+
+class CachedResult:
+    def __init__(self, body, headers):
+        self.body = body
+        self.headers = headers
+
+
+class Fill:
+    """
+    The leader's promise to fill one key. ``complete`` stores the body and
+    wakes the waiting requests; ``abandon`` just wakes them. Both are safe
+    to call more than once, and whichever comes first wins.
+    """
+
+    def __init__(self, cache, key, event, ttl):
+        self.cache = cache
+        self.key = key
+        self.event = event
+        self.ttl = ttl
+        self.headers = {}
+
+    def complete(self, body):
+        if len(body) <= DEMO_CACHE_MAX_BODY:
+            self.cache.set(self.key, CachedResult(body, self.headers), self.ttl)
+        self.abandon()
+
+    def abandon(self):
+        self.cache.release(self.key, self.event)
+
+
+class DemoResultCache:
+    """
+    Successful demo responses, stored in ``results``, with request coalescing.
+
+    ``claim`` either returns a fresh cached result, makes the caller the
+    leader for a key (it gets a Fill to complete), or hands back the Event
+    of the leader already fetching that key so the caller can wait for it
+    instead of sending a duplicate upstream call.
+    """
+
+    def __init__(self, results):
+        self.results = results
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def claim(self, key, ttl):
+        """Return (cached result, fill, event); exactly one of them is not None."""
+        with self._lock:
+            entry = self.results.get(key)
+            if entry is not None:
+                return entry, None, None
+            event = self._in_flight.get(key)
+            if event is not None:
+                return None, None, event
+            event = self._in_flight[key] = threading.Event()
+            return None, Fill(self, key, event, ttl), None
+
+    def set(self, key, entry, ttl):
+        self.results.set(key, entry, ttl)
+
+    def release(self, key, event):
+        with self._lock:
+            if self._in_flight.get(key) is event:
+                del self._in_flight[key]
+        event.set()
+
+    def clear(self):
+        self.results.clear()
+
+
+demo_cache = DemoResultCache(
+    caches.register('demo_results', backend='memory', policy='lru', max_entries=DEMO_CACHE_SIZE)
+)
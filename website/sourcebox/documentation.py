@@ -0,0 +1,155 @@
+import os
+import re
+import sys
+import glob
+import hashlib
+import logging
+import threading
+from website.cache import caches
+
+logger = logging.getLogger(__name__)
+
+DOCS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'docs')
+DOCS_CACHE_PATH = os.getenv('DOCS_CACHE_PATH', os.path.join(DOCS_DIR, '.build', 'pages.cache'))
+
+# The page served at /documentation/help; every other source is a section of /documentation
+HELP_PAGE = 'help'
+
+MARKDOWN_EXTENSIONS = ('extra', 'sane_lists', 'toc')
+TOC_DEPTH = '2-3'
+# Part of every cache key: bump it when the compiler output changes for the same source
+COMPILER_VERSION = '1'
+
+# Sections are ordered by a numeric prefix that isn't part of their slug, e.g. 20-pack-man.md
+_ORDER_PREFIX_RE = re.compile(r"^\d+-")
+_TITLE_RE = re.compile(r"\A\s*#\s+(.+?)\s*#*\s*$", re.M)
+
+# Compiled pages keyed by source hash, namespaced by slug
+docs_cache = caches.register('docs', backend='mmap', path=DOCS_CACHE_PATH)
+
+
+class DocPage:
+    """One compiled Markdown source: its HTML, table of contents and title."""
+
+    def __init__(self, slug, title, html, toc):
+        self.slug = slug
+        self.title = title
+        self.html = html
+        # [{'id', 'name', 'level'}] for the headings within TOC_DEPTH; names are already HTML-escaped
+        self.toc = toc
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['slug'], data['title'], data['html'], data['toc'])
+
+    def to_dict(self):
+        return {'slug': self.slug, 'title': self.title, 'html': self.html, 'toc': self.toc}
+
+
+def source_hash(source):
+    return hashlib.sha256(f"{COMPILER_VERSION}\0".encode('utf-8') + source).hexdigest()[:20]
+
+
+def _flatten_toc(tokens):
+    for token in tokens:
+        yield {'id': token['id'], 'name': token['name'], 'level': token['level']}
+        yield from _flatten_toc(token['children'])
+
+
+def compile_page(slug, source):
+    """
+    Render Markdown ``source`` to a DocPage. A leading ``# Heading`` becomes
+    the title rather than part of the body, and heading ids are prefixed
+    with the slug so sections can share a page.
+    """
+    # Only the docs build and a cold cache need the parser
+    import markdown
+    from markdown.extensions.toc import slugify
+
+    text = source.decode('utf-8')
+    match = _TITLE_RE.match(text)
+    title = slug.replace('-', ' ').title()
+    if match:
+        title = match.group(1)
+        text = text[match.end():]
+
+    md = markdown.Markdown(
+        extensions=list(MARKDOWN_EXTENSIONS),
+        extension_configs={'toc': {
+            'toc_depth': TOC_DEPTH,
+            'slugify': lambda value, separator: f"{slug}{separator}{slugify(value, separator)}"
+        }},
+        output_format='html'
+    )
+    html = md.convert(text)
+    return DocPage(slug, title, html, list(_flatten_toc(md.toc_tokens)))
+
+
+class DocsLibrary:
+    """
+    The documentation pages, compiled from the Markdown files in DOCS_DIR.
+
+    Compiled pages are stored in the 'docs' cache under the hash of their
+    source, so only new or edited files are ever parsed: by the docs build
+    at deploy time, or by ``load`` at boot for anything the build missed.
+    Requests only read the pages ``load`` left in memory.
+    """
+
+    def __init__(self, docs_dir=DOCS_DIR, cache=docs_cache):
+        self.docs_dir = docs_dir
+        self.cache = cache
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def sources(self):
+        """[(slug, path)] for every Markdown source, in section order."""
+        sources = []
+        for path in sorted(glob.glob(os.path.join(self.docs_dir, '*.md'))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            sources.append((_ORDER_PREFIX_RE.sub('', name), path))
+        return sources
+
+    def load(self):
+        """Read every page from the cache, compiling the ones whose source changed. Returns how many were compiled."""
+        pages = {}
+        compiled = 0
+        with self._lock:
+            for slug, path in self.sources():
+                with open(path, 'rb') as f:
+                    source = f.read()
+                digest = source_hash(source)
+                data = self.cache.get(digest, namespace=slug)
+                if data is None:
+                    page = compile_page(slug, source)
+                    # Drop the pages compiled from older versions of this source
+                    self.cache.invalidate(slug)
+                    self.cache.set(digest, page.to_dict(), namespace=slug)
+                    compiled += 1
+                    logger.info("Compiled docs page %s", slug)
+                else:
+                    page = DocPage.from_dict(data)
+                pages[slug] = page
+            self._pages = pages
+        return compiled
+
+    def page(self, slug):
+        return self._pages.get(slug)
+
+    def sections(self):
+        """The pages shown on /documentation, in order."""
+        return [page for slug, page in self._pages.items() if slug != HELP_PAGE]
+
+
+docs_library = DocsLibrary()
+
+
+def init_app(app):
+    docs_library.load()
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['build']:
+        sys.exit("usage: python -m website.sourcebox.documentation build")
+    logging.basicConfig(level=logging.INFO)
+    compiled = docs_library.load()
+    logger.info("Compiled %s of %s docs pages into %s", compiled, len(docs_library.sources()), DOCS_CACHE_PATH)
@@ -0,0 +1,193 @@
+import os
+import logging
+import requests
+from flask import request, jsonify, Response, stream_with_context
+from website import http_client
+from website.rate_limit import Limit, rate_limited
+from website.sourcebox.demo_cache import demo_cache, result_key
+
+logger = logging.getLogger(__name__)
+
+LLM_API_URL = os.getenv('LLM_API_URL', 'https://sb-general-llm-api-248b890f970f.herokuapp.com')
+CHUNK_SIZE = 8192
+
+# Response headers that describe the body bytes and are safe to pass through untouched
+FORWARDED_HEADERS = ('Content-Type', 'Content-Encoding', 'Content-Length')
+
+
+def require_prompt(data):
+    """Validation rule: a non-blank string ``prompt``. Returns (payload, error)."""
+    prompt = data.get('prompt')
+    if not prompt or not isinstance(prompt, str) or not prompt.strip():
+        return None, "Prompt is required"
+    return {"prompt": prompt}, None
+
+
+# Per-client budgets for the LLM-backed demos; override with e.g. RATE_LIMIT_DEMO=20/60
+DEMO_LIMIT = Limit.from_env('RATE_LIMIT_DEMO', Limit(10, 60))
+IMAGE_LIMIT = Limit.from_env('RATE_LIMIT_IMAGE', Limit(3, 60))
+
+# Seconds a demo answer is reused for the same prompt; scraped pages go stale sooner
+DEMO_CACHE_TTL = float(os.getenv('DEMO_CACHE_TTL', '3600'))
+WEBSCRAPE_CACHE_TTL = float(os.getenv('WEBSCRAPE_CACHE_TTL', '600'))
+# Seconds an identical request waits on the in-flight call before making its own. The
+# waiter holds a concurrency slot meanwhile, so keep this well below SLOW_READ_TIMEOUT
+DEMO_COALESCE_WAIT = float(os.getenv('DEMO_COALESCE_WAIT', '15'))
+
+
+# path -> upstream route table for the landing page demos
+DEMO_PROXY_ROUTES = [
+    {
+        'path': '/rag-api',
+        'endpoint': 'rag_api',
+        'upstream': '/landing-rag-example',
+        'method': 'POST',
+        'validate': require_prompt,
+        'rate_limit': DEMO_LIMIT,
+        'cache_ttl': DEMO_CACHE_TTL
+    },
+    {
+        'path': '/rag-api-sentiment',
+        'endpoint': 'rag_api_sentiment',
+        'upstream': '/landing-sentiment-example',
+        'method': 'POST',
+        'validate': require_prompt,
+        'rate_limit': DEMO_LIMIT,
+        'cache_ttl': DEMO_CACHE_TTL
+    },
+    {
+        'path': '/rag-api-webscrape',
+        'endpoint': 'rag_api_webscrape',
+        'upstream': '/landing-webscrape-example',
+        'method': 'POST',
+        'validate': require_prompt,
+        'rate_limit': DEMO_LIMIT,
+        'cache_ttl': WEBSCRAPE_CACHE_TTL
+    },
+    {
+        'path': '/rag-api-image',
+        'endpoint': 'image_generation',
+        'upstream': '/landing-imagegen-example',
+        'method': 'POST',
+        'validate': require_prompt,
+        'rate_limit': IMAGE_LIMIT,
+        'cache_ttl': DEMO_CACHE_TTL
+    }
+]
+
+
+def _request_data():
+    # Check if the request has JSON content type, otherwise handle form data
+    if request.content_type == 'application/json':
+        return request.get_json(silent=True) or {}
+    return request.form
+
+
+def _relay(upstream, fill=None):
+    """
+    Yield the upstream body exactly as received, without decoding it. With
+    a ``fill``, the body is also collected and cached once fully relayed.
+    """
+    chunks = []
+    try:
+        for chunk in upstream.raw.stream(CHUNK_SIZE, decode_content=False):
+            if fill is not None:
+                chunks.append(chunk)
+            yield chunk
+        if fill is not None:
+            fill.complete(b''.join(chunks))
+    finally:
+        upstream.close()
+        if fill is not None:
+            fill.abandon()
+
+
+def proxy_to_upstream(route, payload=None, fill=None):
+    """
+    Forward a request to the route's upstream and stream the body back.
+    Successful responses are relayed byte-for-byte as they arrive; failures
+    are wrapped in the usual ``{"error", "details"}`` envelope. A ``fill``
+    from the demo cache is completed with the body, or abandoned on error.
+    """
+    url = f"{LLM_API_URL}{route['upstream']}"
+    # Ask for whatever encoding our client accepts so the bytes can be relayed as-is
+    headers = {'Accept-Encoding': request.headers.get('Accept-Encoding', 'identity')}
+
+    try:
+        upstream = http_client.request(
+            route['method'],
+            url,
+            json=payload,
+            headers=headers,
+            stream=True,
+            timeout=(http_client.CONNECT_TIMEOUT, http_client.SLOW_READ_TIMEOUT),
+            upstream='llm_api'
+        )
+    except requests.RequestException as e:
+        logger.error("Error proxying %s to %s: %s", route['path'], url, e)
+        if fill is not None:
+            fill.abandon()
+        return jsonify({"error": str(e)}), 500
+
+    if upstream.status_code != 200:
+        details = upstream.text
+        upstream.close()
+        if fill is not None:
+            fill.abandon()
+        return jsonify({"error": "Failed to get a response from external API", "details": details}), upstream.status_code
+
+    response_headers = {name: upstream.headers[name] for name in FORWARDED_HEADERS if name in upstream.headers}
+    response = Response(stream_with_context(_relay(upstream, fill)), status=200, headers=response_headers)
+    if fill is not None:
+        fill.headers = response_headers
+        # A relay that is never iterated never reaches its finally block
+        response.call_on_close(fill.abandon)
+    return response
+
+
+def cached_proxy(route, payload):
+    """
+    Serve a demo call from the result cache. On a miss the first request
+    for a prompt goes upstream and tees the body into the cache; identical
+    requests arriving meanwhile wait for it rather than calling upstream
+    again, and only fall back to their own call if it fails or takes
+    longer than DEMO_COALESCE_WAIT.
+    """
+    key = result_key(route['endpoint'], payload, request.headers.get('Accept-Encoding', 'identity'))
+    result, fill, in_flight = demo_cache.claim(key, route['cache_ttl'])
+    if in_flight is not None:
+        in_flight.wait(DEMO_COALESCE_WAIT)
+        result = demo_cache.get(key)
+        if result is None:
+            return proxy_to_upstream(route, payload)
+    if result is not None:
+        return Response(result.body, status=200, headers=result.headers)
+    return proxy_to_upstream(route, payload, fill)
+
+
+def _make_view(route):
+    def proxy_view():
+        payload = None
+        if route['validate'] is not None:
+            payload, error = route['validate'](_request_data())
+            if error:
+                return jsonify({"error": error}), 400
+        if route.get('cache_ttl'):
+            return cached_proxy(route, payload)
+        return proxy_to_upstream(route, payload)
+
+    proxy_view.__name__ = route['endpoint']
+    if route.get('rate_limit') is not None:
+        proxy_view = rate_limited(route['endpoint'], route['rate_limit'])(proxy_view)
+    return proxy_view
+
+
+def register_proxy_routes(blueprint, routes=DEMO_PROXY_ROUTES):
+    """Attach one streaming proxy view per entry in ``routes`` to ``blueprint``."""
+    for route in routes:
+        blueprint.add_url_rule(
+            route['path'],
+            endpoint=route['endpoint'],
+            view_func=_make_view(route),
+            methods=[route['method']]
+        )
@@ -0,0 +1,223 @@
+import os
+import re
+import html
+import math
+import bisect
+import logging
+from functools import lru_cache
+from flask import url_for
+from website.sourcebox.documentation import docs_library, HELP_PAGE
+
+logger = logging.getLogger(__name__)
+
+# (title, endpoint, template whose text is indexed)
+SEARCHABLE_PAGES = [
+    ('Home', 'views.landing', 'landing.html'),
+    ('Dashboard', 'views.dashboard', 'dashboard.html'),
+    ('Updates', 'views.updates', 'updates.html'),
+    ('Services', 'views.content', 'content.html'),
+    ('DeepQuery', 'views.launch_deepquery', None),
+    ('Source Lightning', 'views.launch_source_lightning', None),
+    ('Pack-Man', 'views.launch_pack_man', None),
+    ('Documentation', 'views.documentation', 'docs.html'),
+    ('User Settings', 'views.user_settings', 'user_settings.html'),
+    ('Premium Info', 'views.premium_info', 'premium_info.html'),
+    ('Platform Support', 'views.platform_support', 'support.html'),
+    ('Learn More', 'views.learn_more', 'learn_more.html')
+]
+
+TITLE_WEIGHT = 10.0
+EXACT_FACTOR = 1.0
+PREFIX_FACTOR = 0.6
+FUZZY_FACTOR = 0.4
+SNIPPET_RADIUS = 80
+# Every term is fuzzy-matched against the whole vocabulary, so bound the work a query can ask for
+SEARCH_MAX_QUERY_LENGTH = int(os.getenv('SEARCH_MAX_QUERY_LENGTH', '200'))
+SEARCH_MAX_TERMS = int(os.getenv('SEARCH_MAX_TERMS', '8'))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_JINJA_RE = re.compile(r"{%.*?%}|{{.*?}}|{#.*?#}", re.S)
+_SKIP_BLOCKS_RE = re.compile(r"<(script|style)\b.*?</\1>", re.S | re.I)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+_STOPWORDS = frozenset("a an and are as at be by for from has have in is it of on or our the this to we with you your".split())
+
+
+def tokenize(text):
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def template_text(source):
+    """Reduce a Jinja/HTML template source to its visible text."""
+    text = _JINJA_RE.sub(" ", source)
+    text = _SKIP_BLOCKS_RE.sub(" ", text)
+    text = _TAG_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", html.unescape(text)).strip()
+
+
+def max_edits(term):
+    """How many typos to tolerate for a query term of this length."""
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+@lru_cache(maxsize=4096)
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein distance, or ``limit + 1`` once it is known to exceed ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SearchResult:
+    def __init__(self, name, url, score, snippet=''):
+        self.name = name
+        self.url = url
+        self.score = score
+        self.snippet = snippet
+
+    def to_dict(self):
+        return {'name': self.name, 'url': self.url, 'score': round(self.score, 3), 'snippet': self.snippet}
+
+
+class SearchIndex:
+    """
+    Inverted index over page titles and rendered template text.
+
+    Built once; queries only touch the in-memory postings. Each query term
+    is matched exactly, as a prefix of an indexed term, or within a small
+    edit distance, with decreasing weight in that order.
+    """
+
+    def __init__(self):
+        self.pages = []
+        self._postings = {}
+        self._vocabulary = []
+
+    def add_page(self, name, url, text=''):
+        page_id = len(self.pages)
+        self.pages.append({'name': name, 'url': url, 'text': text})
+
+        weights = {}
+        for token in tokenize(name):
+            weights[token] = weights.get(token, 0.0) + TITLE_WEIGHT
+        counts = {}
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            # Dampen term frequency so long pages don't drown out short ones
+            weights[token] = weights.get(token, 0.0) + 1.0 + math.log(count)
+
+        for token, weight in weights.items():
+            self._postings.setdefault(token, {})[page_id] = weight
+        self._vocabulary = sorted(self._postings)
+
+    def _expand(self, term):
+        """Yield (indexed_term, factor) pairs that ``term`` should match."""
+        if term in self._postings:
+            yield term, EXACT_FACTOR
+
+        start = bisect.bisect_left(self._vocabulary, term)
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(term):
+                break
+            if candidate != term:
+                yield candidate, PREFIX_FACTOR
+
+        limit = max_edits(term)
+        if limit:
+            for candidate in self._vocabulary:
+                if candidate != term and not candidate.startswith(term) and edit_distance(term, candidate, limit) <= limit:
+                    yield candidate, FUZZY_FACTOR
+
+    def search(self, query, limit=10):
+        """
+        Rank pages for ``query``. Only the first SEARCH_MAX_QUERY_LENGTH
+        characters and SEARCH_MAX_TERMS distinct terms are used.
+        """
+        terms = list(dict.fromkeys(tokenize(query[:SEARCH_MAX_QUERY_LENGTH])))[:SEARCH_MAX_TERMS]
+        if not terms:
+            return []
+
+        scores = {}
+        matched_terms = {}
+        hits = {}
+        for term in terms:
+            best = {}
+            for candidate, factor in self._expand(term):
+                for page_id, weight in self._postings[candidate].items():
+                    score = weight * factor
+                    if score > best.get(page_id, (0.0, None))[0]:
+                        best[page_id] = (score, candidate)
+            for page_id, (score, candidate) in best.items():
+                scores[page_id] = scores.get(page_id, 0.0) + score
+                matched_terms[page_id] = matched_terms.get(page_id, 0) + 1
+                hits.setdefault(page_id, candidate)
+
+        # Pages matching more of the query rank first, then by score
+        ranked = sorted(scores, key=lambda page_id: (matched_terms[page_id], scores[page_id]), reverse=True)
+        results = []
+        for page_id in ranked[:limit]:
+            page = self.pages[page_id]
+            results.append(SearchResult(page['name'], page['url'], scores[page_id], self._snippet(page['text'], hits[page_id])))
+        return results
+
+    @staticmethod
+    def _snippet(text, term):
+        match = re.search(re.escape(term), text, re.I)
+        if not match:
+            return text[:2 * SNIPPET_RADIUS].strip()
+        start = max(0, match.start() - SNIPPET_RADIUS)
+        end = min(len(text), match.end() + SNIPPET_RADIUS)
+        snippet = text[start:end].strip()
+        if start > 0:
+            snippet = '…' + snippet
+        if end < len(text):
+            snippet = snippet + '…'
+        return snippet
+
+
+search_index = SearchIndex()
+
+
+def build_search_index(app, pages=SEARCHABLE_PAGES):
+    """Populate the module-level index from ``pages`` and the docs; called once from create_app."""
+    index = SearchIndex()
+    with app.test_request_context():
+        for name, endpoint, template in pages:
+            text = ''
+            if template:
+                try:
+                    source, _, _ = app.jinja_env.loader.get_source(app.jinja_env, template)
+                    text = template_text(source)
+                except Exception as e:
+                    logger.warning("Could not index template %s: %s", template, e)
+            index.add_page(name, url_for(endpoint), text)
+
+        # Each docs section is its own result, linking to its anchor on /documentation
+        for page in docs_library.sections():
+            index.add_page(page.title, f"{url_for('views.documentation')}#{page.slug}", template_text(page.html))
+        help_page = docs_library.page(HELP_PAGE)
+        if help_page is not None:
+            index.add_page(help_page.title, url_for('views.documentation_help'), template_text(help_page.html))
+
+    global search_index
+    search_index = index
+    return index
+
+
+def get_search_index():
+    return search_index
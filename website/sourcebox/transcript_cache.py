@@ -0,0 +1,148 @@
+import os
+import time
+import fcntl
+import hashlib
+import logging
+import tempfile
+import threading
+import requests
+from website import http_client
+from website.cache import caches
+from website.sourcebox.proxy import LLM_API_URL
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_CACHE_PATH = os.getenv(
+    'TRANSCRIPT_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'sourcebox-transcript.cache')
+)
+# The example transcript only changes if the sample audio does; 0 disables scheduled refreshes
+TRANSCRIPT_REFRESH_INTERVAL = float(os.getenv('TRANSCRIPT_REFRESH_INTERVAL', '86400'))
+
+
+class Transcript:
+    """The stored upstream response for the transcript demo."""
+
+    def __init__(self, body, content_type, fetched_at):
+        self.body = body
+        self.content_type = content_type
+        self.fetched_at = fetched_at
+        self.etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+
+class TranscriptCache:
+    """
+    Disk-backed copy of the ``/landing-transcript-example`` response.
+
+    The transcript is fetched once and written to ``store``, a memory-mapped
+    cache file that every worker (and the next boot on the same dyno) reads
+    from. Afterwards it is
+    only refetched when ``refresh_interval`` has passed, by whichever
+    worker's background thread wins the file lock, or when an admin forces
+    it. A failed refresh keeps the stored copy, so the demo keeps working
+    while the upstream is down.
+    """
+
+    def __init__(self, url, store, lock_path, refresh_interval=TRANSCRIPT_REFRESH_INTERVAL):
+        self.url = url
+        self.store = store
+        self.lock_path = lock_path
+        self.refresh_interval = refresh_interval
+        self._transcript = None
+        self._fetch_lock = threading.Lock()
+        self._refresher = None
+        self._refresher_pid = None
+        self._refresher_lock = threading.Lock()
+
+    def load(self):
+        """Read the stored transcript, if there is one. Returns it."""
+        data = self.store.get('example')
+        if data is None:
+            return self._transcript
+        current = self._transcript
+        if current is None or current.fetched_at != data['fetched_at']:
+            current = self._transcript = Transcript(data['body'], data['content_type'], data['fetched_at'])
+        return current
+
+    def get(self):
+        """Return the Transcript, fetching it if none is stored yet; None if that fails."""
+        self._ensure_refresher()
+        # Cheap, and picks up a refresh written by another worker
+        transcript = self.load()
+        if transcript is not None:
+            return transcript
+
+        with self._fetch_lock:
+            transcript = self.load()
+            if transcript is None:
+                transcript = self.refresh()
+            return transcript
+
+    def refresh(self):
+        """Fetch the transcript now and store it. Returns the current Transcript."""
+        try:
+            response = http_client.get(
+                self.url,
+                timeout=(http_client.CONNECT_TIMEOUT, http_client.SLOW_READ_TIMEOUT),
+                upstream='llm_api'
+            )
+        except requests.RequestException as e:
+            logger.error("Error fetching transcript example: %s", e)
+            return self._transcript
+
+        if response.status_code != 200:
+            logger.warning("Transcript example returned %s; keeping stored copy.", response.status_code)
+            return self._transcript
+
+        content_type = response.headers.get('Content-Type', 'application/json')
+        self.store.set('example', {'body': response.text, 'content_type': content_type, 'fetched_at': time.time()})
+        logger.info("Stored transcript example (%s bytes)", len(response.content))
+        return self.load()
+
+    def _ensure_refresher(self):
+        # Threads don't survive a fork, so check the refresher belongs to this process
+        if self.refresh_interval <= 0:
+            return
+        with self._refresher_lock:
+            if self._refresher_pid == os.getpid() and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name='transcript-refresh', daemon=True)
+            self._refresher_pid = os.getpid()
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            transcript = self.load()
+            due_in = self.refresh_interval if transcript is None else \
+                transcript.fetched_at + self.refresh_interval - time.time()
+            if due_in > 0:
+                time.sleep(min(due_in, self.refresh_interval))
+                continue
+            try:
+                self._refresh_once_across_workers()
+            except Exception as e:
+                logger.error("Error refreshing transcript example: %s", e)
+            # A failed refresh leaves the copy stale; don't retry in a tight loop
+            time.sleep(min(300, self.refresh_interval))
+
+    def _refresh_once_across_workers(self):
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another worker is refreshing; its result shows up through load()
+                return
+            transcript = self.load()
+            if transcript is None or time.time() - transcript.fetched_at >= self.refresh_interval:
+                self.refresh()
+        finally:
+            os.close(fd)
+
+
+transcript_cache = TranscriptCache(
+    f"{LLM_API_URL}/landing-transcript-example",
+    caches.register('transcript', backend='mmap', path=TRANSCRIPT_CACHE_PATH, max_bytes=4 * 1024 * 1024),
+    # Separate from the cache file's own write lock, which a refresh takes while holding this one
+    lock_path=f"{TRANSCRIPT_CACHE_PATH}.refresh-lock"
+)
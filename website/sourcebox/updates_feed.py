@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import bisect
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+import requests
+from website import http_client, RELEASE_ID
+
+logger = logging.getLogger(__name__)
+
+API_URL = os.getenv('API_URL', 'http://localhost:5000')
+UPDATES_MAX_AGE = float(os.getenv('UPDATES_MAX_AGE', '300'))
+UPDATES_RETRY_INTERVAL = float(os.getenv('UPDATES_RETRY_INTERVAL', '30'))
+# Refetch the whole list this often so edits and deletions upstream are picked up
+UPDATES_FULL_SYNC_INTERVAL = float(os.getenv('UPDATES_FULL_SYNC_INTERVAL', '3600'))
+UPDATES_PAGE_SIZE = int(os.getenv('UPDATES_PAGE_SIZE', '10'))
+
+
+def has_integer_ids(updates):
+    """True if every update carries an integer ``id`` to order and page by."""
+    return all(isinstance(update.get('id'), int) and not isinstance(update['id'], bool) for update in updates)
+
+
+class UpdatesSnapshot:
+    """
+    An immutable view of the cached platform updates.
+
+    When every update has an integer ``id`` (``keyed``) they are held oldest
+    first by id and paged newest first, with the id as cursor. Otherwise
+    they are kept in the upstream's order and the cursor is an offset into
+    it.
+    """
+
+    def __init__(self, updates, etag, last_modified, keyed=True):
+        self.updates = updates
+        self.etag = etag
+        self.last_modified = last_modified
+        self.keyed = keyed
+        self._ids = [update['id'] for update in updates] if keyed else None
+
+    @property
+    def cursor(self):
+        """The newest id held, which the next refresh asks for updates after; None when not keyed."""
+        return self._ids[-1] if self._ids else None
+
+    def page(self, before=None, limit=UPDATES_PAGE_SIZE):
+        """
+        Up to ``limit`` updates before cursor ``before`` (the first page when
+        None), and the cursor for the page after, or None at the end.
+        """
+        if not self.keyed:
+            start = max(0, before or 0)
+            end = start + limit
+            return self.updates[start:end], (end if end < len(self.updates) else None)
+
+        end = len(self._ids) if before is None else bisect.bisect_left(self._ids, before)
+        start = max(0, end - limit)
+        page = self.updates[start:end][::-1]
+        return page, (self._ids[start] if start > 0 else None)
+
+
+def pub_date(update):
+    """RFC 822 date for an update's ISO ``date``, as RSS wants, or None."""
+    try:
+        published = datetime.fromisoformat(str(update.get('date')))
+    except ValueError:
+        return None
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return format_datetime(published)
+
+
+class UpdatesCache:
+    """
+    Stale-while-revalidate cache for ``/platform_updates/list``.
+
+    The last good list is always served immediately. Once it is older than
+    ``max_age`` a single background thread revalidates it with a conditional
+    GET; if the upstream is down the stale copy keeps being served.
+
+    The upstream returns a JSON list of objects with ``title`` and
+    ``content``, and optionally ``id`` and ``date``. When every entry has
+    an integer ``id``, revalidation only asks for updates after the newest
+    id held (``?since=<id>``) and merges them in by id, and every
+    ``full_sync_interval`` the whole list is fetched and replaces the copy.
+    Without such ids every revalidation fetches the whole list.
+
+    The website.cache backends treat an expired entry as a miss, which is
+    the opposite of what is wanted here, so the snapshot (list, ETag and
+    Last-Modified) is kept in memory by this class instead.
+    """
+
+    def __init__(self, url, max_age=UPDATES_MAX_AGE, retry_interval=UPDATES_RETRY_INTERVAL,
+                 full_sync_interval=UPDATES_FULL_SYNC_INTERVAL):
+        self.url = url
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self.full_sync_interval = full_sync_interval
+        self._snapshot = None
+        self._fetched_at = 0.0
+        self._synced_at = 0.0
+        # When a load with nothing cached last failed; None once one has succeeded
+        self._failed_at = None
+        self._upstream_etag = None
+        self._upstream_last_modified = None
+        self._lock = threading.Lock()
+        # Separate lock so readers never wait on an in-flight refresh
+        self._refresh_flag_lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self):
+        """
+        Return the current UpdatesSnapshot, or None if nothing has ever
+        loaded. With nothing cached the first caller fetches synchronously;
+        if that fails, callers get None without refetching for
+        ``retry_interval``, rather than each queueing behind the timeouts.
+        """
+        if self._snapshot is None:
+            if self._failed_recently():
+                return None
+            with self._lock:
+                if self._snapshot is None and not self._failed_recently():
+                    self._failed_at = None if self._refresh() else time.monotonic()
+            return self._snapshot
+
+        if time.monotonic() - self._fetched_at > self.max_age:
+            self._refresh_in_background()
+        return self._snapshot
+
+    def _failed_recently(self):
+        return self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_interval
+
+    def _refresh_in_background(self):
+        with self._refresh_flag_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name='updates-refresh', daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            with self._lock:
+                if not self._refresh():
+                    # Keep serving the stale copy and try again after retry_interval
+                    self._fetched_at = time.monotonic() - self.max_age + self.retry_interval
+        finally:
+            self._refreshing = False
+
+    def _refresh(self):
+        """Revalidate against the upstream. Callers must hold ``self._lock``."""
+        full_sync = (self._snapshot is None or self._snapshot.cursor is None
+                     or time.monotonic() - self._synced_at > self.full_sync_interval)
+        params = {} if full_sync else {'since': self._snapshot.cursor}
+        headers = {}
+        if self._snapshot is not None:
+            if self._upstream_etag:
+                headers['If-None-Match'] = self._upstream_etag
+            if self._upstream_last_modified:
+                headers['If-Modified-Since'] = self._upstream_last_modified
+
+        try:
+            response = http_client.get(self.url, params=params, headers=headers)
+        except requests.RequestException as e:
+            logger.error("Error fetching platform updates: %s", e)
+            return False
+
+        if response.status_code == 304 and self._snapshot is not None:
+            self._fetched_at = time.monotonic()
+            if full_sync:
+                self._synced_at = self._fetched_at
+            return True
+        if response.status_code != 200:
+            logger.warning("Platform updates returned %s; keeping cached copy.", response.status_code)
+            return False
+
+        try:
+            fetched = response.json()
+        except ValueError as e:
+            logger.warning("Platform updates returned invalid JSON (%s); keeping cached copy.", e)
+            return False
+        if not isinstance(fetched, list):
+            logger.warning("Platform updates returned %s, not a list; keeping cached copy.", type(fetched).__name__)
+            return False
+        fetched = [update for update in fetched if isinstance(update, dict)]
+
+        self._upstream_etag = response.headers.get('ETag')
+        self._upstream_last_modified = response.headers.get('Last-Modified')
+        self._fetched_at = time.monotonic()
+        if full_sync:
+            self._synced_at = self._fetched_at
+        elif not fetched:
+            return True
+
+        keyed = has_integer_ids(fetched)
+        if full_sync:
+            if not keyed:
+                logger.info("Platform updates lack integer ids; paging by position and refetching in full.")
+            updates = sorted(fetched, key=lambda update: update['id']) if keyed else fetched
+        elif keyed:
+            # An upstream that ignores ?since= sends everything again; merging by id makes that harmless
+            merged = {update['id']: update for update in self._snapshot.updates}
+            merged.update((update['id'], update) for update in fetched)
+            updates = sorted(merged.values(), key=lambda update: update['id'])
+        else:
+            # Ids stopped being usable; the next refresh refetches everything
+            logger.warning("Platform updates since %s lack integer ids; resyncing.", self._snapshot.cursor)
+            self._synced_at = 0.0
+            return False
+
+        digest = hashlib.sha1(json.dumps(updates, sort_keys=True).encode('utf-8'))
+        digest.update(RELEASE_ID.encode('utf-8'))
+        etag = digest.hexdigest()
+        if self._snapshot is None or self._snapshot.etag != etag:
+            last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+            self._snapshot = UpdatesSnapshot(updates, etag, last_modified, keyed)
+        return True
+
+
+updates_cache = UpdatesCache(f"{API_URL}/platform_updates/list")
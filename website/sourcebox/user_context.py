@@ -0,0 +1,164 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from website import http_client
+from website.user_cache import user_cache, token_key
+from website.usage_ledger import usage_ledger
+
+logger = logging.getLogger(__name__)
+
+API_URL = os.getenv('API_URL', 'http://localhost:5000')
+
+# Each signed-in request can occupy two pool threads, so size this to about twice the gunicorn threads
+USER_CONTEXT_WORKERS = int(os.getenv('USER_CONTEXT_WORKERS', '16'))
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Shared pool for fanning out the per-request upstream lookups, created per process."""
+    global _executor, _executor_pid
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=USER_CONTEXT_WORKERS, thread_name_prefix='user-context')
+                _executor_pid = os.getpid()
+    return _executor
+
+
+class UserContext:
+    """Everything a signed-in page needs to know about the current user."""
+
+    def __init__(self, user_id=None, is_premium=False, tokens_used=0):
+        self.user_id = user_id
+        self.is_premium = is_premium
+        self.tokens_used = tokens_used
+
+
+def _fetch_user_id(token, headers):
+    cached = user_cache.get(token_key(token), 'user_id')
+    if cached is not None:
+        return cached
+
+    user_id_url = f"{API_URL}/user/id"
+    response = http_client.get(user_id_url, headers=headers)
+    if response.status_code == 200:
+        user_id = response.json().get('user_id')
+        if user_id is not None:
+            user_cache.set(token_key(token), 'user_id', user_id)
+        return user_id
+    logger.warning("Failed to retrieve user ID from %s.", user_id_url)
+    return None
+
+
+def _fetch_premium_status(user_id, headers):
+    cached = user_cache.get(user_id, 'premium')
+    if cached is not None:
+        return cached
+
+    premium_status_url = f"{API_URL}/user/{user_id}/premium/status"
+    response = http_client.get(premium_status_url, headers=headers)
+    if response.status_code == 200:
+        is_premium = bool(response.json().get('premium_status', False))
+        user_cache.set(user_id, 'premium', is_premium)
+        return is_premium
+    logger.warning("Could not retrieve premium status for user_id=%s", user_id)
+    return False
+
+
+def _fetch_token_usage(headers):
+    response = http_client.get(f"{API_URL}/user/token_usage", headers=headers)
+    if response.status_code == 200:
+        return response.json().get('total_tokens', 0)
+    logger.warning("Failed to retrieve token usage; using the local ledger.")
+    return None
+
+
+def _result(future, default):
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error("User context lookup failed: %s", e)
+        return default
+
+
+def user_id_for_token(token):
+    """The user ID behind ``token``, from the user cache when possible; None if unknown."""
+    try:
+        return _fetch_user_id(token, {'Authorization': f'Bearer {token}'})
+    except Exception as e:
+        logger.error("User context lookup failed: %s", e)
+        return None
+
+
+def premium_status(user_id, token):
+    try:
+        return _fetch_premium_status(user_id, {'Authorization': f'Bearer {token}'})
+    except Exception as e:
+        logger.error("User context lookup failed: %s", e)
+        return False
+
+
+def reconcile_token_usage(user_id, token):
+    """
+    Make sure the ledger's total for ``user_id`` was checked against the
+    backend recently, fetching it now if not. Returns False if the backend
+    can't be reached and this dyno has never reconciled the user, in which
+    case the ledger's figure says nothing about their real usage.
+    """
+    if usage_ledger.is_fresh(user_id):
+        return True
+    started = time.time()
+    try:
+        total = _fetch_token_usage({'Authorization': f'Bearer {token}'})
+    except Exception as e:
+        logger.error("User context lookup failed: %s", e)
+        total = None
+    if total is not None:
+        usage_ledger.reconcile(user_id, total, started)
+        return True
+    return usage_ledger.reconciled_at(user_id) is not None
+
+
+def load_user_context(token, include_premium=True, include_usage=False):
+    """
+    Fetch the user's ID, premium status and token usage for ``token``.
+
+    Token usage comes from the local usage ledger. It is only requested from
+    the backend when the ledger hasn't been reconciled recently, and then
+    alongside the user ID since it only needs the bearer token. Premium
+    status is keyed by user ID and starts as soon as that resolves.
+    """
+    headers = {'Authorization': f'Bearer {token}'}
+
+    executor = _get_executor()
+    user_id_future = executor.submit(_fetch_user_id, token, headers)
+    usage_future = None
+    if include_usage and not usage_ledger.is_fresh(user_cache.get(token_key(token), 'user_id')):
+        usage_started = time.time()
+        usage_future = executor.submit(_fetch_token_usage, headers)
+
+    context = UserContext()
+    context.user_id = _result(user_id_future, None)
+
+    if context.user_id and include_premium:
+        # Runs on the request thread while the usage lookup is still in flight
+        try:
+            context.is_premium = _fetch_premium_status(context.user_id, headers)
+        except Exception as e:
+            logger.error("User context lookup failed: %s", e)
+
+    if include_usage:
+        reported = _result(usage_future, None) if usage_future is not None else None
+        if context.user_id is None:
+            context.tokens_used = reported or 0
+        else:
+            if reported is not None:
+                usage_ledger.reconcile(context.user_id, reported, usage_started)
+            context.tokens_used = usage_ledger.tokens_used(context.user_id)
+
+    return context
@@ -1,19 +1,24 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, abort, session, jsonify, send_from_directory
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort, session, jsonify, send_file, make_response, Response, stream_with_context
 from flask_login import login_required
 from werkzeug.utils import secure_filename
 import os
 import requests
+from website import http_client
+from website.mail_outbox import outbox
+from website.page_cache import cached_page
+from website.rate_limit import Limit, rate_limited
 from website.authentication.auth import token_required
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import smtplib
+from website.sourcebox.user_context import load_user_context, user_id_for_token, premium_status, reconcile_token_usage
+from website.usage_ledger import usage_ledger, FREE_TOKEN_LIMIT
+from website.sourcebox.proxy import register_proxy_routes
+from website.sourcebox.updates_feed import updates_cache, pub_date, UPDATES_PAGE_SIZE
+from website.sourcebox.boilerplates import boilerplate_cache
+from website.sourcebox.transcript_cache import transcript_cache
+from website.sourcebox.documentation import docs_library, HELP_PAGE
+from website.sourcebox import assistant
+from website.sourcebox.search_index import get_search_index
 import logging
-from openai import OpenAI
 from dotenv import load_dotenv
-import shutil
-import tempfile
-import subprocess
-import markdown
 
 load_dotenv()
 
@@ -23,9 +28,14 @@ logger = logging.getLogger(__name__)
 
 views = Blueprint('views', __name__, template_folder='templates')
 
+# Landing page demo endpoints (/rag-api*) are declared in proxy.DEMO_PROXY_ROUTES
+register_proxy_routes(views)
+
 API_URL = os.getenv('API_URL', 'http://localhost:5000')  # Use env variable for API URL
 UPLOAD_FOLDER = '/tmp/uploads'  # Use writable directory on Heroku
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'csv', 'xlsx'}
+# Search-as-you-type requests each worker runs at once, separate from the LLM routes' slots
+SEARCH_CONCURRENCY = int(os.getenv('SEARCH_CONCURRENCY', '4'))
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 def allowed_file(filename):
@@ -39,27 +49,8 @@ def search():
         flash('Please enter a search term.', 'danger')
         return redirect(url_for('views.landing'))
 
-    available_pages = [
-        {'name': 'Dashboard', 'url': url_for('views.dashboard')},
-        {'name': 'Updates', 'url': url_for('views.updates')},
-        {'name': 'Services', 'url': url_for('views.content')},
-        {'name': 'DeepQuery', 'url': url_for('views.launch_deepquery')},
-        {'name': 'Source Lightning', 'url': url_for('views.launch_source_lightning')},
-        {'name': 'Pack-Man', 'url': url_for('views.launch_pack_man')},
-        {'name': 'VideoGen', 'url': url_for('views.launch_videogen')},
-        {'name': 'U-Studio', 'url': url_for('views.launch_u_studio')},
-        {'name': 'Documentation', 'url': url_for('views.documentation')},
-        {'name': 'User Settings', 'url': url_for('views.user_settings')},
-        {'name': 'Premium Info', 'url': url_for('views.premium_info')},
-        {'name': 'Platform Support', 'url': url_for('views.platform_support')},
-        {'name': 'Learn More', 'url': url_for('views.learn_more')}
-    ]
-
-    # Filter results based on the search query
-    results = []
-    for page in available_pages:
-        if query in page['name'].lower():
-            results.append(page)
+    # Ranked lookup against the index built at startup
+    results = get_search_index().search(query)
 
     if not results:
         flash('No matching pages found.', 'warning')
@@ -67,8 +58,19 @@ def search():
 
     return render_template('search_results.html', query=query, results=results)
 
+@views.route('/search.json', methods=['GET'])
+@rate_limited('search', Limit.from_env('RATE_LIMIT_SEARCH', Limit(120, 60)),
+              concurrency=SEARCH_CONCURRENCY, pool='search')
+def search_suggestions():
+    # Search-as-you-type endpoint for the navbar search box
+    query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 8, type=int), 1), 20)
+    results = get_search_index().search(query, limit=limit) if query else []
+    return jsonify({"query": query, "results": [result.to_dict() for result in results]})
+
 @views.route('/')
 @views.route('/landing')
+@cached_page
 def landing():
     return render_template('landing.html')
 
@@ -76,53 +78,27 @@ def landing():
 @token_required
 def dashboard():
     token = session.get('access_token')
-    headers = {'Authorization': f'Bearer {token}'}
-
-    # Attempt to fetch user ID
-    user_id_url = f"{API_URL}/user/id"
-    user_id_response = requests.get(user_id_url, headers=headers)
-    if user_id_response.status_code == 200:
-        user_id = user_id_response.json().get('user_id')
-    else:
-        logger.warning("Failed to retrieve user ID from %s. Proceeding without user_id-based features.", user_id_url)
-        user_id = None
-
-    # Check if the user is premium only if we have a user_id
-    is_premium = False
-    if user_id:
-        premium_status_url = f"{API_URL}/user/{user_id}/premium/status"
-        premium_resp = requests.get(premium_status_url, headers=headers)
-        if premium_resp.status_code == 200:
-            premium_data = premium_resp.json()
-            is_premium = premium_data.get('premium_status', False)
-        else:
-            logger.warning("Could not retrieve premium status for user_id=%s", user_id)
-
+    user = load_user_context(token, include_usage=True)
 
+    if user.user_id:
         # Token usage logic
-        free_token_limit = 1000000
-        token_count_url = f"{API_URL}/user/token_usage"
-        token_count_response = requests.get(token_count_url, headers=headers)
-        if token_count_response.status_code == 200:
-            tokens_used = token_count_response.json().get('total_tokens', 0)
-        else:
-            logger.warning("Failed to retrieve token usage; defaulting tokens_used=0.")
-            tokens_used = 0
-
+        free_token_limit = FREE_TOKEN_LIMIT
+        tokens_used = user.tokens_used
         token_percentage_used = (tokens_used / free_token_limit) * 100 if free_token_limit > 0 else 0
 
         return render_template(
             'dashboard.html',
-            is_premium=is_premium,
-            last_5_history_items=unique_filtered_items,
+            is_premium=user.is_premium,
+            last_5_history_items=[],
             free_token_limit=free_token_limit,
             tokens_used=tokens_used,
             token_percentage_used=token_percentage_used
         )
     else:
+        logger.warning("Proceeding without user_id-based features on the dashboard.")
         return render_template(
             'dashboard.html',
-            is_premium=is_premium,
+            is_premium=user.is_premium,
             last_5_history_items=[],
             free_token_limit=0,
             tokens_used=0,
@@ -131,42 +107,58 @@ def dashboard():
 
 @views.route('/updates')
 def updates():
-    # Use the new '/platform_updates/list' endpoint to get updates
-    response = requests.get(f"{API_URL}/platform_updates/list")
-    if response.status_code == 200:
-        all_updates = response.json()
-        return render_template('updates.html', all_updates=all_updates)
-    else:
+    # Served from the stale-while-revalidate cache of '/platform_updates/list', one page at a time
+    snapshot = updates_cache.get()
+    if snapshot is None:
         flash('Failed to retrieve updates', 'error')
         return redirect(url_for('views.landing'))
 
+    before = request.args.get('before', type=int)
+    page, next_cursor = snapshot.page(before)
+    # Checked before rendering, since base.html pops the flashes
+    had_flash = '_flashes' in session
+    response = make_response(render_template('updates.html', all_updates=page, next_cursor=next_cursor, before=before))
+    if had_flash:
+        # One-off flash messages are baked into this render; don't let it be revalidated
+        return response
+    return _conditional_feed_response(response, snapshot, f"html-{before}")
+
+@views.route('/updates.json')
+def updates_json():
+    snapshot = updates_cache.get()
+    if snapshot is None:
+        return jsonify({"error": "Failed to retrieve updates"}), 502
+
+    before = request.args.get('before', type=int)
+    limit = min(max(request.args.get('limit', UPDATES_PAGE_SIZE, type=int), 1), 100)
+    page, next_cursor = snapshot.page(before, limit)
+    response = jsonify({"updates": page, "next_cursor": next_cursor})
+    return _conditional_feed_response(response, snapshot, f"json-{before}-{limit}")
+
+@views.route('/updates.rss')
+def updates_rss():
+    snapshot = updates_cache.get()
+    if snapshot is None:
+        return jsonify({"error": "Failed to retrieve updates"}), 502
+
+    page, _ = snapshot.page()
+    response = make_response(render_template('updates_feed.xml', updates=page, snapshot=snapshot, pub_date=pub_date))
+    response.content_type = 'application/rss+xml; charset=utf-8'
+    return _conditional_feed_response(response, snapshot, 'rss')
+
+def _conditional_feed_response(response, snapshot, variant):
+    # Every view of the feed changes exactly when the cached list does
+    response.set_etag(f"{snapshot.etag}-{variant}")
+    response.last_modified = snapshot.last_modified
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @views.route('/content')
 @token_required
 def content():
     token = session.get('access_token')
-    headers = {'Authorization': f'Bearer {token}'}
-
-    # Attempt to retrieve user ID
-    user_id_url = f"{API_URL}/user/id"
-    user_id_response = requests.get(user_id_url, headers=headers)
-    if user_id_response.status_code == 200:
-        user_id = user_id_response.json().get('user_id')
-    else:
-        logger.warning("Failed to retrieve user ID from %s. Continuing without user-specific data.", user_id_url)
-        user_id = None
-
-    # Check if user is premium only if user_id exists
-    is_premium = False
-    if user_id:
-        premium_status_url = f"{API_URL}/user/{user_id}/premium/status"
-        premium_resp = requests.get(premium_status_url, headers=headers)
-        if premium_resp.status_code == 200:
-            premium_data = premium_resp.json()
-            is_premium = premium_data.get('premium_status', False)
-        else:
-            logger.warning("Could not retrieve premium status for user_id=%s", user_id)
-
-    return render_template('content.html', is_premium=is_premium)
+    user = load_user_context(token)
+    return render_template('content.html', is_premium=user.is_premium)
 
 @views.route('/content/deepquery')
 @token_required
@@ -188,28 +180,14 @@ def launch_pack_man():
 def premium_info():
     # Fetch the token from the session
     token = session.get('access_token')
-    headers = {'Authorization': f'Bearer {token}'}
+    user = load_user_context(token)
 
-    # Fetch the user ID
-    user_id_url = f"{API_URL}/user/id"
-    user_id_response = requests.get(user_id_url, headers=headers)
-    if user_id_response.status_code == 200:
-        user_id = user_id_response.json().get('user_id')
-    else:
+    if not user.user_id:
         flash('Failed to retrieve user ID', 'error')
         return redirect(url_for('views.landing'))
 
-    # Check if the user is a premium member
-    premium_status_url = f"{API_URL}/user/{user_id}/premium/status"
-    response = requests.get(premium_status_url, headers=headers)
-    if response.status_code == 200:
-        premium_data = response.json()
-        is_premium = premium_data.get('premium_status', False)
-    else:
-        is_premium = False
-
     # Redirect to the dashboard if the user is already premium
-    if is_premium:
+    if user.is_premium:
         return redirect(url_for('views.dashboard'))
     else:
         return render_template('premium_info.html')
@@ -221,8 +199,12 @@ def user_settings():
     headers = {'Authorization': f'Bearer {token}'}
     user_id_url = f"{API_URL}/user/id"
 
-    user_id_response = requests.get(user_id_url, headers=headers)
-    if user_id_response.status_code == 200:
+    try:
+        user_id_response = http_client.get(user_id_url, headers=headers)
+    except requests.RequestException as e:
+        logger.error("Error calling %s: %s", user_id_url, e)
+        user_id_response = None
+    if user_id_response is not None and user_id_response.status_code == 200:
         user_id = user_id_response.json().get('user_id')
     else:
         logger.warning("Failed to retrieve user ID from %s. Some profile data may be unavailable.", user_id_url)
@@ -232,22 +214,29 @@ def user_settings():
     return render_template('user_settings.html', user_id=user_id)
 
 @views.route('/documentation')
+@cached_page
 def documentation():
-    return render_template('docs.html')
+    return render_template('docs.html', sections=docs_library.sections())
 
 @views.route('/platform_support')
+@cached_page
 def platform_support():
     return render_template('support.html')
 
 @views.route('/learn_more')
+@cached_page
 def learn_more():
     return render_template('learn_more.html')
 
 @views.route('/documentation/help')
+@cached_page
 def documentation_help():
-    return render_template('help.html')
+    page = docs_library.page(HELP_PAGE)
+    if page is None:
+        abort(404)
+    return render_template('help.html', page=page)
 
-# First route for support messages
+# Support ticket form; delivery happens in the background mail outbox
 @views.route('/send_message', methods=['POST'])
 def send_support_message():
     name = request.form.get("name")
@@ -256,31 +245,16 @@ def send_support_message():
 
     if not name or not email or not message:
         flash('All fields are required!', 'danger')
-        return redirect(url_for('index'))
+        return redirect(url_for('views.platform_support'))
 
     full_message = f"Name: {name}\nEmail: {email}\nMessage: {message}"
 
     try:
-        msg = MIMEMultipart()
-        msg['From'] = os.getenv('GMAIL_USERNAME')
-        msg['To'] = os.getenv('GMAIL_USERNAME')
-        msg['Subject'] = "SourceBox Support Ticket Request"
-
-        msg.attach(MIMEText(full_message, 'plain'))
-
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-        server.login(os.getenv('GMAIL_USERNAME'), os.getenv('GOOGLE_PASSWORD'))
-        server.send_message(msg)
-        server.quit()
-
+        outbox.enqueue("SourceBox Support Ticket Request", full_message)
         flash('Message sent successfully!', 'success')
-    except smtplib.SMTPAuthenticationError as e:
-        logging.error(f"SMTP Authentication Error: {e}")
-        flash(f'Failed to send message. Error: {str(e)}', 'danger')
-    except Exception as e:
-        logging.error(f"An error occurred: {e}")
-        flash(f'Failed to send message. Error: {str(e)}', 'danger')
+    except OSError as e:
+        logger.error("Failed to queue support message: %s", e)
+        flash('Failed to send message. Please try again later.', 'danger')
 
     return redirect(url_for('views.platform_support'))
 
@@ -288,279 +262,81 @@ def send_support_message():
 # Download boilerplate landing.html example
 @views.route('/download_plate/<filename>')
 def download_plate(filename):
-
-    def clone_and_zip_repo(REPO_URL, repo_name):
-        # Get the current working directory
-        cwd = os.getcwd()
-        
-        # Create a temporary directory in the current working directory
-        temp_dir = tempfile.mkdtemp(dir=cwd)
-        print(f"Cloning repository to temporary folder in CWD: {temp_dir}")
-        
-        try:
-            # Clone the repository using subprocess
-            subprocess.run(["git", "clone", REPO_URL, temp_dir], check=True)
-            print(f"Repository successfully cloned to {temp_dir}")
-            
-            # Create a parent folder in the temp directory named after the repo
-            parent_folder_name = f"{repo_name}_repo"
-            parent_folder_path = os.path.join(temp_dir, parent_folder_name)
-            os.makedirs(parent_folder_path)
-            
-            # Move the cloned repo contents into the parent folder
-            for item in os.listdir(temp_dir):
-                item_path = os.path.join(temp_dir, item)
-                if item != parent_folder_name:  # Skip the parent folder itself
-                    shutil.move(item_path, parent_folder_path)
-            
-            # Create a zip file from the parent folder
-            zip_filename = os.path.join(cwd, f'{parent_folder_name}.zip')
-            shutil.make_archive(zip_filename.replace('.zip', ''), 'zip', temp_dir, parent_folder_name)
-            print(f"Repository successfully zipped at {zip_filename}")
-            
-            return zip_filename
-        except subprocess.CalledProcessError as e:
-            print(f"Error cloning repository: {e}")
-            return None
-        finally:
-            # Clean up the temporary directory
-            shutil.rmtree(temp_dir)
-            print(f"Temporary directory {temp_dir} has been removed.")
-
-
-    def serve_repo(REPO_URL, repo_name):
-        # Clone and zip the repo, then get the zip file path
-        zip_file_path = clone_and_zip_repo(REPO_URL, repo_name)
-            
-        if zip_file_path and os.path.exists(zip_file_path):
-            # Store the zip file path in the request context for deletion later
-            request.zip_file_path = zip_file_path
-                
-            # Serve the zip file to the user for download
-            return send_from_directory(os.path.dirname(zip_file_path), os.path.basename(zip_file_path), as_attachment=True)
-        else:
-            abort(500, description="Error cloning or zipping the repository")
-    
-    PC_SCANNER_REPO = "https://github.com/SourceBox-LLC/SourceLighting-PC-scannerApp.git"
-    VANILLA_GPT_REPO = "https://github.com/SourceBox-LLC/SourceLightning-Vanilla-GPT.git"
-    VANILLA_CLAUD_REPO = "https://github.com/SourceBox-LLC/SourceLightning-Vanilla-Claude.git"
-
-    if filename == "pc_scanner":
-        return serve_repo(PC_SCANNER_REPO, "pc_scanner")
-    elif filename == "vanilla_gpt":
-        return serve_repo(VANILLA_GPT_REPO, "vanilla_gpt")
-    elif filename == "vanilla_claud":
-        return serve_repo(VANILLA_CLAUD_REPO, "vanilla_claud")
-    else:
+    if filename not in boilerplate_cache.repos:
         abort(404, description="Repository not found")
 
-@views.route('/rag-api', methods=['POST'])
-def rag_api():
-    try:
-        # Get the new base URL of the external API
-        base_url = 'https://sb-general-llm-api-248b890f970f.herokuapp.com/landing-rag-example'
-
-        # Check if the request has JSON content type, otherwise handle form data
-        if request.content_type == 'application/json':
-            data = request.get_json()
-        else:
-            data = request.form
-
-        prompt = data.get('prompt')
-
-        if not prompt:
-            return jsonify({"error": "Prompt is required"}), 400
-
-        # Prepare the payload to send to the external API
-        payload = {"prompt": prompt}
-
-        # Make the POST request to the external API
-        response = requests.post(base_url, json=payload)
-
-        # Check if the request was successful
-        if response.status_code == 200:
-            return jsonify(response.json()), 200
-        else:
-            return jsonify({"error": "Failed to get a response from external API", "details": response.text}), response.status_code
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@views.route('/rag-api-sentiment', methods=['POST'])
-def rag_api_sentiment():
     try:
-        # Get the base URL of the external sentiment analysis API
-        base_url = 'https://sb-general-llm-api-248b890f970f.herokuapp.com/landing-sentiment-example'
-
-        # Check if the request has JSON content type, otherwise handle form data
-        if request.content_type == 'application/json':
-            data = request.get_json()  # Handle JSON request
-        else:
-            data = request.form  # Handle form data request
-
-        prompt = data.get('prompt')
-
-        # Validate the prompt
-        if not prompt or not isinstance(prompt, str) or not prompt.strip():
-            return jsonify({"error": "Prompt is required"}), 400
-
-        # Prepare the payload to send to the external API
-        payload = {"prompt": prompt}
-
-        # Make a POST request to the external API
-        response = requests.post(base_url, json=payload)
-
-        # Check if the request to the external API was successful
-        if response.status_code == 200:
-            return jsonify(response.json()), 200
-        else:
-            return jsonify({"error": "Failed to get a response from external API", "details": response.text}), response.status_code
-
+        archive = boilerplate_cache.get(filename)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@views.route('/rag-api-webscrape', methods=['POST'])
-def rag_api_webscrape():
-    try:
-        # Get the base URL of the external web scraping API
-        base_url = 'https://sb-general-llm-api-248b890f970f.herokuapp.com/landing-webscrape-example'
-
-        # Check if the request has JSON content type, otherwise handle form data
-        if request.content_type == 'application/json':
-            data = request.get_json()  # Handle JSON request
-        else:
-            data = request.form  # Handle form data request
-
-        prompt = data.get('prompt')
-
-        # Validate the prompt
-        if not prompt or not isinstance(prompt, str) or not prompt.strip():
-            return jsonify({"error": "Prompt is required"}), 400
-
-        # Prepare the payload to send to the external API
-        payload = {"prompt": prompt}
-
-        # Make a POST request to the external API
-        response = requests.post(base_url, json=payload)
-
-        # Check if the request to the external API was successful
-        if response.status_code == 200:
-            return jsonify(response.json()), 200
-        else:
-            return jsonify({"error": "Failed to get a response from external API", "details": response.text}), response.status_code
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@views.route('/rag-api-image', methods=['POST'])
-def image_generation():
-    try:
-        # Get the base URL of the external image generation API
-        base_url = 'https://sb-general-llm-api-248b890f970f.herokuapp.com/landing-imagegen-example'
-
-        # Check if the request has JSON content type, otherwise handle form data
-        if request.content_type == 'application/json':
-            data = request.get_json()  # Handle JSON request
-        else:
-            data = request.form  # Handle form data request
-
-        prompt = data.get('prompt')
-
-        # Validate the prompt
-        if not prompt or not isinstance(prompt, str) or not prompt.strip():
-            return jsonify({"error": "Prompt is required"}), 400
-
-        # Prepare the payload to send to the external API
-        payload = {"prompt": prompt}
-
-        # Make a POST request to the external API
-        response = requests.post(base_url, json=payload)
-
-        # Check if the request to the external API was successful
-        if response.status_code == 200:
-            return jsonify(response.json()), 200
-        else:
-            return jsonify({"error": "Failed to get a response from external API", "details": response.text}), response.status_code
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@views.route('/rag-api-transcript', methods=['GET'])
-def audio_transcript():
-    try:
-        # Define the URL for the existing transcription resource
-        base_url = 'https://sb-general-llm-api-248b890f970f.herokuapp.com/landing-transcript-example'
-
-        # Make the GET request to the transcription resource
-        response = requests.get(base_url)
-
-        # Check if the request to the external API was successful
-        if response.status_code == 200:
-            return jsonify(response.json()), 200
-        else:
-            return jsonify({"error": "Failed to get a response from transcription resource", "details": response.text}), response.status_code
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        logger.error("Error building boilerplate %s: %s", filename, e)
+        abort(500, description="Error cloning or zipping the repository")
+
+    # conditional=True gives Range/If-Range and ETag handling; the file itself goes out via sendfile
+    return send_file(
+        archive.path,
+        as_attachment=True,
+        download_name=archive.download_name,
+        conditional=True,
+        etag=archive.commit,
+        max_age=300
+    )
 
 # support ticket form
 @views.route('/platform-support', methods=['GET','POST'])
+@cached_page
 def platform_support_page():
     return render_template('support.html')
 
-@views.route('/send_message', methods=['POST'])
-def send_contact_message():
-    name = request.form.get("name")
-    email = request.form.get("email")
-    message = request.form.get("message")
-
-    if not name or not email or not message:
-        flash('All fields are required!', 'danger')
-        return redirect(url_for('index'))
-
-    full_message = f"Name: {name}\nEmail: {email}\nMessage: {message}"
-
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = os.getenv('GMAIL_USERNAME')
-        msg['To'] = os.getenv('GMAIL_USERNAME')
-        msg['Subject'] = "SourceBox Support Ticket Request"
-
-        msg.attach(MIMEText(full_message, 'plain'))
+# Transcript demo: the example never changes, so it is served from the stored copy
+@views.route('/rag-api-transcript', methods=['GET'])
+def audio_transcript():
+    transcript = transcript_cache.get()
+    if transcript is None:
+        return jsonify({"error": "Failed to get a response from external API",
+                        "details": "The transcript example is not available yet"}), 502
 
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-        server.login(os.getenv('GMAIL_USERNAME'), os.getenv('GOOGLE_PASSWORD'))
-        server.send_message(msg)
-        server.quit()
-
-        flash('Message sent successfully!', 'success')
-    except smtplib.SMTPAuthenticationError as e:
-        logging.error(f"SMTP Authentication Error: {e}")
-        flash(f'Failed to send message. Error: {str(e)}', 'danger')
-    except Exception as e:
-        logging.error(f"An error occurred: {e}")
-        flash(f'Failed to send message. Error: {str(e)}', 'danger')
-
-    return redirect(url_for('views.platform_support'))
+    response = Response(transcript.body, content_type=transcript.content_type)
+    response.set_etag(transcript.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    return response.make_conditional(request)
 
 @views.route('/chat_assistant', methods=['POST'])
+@rate_limited('chat_assistant', Limit.from_env('RATE_LIMIT_CHAT_ASSISTANT', Limit(20, 60)))
 def chat_assistant_route():
-    user_message = request.json.get("message")
-
-    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {
-                "role": "user",
-                "content": user_message,
-            }
-        ],
-        model="gpt-3.5-turbo",
-    )
+    data = request.get_json(silent=True) or {}
+    user_message = data.get("message")
+    if not user_message:
+        return jsonify({"error": "Message is required"}), 400
+
+    # Signed-in usage is recorded in the ledger and counts toward the free tier.
+    # Anonymous use is deliberately unmetered: the chatbot sits on the public
+    # support page and was open to visitors before the ledger existed. Anonymous
+    # callers, and sessions whose token no longer resolves to a user, are bounded
+    # only by the per-IP RATE_LIMIT_CHAT_ASSISTANT bucket, so keep that tight.
+    token = session.get('access_token')
+    user_id = user_id_for_token(token) if token else None
+    on_usage = None
+    if user_id is not None:
+        # A stale or missing ledger entry is refreshed from the backend first, so a new dyno can't undercount
+        usage_known = reconcile_token_usage(user_id, token)
+        if (not usage_known or usage_ledger.over_free_limit(user_id)) and not premium_status(user_id, token):
+            if not usage_known:
+                return jsonify({"error": "Could not check token usage",
+                                "details": "Please try again in a moment."}), 503
+            return jsonify({"error": "Free token limit reached",
+                            "details": f"Free accounts can use up to {FREE_TOKEN_LIMIT:,} tokens."}), 403
+
+        def on_usage(prompt_tokens, completion_tokens):
+            usage_ledger.record(user_id, prompt_tokens, completion_tokens)
+
+    # Streaming mode: tokens are pushed to the browser over SSE as they arrive
+    if data.get("stream") or request.accept_mimetypes.best == 'text/event-stream':
+        return Response(
+            stream_with_context(assistant.stream_events(user_message, on_usage)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
 
-    assistant_message = chat_completion.choices[0].message.content
-    print(assistant_message)
+    assistant_message = assistant.complete(user_message, on_usage)
     return jsonify({"message": assistant_message})
-
-
@@ -0,0 +1,36 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const searchInput = document.querySelector('input[data-suggest-url]');
+    if (!searchInput) {
+        return;
+    }
+    const suggestions = document.getElementById(searchInput.getAttribute('list'));
+    let debounceTimer = null;
+    let pending = null;
+
+    // Fetch ranked page suggestions as the user types
+    searchInput.addEventListener('input', function() {
+        clearTimeout(debounceTimer);
+        const query = searchInput.value.trim();
+        if (query.length < 2) {
+            suggestions.innerHTML = '';
+            return;
+        }
+        debounceTimer = setTimeout(function() {
+            if (pending) {
+                pending.abort();
+            }
+            pending = new AbortController();
+            fetch(`${searchInput.dataset.suggestUrl}?q=${encodeURIComponent(query)}`, { signal: pending.signal })
+                .then(response => response.json())
+                .then(data => {
+                    suggestions.innerHTML = '';
+                    data.results.forEach(result => {
+                        const option = document.createElement('option');
+                        option.value = result.name;
+                        suggestions.appendChild(option);
+                    });
+                })
+                .catch(() => {});
+        }, 150);
+    });
+});
@@ -0,0 +1,230 @@
+import os
+import time
+import fcntl
+import sqlite3
+import logging
+import tempfile
+import threading
+import requests
+from website import http_client
+
+logger = logging.getLogger(__name__)
+
+API_URL = os.getenv('API_URL', 'http://localhost:5000')
+
+USAGE_LEDGER_PATH = os.getenv('USAGE_LEDGER_PATH', os.path.join(tempfile.gettempdir(), 'sourcebox-usage.sqlite3'))
+# Backend endpoint for batches of per-user token deltas. The API has no such endpoint yet, so
+# flushing is off until this is set; the payload the flusher sends is described on UsageLedger.flush
+USAGE_FLUSH_PATH = os.getenv('USAGE_FLUSH_PATH')
+USAGE_FLUSH_INTERVAL = float(os.getenv('USAGE_FLUSH_INTERVAL', '30'))
+USAGE_FLUSH_BATCH = int(os.getenv('USAGE_FLUSH_BATCH', '500'))
+# How long a total read from /user/token_usage is trusted before the dashboard asks again
+USAGE_RECONCILE_INTERVAL = float(os.getenv('USAGE_RECONCILE_INTERVAL', '300'))
+FREE_TOKEN_LIMIT = int(os.getenv('FREE_TOKEN_LIMIT', '1000000'))
+
+
+class UsageLedger:
+    """
+    Per-user token usage, recorded locally as calls finish.
+
+    Each user has one row in a WAL-mode SQLite file shared by every worker
+    on the dyno: ``reported`` is the backend's total as last seen (plus
+    whatever this dyno has sent since), and the ``*_pending`` columns are
+    deltas not yet sent. When ``USAGE_FLUSH_PATH`` is configured, a
+    background thread in each worker sends pending deltas there in
+    batches; a file lock makes sure only one worker flushes at a time.
+    Pending deltas live in the file, so a worker that exits before flushing
+    loses nothing, and until they are sent they still count locally.
+
+    ``tokens_used`` is ``reported`` plus pending, and ``reconcile`` replaces
+    ``reported`` with the backend's figure so usage recorded elsewhere
+    shows up too.
+
+    This is accounting data rather than a cache, so it doesn't live in
+    website.cache: rows must never be evicted or expire while they hold
+    unsent deltas.
+    """
+
+    def __init__(self, path=USAGE_LEDGER_PATH, flush_interval=USAGE_FLUSH_INTERVAL, flush_path=USAGE_FLUSH_PATH):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_path = flush_path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialised = False
+        self._flusher = None
+        self._flusher_pid = None
+        self._flusher_lock = threading.Lock()
+
+    def _connection(self):
+        # sqlite3 connections can't cross threads or forks, so keep one per thread per process
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._init_lock:
+            if not self._initialised:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS usage_ledger ("
+                    "user_id TEXT PRIMARY KEY, reported INTEGER NOT NULL DEFAULT 0, "
+                    "reconciled_at REAL NOT NULL DEFAULT 0, prompt_pending INTEGER NOT NULL DEFAULT 0, "
+                    "completion_pending INTEGER NOT NULL DEFAULT 0, flushed_at REAL NOT NULL DEFAULT 0"
+                    ") WITHOUT ROWID"
+                )
+                self._initialised = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def record(self, user_id, prompt_tokens, completion_tokens):
+        """Add one call's usage to ``user_id``'s pending deltas."""
+        if not prompt_tokens and not completion_tokens:
+            return
+        self._ensure_flusher()
+        try:
+            self._connection().execute(
+                "INSERT INTO usage_ledger (user_id, prompt_pending, completion_pending) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET "
+                "prompt_pending = prompt_pending + excluded.prompt_pending, "
+                "completion_pending = completion_pending + excluded.completion_pending",
+                (str(user_id), int(prompt_tokens or 0), int(completion_tokens or 0))
+            )
+        except sqlite3.Error as e:
+            logger.error("Usage ledger write failed for user_id=%s: %s", user_id, e)
+
+    def tokens_used(self, user_id):
+        """The user's total as far as this dyno knows: backend total plus unsent usage."""
+        try:
+            row = self._connection().execute(
+                "SELECT reported + prompt_pending + completion_pending FROM usage_ledger WHERE user_id = ?",
+                (str(user_id),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error("Usage ledger read failed for user_id=%s: %s", user_id, e)
+            return 0
+        return row[0] if row else 0
+
+    def over_free_limit(self, user_id, limit=FREE_TOKEN_LIMIT):
+        return self.tokens_used(user_id) >= limit
+
+    def reconciled_at(self, user_id):
+        """When ``user_id``'s total was last taken from the backend, or None if it never was on this dyno."""
+        if user_id is None:
+            return None
+        try:
+            row = self._connection().execute(
+                "SELECT reconciled_at FROM usage_ledger WHERE user_id = ?", (str(user_id),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error("Usage ledger read failed for user_id=%s: %s", user_id, e)
+            return None
+        return row[0] if row and row[0] else None
+
+    def is_fresh(self, user_id, max_age=USAGE_RECONCILE_INTERVAL):
+        """Whether ``user_id``'s total was reconciled with the backend within ``max_age`` seconds."""
+        reconciled_at = self.reconciled_at(user_id)
+        return reconciled_at is not None and time.time() - reconciled_at < max_age
+
+    def reconcile(self, user_id, total, fetched_at):
+        """
+        Take ``total`` from the backend as the user's flushed usage. Skipped if
+        a flush for this user finished after ``fetched_at``, since the total
+        would not include it.
+        """
+        try:
+            self._connection().execute(
+                "INSERT INTO usage_ledger (user_id, reported, reconciled_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET reported = excluded.reported, "
+                "reconciled_at = excluded.reconciled_at WHERE usage_ledger.flushed_at <= ?",
+                (str(user_id), int(total), time.time(), fetched_at)
+            )
+        except sqlite3.Error as e:
+            logger.error("Usage ledger reconcile failed for user_id=%s: %s", user_id, e)
+
+    def flush(self):
+        """
+        Send pending deltas to the backend. Returns how many users' usage was sent.
+
+        POSTs ``{"usage": [{"user_id", "prompt_tokens", "completion_tokens"}]}``
+        with the admin token to ``flush_path`` and treats any 2xx as stored.
+        That contract is what this app expects of the endpoint; the backend
+        has to provide it before USAGE_FLUSH_PATH is set.
+        """
+        if not self.flush_path:
+            return 0
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT user_id, prompt_pending, completion_pending FROM usage_ledger "
+            "WHERE prompt_pending > 0 OR completion_pending > 0 LIMIT ?",
+            (USAGE_FLUSH_BATCH,)
+        ).fetchall()
+        if not rows:
+            return 0
+
+        payload = {"usage": [
+            {"user_id": user_id, "prompt_tokens": prompt, "completion_tokens": completion}
+            for user_id, prompt, completion in rows
+        ]}
+        headers = {'Authorization': f"Bearer {os.getenv('ADMIN_TOKEN')}"}
+        try:
+            response = http_client.post(f"{API_URL}{self.flush_path}", json=payload, headers=headers)
+        except requests.RequestException as e:
+            logger.error("Error sending token usage: %s", e)
+            return 0
+        if response.status_code >= 300:
+            logger.warning("Token usage flush returned %s; will retry.", response.status_code)
+            return 0
+
+        # Only subtract what was sent; usage recorded meanwhile stays pending
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE usage_ledger SET prompt_pending = prompt_pending - ?, "
+                "completion_pending = completion_pending - ?, reported = reported + ?, flushed_at = ? "
+                "WHERE user_id = ?",
+                [(prompt, completion, prompt + completion, now, user_id) for user_id, prompt, completion in rows]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def _ensure_flusher(self):
+        # Threads don't survive a fork, so check the flusher belongs to this process
+        if self.flush_interval <= 0 or not self.flush_path:
+            return
+        with self._flusher_lock:
+            if self._flusher_pid == os.getpid() and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name='usage-flush', daemon=True)
+            self._flusher_pid = os.getpid()
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self._flush_once_across_workers()
+            except Exception as e:
+                logger.error("Error flushing token usage: %s", e)
+
+    def _flush_once_across_workers(self):
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another worker is flushing the same file
+                return
+            while self.flush() == USAGE_FLUSH_BATCH:
+                pass
+        finally:
+            os.close(fd)
+
+
+usage_ledger = UsageLedger()
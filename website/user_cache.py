@@ -0,0 +1,53 @@
+import os
+import hashlib
+import tempfile
+from website.cache import caches
+
+USER_CACHE_PATH = os.getenv('USER_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'sourcebox-user-cache.sqlite3'))
+USER_CACHE_MAX_ENTRIES = int(os.getenv('USER_CACHE_MAX_ENTRIES', '100000'))
+
+# Per-field lifetimes in seconds; entitlements change more often than profiles
+FIELD_TTLS = {
+    'profile': float(os.getenv('USER_CACHE_PROFILE_TTL', '600')),
+    'premium': float(os.getenv('USER_CACHE_PREMIUM_TTL', '120')),
+    'user_id': float(os.getenv('USER_CACHE_USER_ID_TTL', '600'))
+}
+DEFAULT_TTL = 300
+
+
+def token_key(token):
+    """Cache key for data looked up by bearer token rather than by user ID."""
+    return 'tok:' + hashlib.sha256(token.encode('utf-8')).hexdigest()[:32]
+
+
+class UserCache:
+    """
+    User profile/entitlement cache shared by every gunicorn worker on a dyno.
+
+    Stored in the ``users`` SQLite cache, so all workers see one another's
+    entries and an invalidation from any of them. Each user (or token key)
+    is a namespace with one entry per field and its own expiry, so premium
+    status can expire quickly while profiles stay warm, and everything
+    cached for a user can be dropped at once.
+    """
+
+    def __init__(self, path=USER_CACHE_PATH, ttls=FIELD_TTLS):
+        self.ttls = ttls
+        self._entries = caches.register('users', backend='sqlite', path=path, max_entries=USER_CACHE_MAX_ENTRIES)
+
+    def get(self, key, field):
+        """Return the cached value, or None if it is missing or expired."""
+        return self._entries.get(field, namespace=str(key))
+
+    def set(self, key, field, value, ttl=None):
+        ttl = self.ttls.get(field, DEFAULT_TTL) if ttl is None else ttl
+        self._entries.set(field, value, ttl, namespace=str(key))
+
+    def invalidate(self, key, fields=None):
+        """Drop ``fields`` (or every field) cached for ``key``. Returns entries removed."""
+        if fields:
+            return sum(self._entries.delete(field, namespace=str(key)) for field in fields)
+        return self._entries.invalidate(str(key))
+
+
+user_cache = UserCache()